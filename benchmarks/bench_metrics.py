@@ -0,0 +1,81 @@
+import asyncio
+import time
+import timeit
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+import deciphon_api.core.sched as sched
+from deciphon_api.core.instrumentation import MetricsMiddleware
+
+NUM_REQUESTS = 20000
+NUM_CALLS = 200000
+REPEAT = 5
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping", name="bench:ping")
+    async def ping():
+        return PlainTextResponse("pong")
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app: FastAPI, num: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(num):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/ping",
+            "raw_path": b"/ping",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+            "server": ("127.0.0.1", 80),
+            "client": ("127.0.0.1", 1234),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / num * 1e6
+
+
+def bench_requests():
+    print(f"{'app':<14} {'us/request':>12}")
+    for name, instrumented in [("plain", False), ("instrumented", True)]:
+        app = make_app(instrumented)
+        best = min(asyncio.run(drive(app, NUM_REQUESTS)) for _ in range(REPEAT))
+        print(f"{name:<14} {best:>12.2f}")
+
+
+def bench_sched_calls():
+    def noop():
+        return None
+
+    calls = [
+        ("direct", noop),
+        ("timed", sched._timed(noop)),
+        ("reader", sched._reader(noop)),
+    ]
+    print(f"{'sched call':<14} {'us/call':>12}")
+    for name, call in calls:
+        best = min(timeit.repeat(call, number=NUM_CALLS, repeat=REPEAT))
+        print(f"{name:<14} {best / NUM_CALLS * 1e6:>12.3f}")
+
+
+if __name__ == "__main__":
+    bench_requests()
+    print()
+    bench_sched_calls()
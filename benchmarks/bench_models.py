@@ -0,0 +1,130 @@
+import asyncio
+import timeit
+from typing import Any, Callable, List, Tuple
+
+from deciphon_sched.db import sched_db
+from deciphon_sched.hmm import sched_hmm
+from deciphon_sched.job import sched_job, sched_job_state, sched_job_type
+from deciphon_sched.prod import sched_prod
+from deciphon_sched.scan import sched_scan
+from deciphon_sched.seq import sched_seq
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from deciphon_api.core.responses import TrustedJSONResponse
+from deciphon_api.models.db import DB
+from deciphon_api.models.hmm import HMM
+from deciphon_api.models.job import Job, JobState
+from deciphon_api.models.prod import Prod, Prods
+from deciphon_api.models.scan import Scan
+from deciphon_api.models.seq import Seq, Seqs
+
+NUM_RECORDS = 1000
+REPEAT = 5
+
+MATCH = ";".join(f"CCT,M{i},CCT,P" for i in range(1, 200))
+DATA = "ACGT" * 250
+
+
+def sched_records() -> List[Tuple[str, Any, Callable, Callable]]:
+    db = sched_db(1, -3907098992699871052, "minifam.dcp", 1, None)
+    hmm = sched_hmm(1, -1400478458576472411, "minifam.hmm", 1, None)
+    job = sched_job(
+        1,
+        sched_job_type.SCHED_SCAN,
+        sched_job_state.SCHED_PEND,
+        0,
+        "",
+        1666000000,
+        0,
+        0,
+        None,
+    )
+    scan = sched_scan(1, 1, True, False, 1, None)
+    seq = sched_seq(1, 1, "Homoserine_dh-consensus", DATA, None)
+    prod = sched_prod(
+        1, 1, 1, "PF00742.20", "dna", -547.8, -690.8, "protein", "0.0.1", MATCH, None
+    )
+
+    return [
+        ("DB", db, DB.from_sched_db, lambda x: DB(**vars_of(x))),
+        ("HMM", hmm, HMM.from_sched_hmm, lambda x: HMM(**vars_of(x))),
+        (
+            "Job",
+            job,
+            Job.from_sched_job,
+            lambda x: Job(**dict(vars_of(x), state=JobState[x.state.name])),
+        ),
+        ("Scan", scan, Scan.from_sched_scan, lambda x: Scan(**vars_of(x))),
+        ("Seq", seq, Seq.from_sched_seq, lambda x: Seq(**vars_of(x))),
+        ("Prod", prod, Prod.from_sched_prod, lambda x: Prod(**vars_of(x))),
+    ]
+
+
+def vars_of(record: Any):
+    return {k: v for k, v in vars(record).items() if k != "ptr"}
+
+
+def per_record(stmt: Callable[[], Any], num: int) -> float:
+    best = min(timeit.repeat(stmt, number=1, repeat=REPEAT))
+    return best / num * 1e6
+
+
+def bench_conversion():
+    print(f"{'model':<6} {'validated':>12} {'trusted':>12}  (us/record)")
+    for name, record, trusted, validated in sched_records():
+        t0 = per_record(
+            lambda: [validated(record) for _ in range(NUM_RECORDS)], NUM_RECORDS
+        )
+        t1 = per_record(
+            lambda: [trusted(record) for _ in range(NUM_RECORDS)], NUM_RECORDS
+        )
+        print(f"{name:<6} {t0:>12.2f} {t1:>12.2f}")
+
+
+def bench_serialization():
+    seqs = Seqs.create(
+        [sched_seq(i, 1, f"seq{i}", DATA, None) for i in range(1, NUM_RECORDS + 1)]
+    )
+    prods = Prods.create(
+        [
+            sched_prod(
+                i,
+                1,
+                i,
+                "PF00742.20",
+                "dna",
+                -1.0,
+                -2.0,
+                "protein",
+                "0.0.1",
+                MATCH,
+                None,
+            )
+            for i in range(1, NUM_RECORDS + 1)
+        ]
+    )
+
+    print(f"{'model':<6} {'response_model':>15} {'trusted':>12}  (us/record)")
+    for name, model, type_ in [("Seqs", seqs, Seqs), ("Prods", prods, Prods)]:
+        field = create_response_field(name="response", type_=type_)
+
+        def fastapi_path():
+            content = asyncio.run(
+                serialize_response(field=field, response_content=model)
+            )
+            JSONResponse(content)
+
+        def trusted_path():
+            TrustedJSONResponse(model)
+
+        t0 = per_record(fastapi_path, NUM_RECORDS)
+        t1 = per_record(trusted_path, NUM_RECORDS)
+        print(f"{name:<6} {t0:>15.2f} {t1:>12.2f}")
+
+
+if __name__ == "__main__":
+    bench_conversion()
+    print()
+    bench_serialization()
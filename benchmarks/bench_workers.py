@@ -0,0 +1,123 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import httpx
+
+import deciphon_api.data as data
+
+MAX_WORKERS = os.cpu_count() or 1
+CLIENTS = 32
+REQUESTS = 200
+# One in WRITE_EVERY requests submits a scan; the rest read.
+WRITE_EVERY = 10
+API_KEY = "bench"
+
+FASTA = ">seq1\n" + "ACGT" * 250 + "\n"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, storage_dir: str, port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        storage_dir=storage_dir,
+        sched_filename=os.path.join(storage_dir, "deciphon.sched"),
+        workers=str(workers),
+        api_key=API_KEY,
+        logging_level="warning",
+    )
+    cmds = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "deciphon_api.main:app",
+        "--workers",
+        str(workers),
+        "--worker-class",
+        "uvicorn.workers.UvicornWorker",
+        "--bind",
+        f"127.0.0.1:{port}",
+    ]
+    return subprocess.Popen(cmds, env=env, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(url: str):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/").status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def seed(url: str):
+    headers = {"X-API-Key": API_KEY}
+    for field, name, kind in [
+        ("hmm_file", data.FileName.minifam_hmm, "hmms"),
+        ("db_file", data.FileName.minifam_db, "dbs"),
+    ]:
+        path = data.filepath(name)
+        files = {field: (path.name, open(path, "rb"))}
+        response = httpx.post(f"{url}/{kind}/", files=files, headers=headers)
+        response.raise_for_status()
+    submit(httpx.Client(), url)
+
+
+def submit(client: httpx.Client, url: str) -> int:
+    files = {"fasta_file": ("seqs.fasta", FASTA, "text/plain")}
+    response = client.post(f"{url}/scans/", data={"db_id": "1"}, files=files)
+    return response.status_code
+
+
+def client_loop(url: str) -> Tuple[int, int]:
+    errors = 0
+    with httpx.Client(timeout=60) as client:
+        for i in range(REQUESTS):
+            if i % WRITE_EVERY == 0:
+                status = submit(client, url)
+            elif i % 2 == 0:
+                status = client.get(f"{url}/scans/1/seqs").status_code
+            else:
+                status = client.get(f"{url}/jobs/2").status_code
+            errors += status >= 400
+    return REQUESTS, errors
+
+
+def bench(workers: int) -> Tuple[float, int]:
+    with tempfile.TemporaryDirectory() as storage_dir:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(workers, storage_dir, port)
+        try:
+            wait_ready(url)
+            seed(url)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(CLIENTS) as pool:
+                results = list(pool.map(client_loop, [url] * CLIENTS))
+            elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait()
+    total = sum(x[0] for x in results)
+    return total / elapsed, sum(x[1] for x in results)
+
+
+if __name__ == "__main__":
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_WORKERS
+    print(f"{'workers':>7} {'req/s':>10} {'errors':>8}")
+    for workers in range(1, max_workers + 1):
+        rate, errors = bench(workers)
+        print(f"{workers:>7} {rate:>10.1f} {errors:>8}")
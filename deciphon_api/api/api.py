@@ -1,7 +1,17 @@
 from fastapi import APIRouter, Request
 from starlette.status import HTTP_200_OK
 
-from deciphon_api.api import dbs, hmms, jobs, prods, scans, sched, seqs
+from deciphon_api.api import (
+    dbs,
+    hmms,
+    jobs,
+    metrics,
+    prods,
+    scans,
+    sched,
+    seqs,
+    uploads,
+)
 from deciphon_api.core.responses import PrettyJSONResponse
 
 router = APIRouter()
@@ -9,10 +19,12 @@ router = APIRouter()
 router.include_router(dbs.router)
 router.include_router(hmms.router)
 router.include_router(jobs.router)
+router.include_router(metrics.router)
 router.include_router(prods.router)
 router.include_router(scans.router)
 router.include_router(sched.router)
 router.include_router(seqs.router)
+router.include_router(uploads.router)
 
 
 @router.get(
@@ -1,11 +1,26 @@
+from typing import Optional
+
 from fastapi import Depends
 from fastapi.security import APIKeyHeader
 
 from deciphon_api.core.settings import settings
 
-__all__ = ["auth_request"]
+__all__ = ["auth_request", "request_tenant"]
 
 
 def auth_request(token: str = Depends(APIKeyHeader(name="X-API-Key"))) -> bool:
     authenticated = token == settings.api_key
     return authenticated
+
+
+def request_tenant(
+    token: Optional[str] = Depends(APIKeyHeader(name="X-API-Key", auto_error=False))
+) -> Optional[str]:
+    if token is None:
+        return None
+    if token == settings.api_key:
+        return ""
+    for tenant, key in settings.tenant_keys.items():
+        if token == key:
+            return tenant
+    return None
@@ -1,12 +1,15 @@
-from typing import List, Union
+from typing import List, Optional, Union
 
-import aiofiles
-from fastapi import APIRouter, Depends, File, Path, Query, UploadFile
+from fastapi import APIRouter, Depends, Path, Query, Request
 from fastapi.responses import FileResponse, JSONResponse
 from starlette.status import HTTP_200_OK, HTTP_201_CREATED
 
 from deciphon_api.api.authentication import auth_request
 from deciphon_api.api.responses import responses
+from deciphon_api.core.file_response import RangeFileResponse, etag_of
+from deciphon_api.core.responses import TrustedJSONResponse
+from deciphon_api.core.storage import storage
+from deciphon_api.core.uploads import multipart_body, stream_file
 from deciphon_api.models.db import DB, DBIDType
 
 router = APIRouter()
@@ -14,6 +17,8 @@ router = APIRouter()
 
 mime = "application/octet-stream"
 
+xxh3_description = "expected xxh3 of the file; a known file is answered right away"
+
 
 @router.get(
     "/dbs/{id}",
@@ -27,7 +32,7 @@ mime = "application/octet-stream"
 async def get_db(
     id: Union[int, str] = Path(...), id_type: DBIDType = Query(DBIDType.DB_ID.value)
 ):
-    return DB.get(id, id_type)
+    return TrustedJSONResponse(DB.get(id, id_type))
 
 
 @router.get(
@@ -39,7 +44,7 @@ async def get_db(
     name="dbs:get-db-by-id",
 )
 async def get_db_by_id(id: int = Path(..., gt=0)):
-    return DB.get(id, DBIDType.DB_ID)
+    return TrustedJSONResponse(DB.get(id, DBIDType.DB_ID))
 
 
 @router.get(
@@ -51,7 +56,7 @@ async def get_db_by_id(id: int = Path(..., gt=0)):
     name="dbs:get-db-by-xxh3",
 )
 async def get_db_by_xxh3(xxh3: int):
-    return DB.get(xxh3, DBIDType.XXH3)
+    return TrustedJSONResponse(DB.get(xxh3, DBIDType.XXH3))
 
 
 @router.get(
@@ -63,7 +68,7 @@ async def get_db_by_xxh3(xxh3: int):
     name="dbs:get-db-by-filename",
 )
 async def get_db_by_filename(filename: str):
-    return DB.get(filename, DBIDType.FILENAME)
+    return TrustedJSONResponse(DB.get(filename, DBIDType.FILENAME))
 
 
 @router.get(
@@ -75,7 +80,7 @@ async def get_db_by_filename(filename: str):
     name="dbs:get-db-by-hmm_id",
 )
 async def get_db_by_hmm_id(hmm_id: int):
-    return DB.get(hmm_id, DBIDType.HMM_ID)
+    return TrustedJSONResponse(DB.get(hmm_id, DBIDType.HMM_ID))
 
 
 @router.get(
@@ -87,11 +92,12 @@ async def get_db_by_hmm_id(hmm_id: int):
     name="dbs:get-db-list",
 )
 async def get_db_list():
-    return DB.get_list()
+    return TrustedJSONResponse(DB.get_list())
 
 
-@router.get(
+@router.api_route(
     "/dbs/{db_id}/download",
+    methods=["GET", "HEAD"],
     summary="download db",
     response_class=FileResponse,
     status_code=HTTP_200_OK,
@@ -100,7 +106,10 @@ async def get_db_list():
 )
 async def download_db(db_id: int = Path(..., gt=0)):
     db = DB.get(db_id, DBIDType.DB_ID)
-    return FileResponse(db.filename, media_type=mime, filename=db.filename)
+    file = str(storage.path(db.filename))
+    return RangeFileResponse(
+        file, etag_of(db.xxh3), media_type=mime, filename=db.filename
+    )
 
 
 @router.post(
@@ -111,15 +120,17 @@ async def download_db(db_id: int = Path(..., gt=0)):
     responses=responses,
     name="dbs:upload-db",
     dependencies=[Depends(auth_request)],
+    openapi_extra=multipart_body("db_file", "deciphon db"),
 )
 async def upload_db(
-    db_file: UploadFile = File(..., content_type=mime, description="deciphon db"),
+    request: Request,
+    xxh3: Optional[int] = Query(None, description=xxh3_description),
 ):
-    async with aiofiles.open(db_file.filename, "wb") as file:
-        while content := await db_file.read(4 * 1024 * 1024):
-            await file.write(content)
+    if xxh3 is not None and (db := DB.find_by_xxh3(xxh3)) is not None:
+        return TrustedJSONResponse(db, HTTP_200_OK)
 
-    return DB.add(db_file.filename)
+    upload = await stream_file(request, "db_file", xxh3)
+    return TrustedJSONResponse(DB.add_upload(upload), HTTP_201_CREATED)
 
 
 @router.delete(
@@ -1,13 +1,22 @@
-from typing import List, Union
+from typing import List, Optional, Union
 
-import aiofiles
-from fastapi import APIRouter, Depends, File, Path, Query, UploadFile
+from fastapi import APIRouter, Depends, Path, Query, Request
 from fastapi.responses import FileResponse, JSONResponse
 from starlette.status import HTTP_200_OK, HTTP_201_CREATED
 
 from deciphon_api.api.authentication import auth_request
 from deciphon_api.api.dbs import get_db_by_hmm_id
 from deciphon_api.api.responses import responses
+from deciphon_api.core.compression import accepts
+from deciphon_api.core.file_response import (
+    DecodedFileResponse,
+    RangeFileResponse,
+    encoded_file_response,
+    etag_of,
+)
+from deciphon_api.core.responses import TrustedJSONResponse
+from deciphon_api.core.storage import storage
+from deciphon_api.core.uploads import multipart_body, stream_file
 from deciphon_api.models.db import DB
 from deciphon_api.models.hmm import HMM, HMMIDType
 
@@ -16,6 +25,8 @@ router = APIRouter()
 
 mime = "text/plain"
 
+xxh3_description = "expected xxh3 of the file; a known file is answered right away"
+
 
 @router.get(
     "/hmms/{id}",
@@ -29,7 +40,7 @@ mime = "text/plain"
 async def get_hmm(
     id: Union[int, str] = Path(...), id_type: HMMIDType = Query(HMMIDType.HMM_ID.value)
 ):
-    return HMM.get(id, id_type)
+    return TrustedJSONResponse(HMM.get(id, id_type))
 
 
 @router.get(
@@ -41,7 +52,7 @@ async def get_hmm(
     name="hmms:get-hmm-by-id",
 )
 async def get_hmm_by_id(id: int = Path(..., gt=0)):
-    return HMM.get(id, HMMIDType.HMM_ID)
+    return TrustedJSONResponse(HMM.get(id, HMMIDType.HMM_ID))
 
 
 @router.get(
@@ -53,7 +64,7 @@ async def get_hmm_by_id(id: int = Path(..., gt=0)):
     name="hmms:get-hmm-by-xxh3",
 )
 async def get_hmm_by_xxh3(xxh3: int):
-    return HMM.get(xxh3, HMMIDType.XXH3)
+    return TrustedJSONResponse(HMM.get(xxh3, HMMIDType.XXH3))
 
 
 @router.get(
@@ -65,7 +76,7 @@ async def get_hmm_by_xxh3(xxh3: int):
     name="hmms:get-hmm-by-job-id",
 )
 async def get_hmm_by_job_id(job_id: int = Path(..., gt=0)):
-    return HMM.get(job_id, HMMIDType.JOB_ID)
+    return TrustedJSONResponse(HMM.get(job_id, HMMIDType.JOB_ID))
 
 
 @router.get(
@@ -77,7 +88,7 @@ async def get_hmm_by_job_id(job_id: int = Path(..., gt=0)):
     name="hmms:get-hmm-by-filename",
 )
 async def get_hmm_by_filename(filename: str):
-    return HMM.get(filename, HMMIDType.FILENAME)
+    return TrustedJSONResponse(HMM.get(filename, HMMIDType.FILENAME))
 
 
 get_db_by_hmm_id = router.get(
@@ -99,20 +110,30 @@ get_db_by_hmm_id = router.get(
     name="dbs:get-hmm-list",
 )
 async def get_hmm_list():
-    return HMM.get_list()
+    return TrustedJSONResponse(HMM.get_list())
 
 
-@router.get(
+@router.api_route(
     "/hmms/{hmm_id}/download",
+    methods=["GET", "HEAD"],
     summary="download hmm",
     response_class=FileResponse,
     status_code=HTTP_200_OK,
     responses=responses,
     name="hmms:download-hmm",
 )
-async def download_hmm(hmm_id: int = Path(..., gt=0)):
+async def download_hmm(request: Request, hmm_id: int = Path(..., gt=0)):
     hmm = HMM.get(hmm_id, HMMIDType.HMM_ID)
-    return FileResponse(hmm.filename, media_type=mime, filename=hmm.filename)
+    etag = etag_of(hmm.xxh3)
+    file = storage.path(hmm.filename)
+    encoded = None if file.exists() else storage.find_encoded(hmm.xxh3)
+    if encoded is None:
+        return RangeFileResponse(str(file), etag, mime, hmm.filename)
+
+    path, encoding = encoded
+    if accepts(request.headers.get("accept-encoding"), encoding):
+        return encoded_file_response(str(path), encoding, etag, mime, hmm.filename)
+    return DecodedFileResponse(str(path), encoding, etag, mime, hmm.filename)
 
 
 @router.post(
@@ -123,15 +144,17 @@ async def download_hmm(hmm_id: int = Path(..., gt=0)):
     responses=responses,
     name="hmms:upload-hmm",
     dependencies=[Depends(auth_request)],
+    openapi_extra=multipart_body("hmm_file", "hmmer3 file"),
 )
 async def upload_hmm(
-    hmm_file: UploadFile = File(..., content_type=mime, description="hmmer3 file"),
+    request: Request,
+    xxh3: Optional[int] = Query(None, description=xxh3_description),
 ):
-    async with aiofiles.open(hmm_file.filename, "wb") as file:
-        while content := await hmm_file.read(4 * 1024 * 1024):
-            await file.write(content)
+    if xxh3 is not None and (hmm := HMM.find_by_xxh3(xxh3)) is not None:
+        return TrustedJSONResponse(hmm, HTTP_200_OK)
 
-    return HMM.submit(hmm_file.filename)
+    upload = await stream_file(request, "hmm_file", xxh3)
+    return TrustedJSONResponse(HMM.submit_upload(upload), HTTP_201_CREATED)
 
 
 @router.delete(
@@ -1,15 +1,30 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, Path
-from fastapi.responses import FileResponse, JSONResponse, Response
-from starlette.status import HTTP_200_OK, HTTP_204_NO_CONTENT
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.status import HTTP_200_OK, HTTP_204_NO_CONTENT, HTTP_409_CONFLICT
 
 from deciphon_api.api.authentication import auth_request
 from deciphon_api.api.hmms import download_hmm, get_hmm_by_job_id
 from deciphon_api.api.responses import responses
 from deciphon_api.api.scans import get_scan_by_job_id
+from deciphon_api.core.job_events import job_events
+from deciphon_api.core.responses import TrustedJSONResponse
+from deciphon_api.core.settings import settings
+from deciphon_api.core.wakeup import pend_waiters
+from deciphon_api.models.count import Count
 from deciphon_api.models.hmm import HMM, HMMIDType
-from deciphon_api.models.job import Job, JobProgressPatch, JobStatePatch, PendJob
+from deciphon_api.models.job import (
+    Job,
+    JobFilter,
+    JobLease,
+    JobProgressItem,
+    JobProgressPatch,
+    JobQueueStats,
+    JobState,
+    JobStatePatch,
+    PendJob,
+)
 from deciphon_api.models.scan import Scan, ScanIDType
 
 router = APIRouter()
@@ -23,11 +38,74 @@ router = APIRouter()
     responses=responses,
     name="jobs:get-next-pend-job",
 )
-async def get_next_pend_job():
-    job = Job.next_pend()
+async def get_next_pend_job(
+    wait: float = Query(0, ge=0, le=settings.max_pend_wait),
+):
+    job = await pend_waiters.poll(Job.next_pend, wait)
     if job is None:
         return Response(status_code=HTTP_204_NO_CONTENT)
-    return job
+    return TrustedJSONResponse(job)
+
+
+@router.post(
+    "/jobs/claim",
+    summary="claim pending jobs",
+    response_model=List[Job],
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="jobs:claim-jobs",
+    dependencies=[Depends(auth_request)],
+)
+async def claim_jobs(
+    limit: int = Query(1, gt=0, le=1024),
+    worker: str = Query(..., min_length=1, max_length=256),
+    wait: float = Query(0, ge=0, le=settings.max_pend_wait),
+):
+    jobs = await pend_waiters.poll(lambda: Job.claim(limit, worker) or None, wait)
+    return TrustedJSONResponse(jobs or [])
+
+
+@router.get(
+    "/jobs/count",
+    summary="get job count",
+    response_model=Count,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="jobs:get-job-count",
+)
+async def get_job_count(state: Optional[JobState] = Query(None)):
+    return Count(count=Job.count(state))
+
+
+@router.get(
+    "/jobs/queue",
+    summary="get pending queue statistics per priority",
+    response_model=List[JobQueueStats],
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="jobs:get-queue-stats",
+)
+async def get_queue_stats():
+    return TrustedJSONResponse(Job.queue_stats())
+
+
+@router.get(
+    "/jobs/events",
+    summary="stream job events",
+    response_class=StreamingResponse,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="jobs:stream-job-events",
+)
+async def stream_job_events(
+    id: Optional[List[int]] = Query(None, description="job ids to follow"),
+    state: Optional[List[JobState]] = Query(None, description="job states to follow"),
+):
+    return StreamingResponse(
+        job_events.stream(id, state, settings.event_heartbeat),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 
 @router.get(
@@ -39,7 +117,7 @@ async def get_next_pend_job():
     name="jobs:get-job",
 )
 async def get_job(job_id: int = Path(..., gt=0)):
-    return Job.get(job_id)
+    return TrustedJSONResponse(Job.get(job_id))
 
 
 @router.get(
@@ -50,8 +128,29 @@ async def get_job(job_id: int = Path(..., gt=0)):
     responses=responses,
     name="jobs:get-job-list",
 )
-async def get_job_list():
-    return Job.get_list()
+async def get_job_list(
+    state: Optional[List[JobState]] = Query(None),
+    type: Optional[int] = Query(None, ge=0, le=1),
+    submission_min: Optional[int] = Query(None, ge=0),
+    submission_max: Optional[int] = Query(None, ge=0),
+    exec_ended_min: Optional[int] = Query(None, ge=0),
+    exec_ended_max: Optional[int] = Query(None, ge=0),
+    after: int = Query(0, ge=0, description="return jobs past this id"),
+    limit: Optional[int] = Query(None, gt=0, le=65536),
+):
+    job_filter = JobFilter(
+        states=state,
+        type=type,
+        submission_min=submission_min,
+        submission_max=submission_max,
+        exec_ended_min=exec_ended_min,
+        exec_ended_max=exec_ended_max,
+    )
+    jobs = Job.get_list(job_filter, after, limit)
+    headers = {}
+    if limit is not None and len(jobs) == limit:
+        headers["X-Next-After"] = str(jobs[-1].id)
+    return TrustedJSONResponse(jobs, headers=headers)
 
 
 @router.patch(
@@ -67,7 +166,7 @@ async def set_job_state(
     job_id: int = Path(..., gt=0),
     job_patch: JobStatePatch = Body(...),
 ):
-    return Job.set_state(job_id, job_patch)
+    return TrustedJSONResponse(Job.set_state(job_id, job_patch))
 
 
 @router.patch(
@@ -82,9 +181,53 @@ async def set_job_state(
 async def increment_job_progress(
     job_id: int = Path(..., gt=0),
     job_patch: JobProgressPatch = Body(...),
+    echo: bool = Query(True, description="respond with the updated job"),
 ):
     Job.increment_progress(job_id, job_patch.increment)
-    return Job.get(job_id)
+    if not echo:
+        return Response(status_code=HTTP_204_NO_CONTENT)
+    return TrustedJSONResponse(Job.get(job_id))
+
+
+@router.patch(
+    "/jobs/progress",
+    summary="patch progress of many jobs",
+    response_model=List[Job],
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="jobs:increment-jobs-progress",
+    dependencies=[Depends(auth_request)],
+)
+async def increment_jobs_progress(
+    job_patches: List[JobProgressItem] = Body(...),
+    echo: bool = Query(False, description="respond with the updated jobs"),
+):
+    Job.increment_progress_of(job_patches)
+    if not echo:
+        return Response(status_code=HTTP_204_NO_CONTENT)
+    job_ids = dict.fromkeys(x.job_id for x in job_patches)
+    return TrustedJSONResponse([Job.get(job_id) for job_id in job_ids])
+
+
+@router.post(
+    "/jobs/{job_id}/heartbeat",
+    summary="renew the lease of a claimed job",
+    response_model=JobLease,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="jobs:heartbeat",
+    dependencies=[Depends(auth_request)],
+)
+async def heartbeat(
+    job_id: int = Path(..., gt=0),
+    worker: str = Query(..., min_length=1, max_length=256),
+):
+    lease = Job.heartbeat(job_id, worker)
+    if lease is None:
+        raise HTTPException(
+            HTTP_409_CONFLICT, f"{worker} holds no lease on job {job_id}"
+        )
+    return TrustedJSONResponse(lease)
 
 
 @router.get(
@@ -97,7 +240,7 @@ async def increment_job_progress(
     deprecated=True,
 )
 async def get_hmm(job_id: int = Path(..., gt=0)):
-    return HMM.get(job_id, HMMIDType.JOB_ID)
+    return TrustedJSONResponse(HMM.get(job_id, HMMIDType.JOB_ID))
 
 
 get_hmm_by_job_id = router.get(
@@ -130,7 +273,7 @@ download_hmm = router.get(
     deprecated=True,
 )
 async def get_scan(job_id: int = Path(..., gt=0)):
-    return Scan.get(job_id, ScanIDType.JOB_ID)
+    return TrustedJSONResponse(Scan.get(job_id, ScanIDType.JOB_ID))
 
 
 get_scan_by_job_id = router.get(
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.status import HTTP_200_OK
+
+from deciphon_api.api.responses import responses
+from deciphon_api.core.metrics import CONTENT_TYPE, registry
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    summary="get metrics in prometheus text format",
+    response_class=PlainTextResponse,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="metrics:get-metrics",
+)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -1,14 +1,21 @@
+import os
+from typing import List, Optional
+
 import aiofiles
-from fastapi import APIRouter, Depends, File, Path, UploadFile
+from fastapi import APIRouter, Depends, File, Path, Query, UploadFile
 from fastapi.responses import JSONResponse
 from starlette.status import HTTP_200_OK, HTTP_201_CREATED
 
 from deciphon_api.api.authentication import auth_request
 from deciphon_api.api.responses import responses
-from deciphon_api.models.prod import Prod, Prods
+from deciphon_api.core.responses import TrustedJSONResponse
+from deciphon_api.core.storage import storage
+from deciphon_api.models.prod import Prod, ProdField, Prods
 
 router = APIRouter()
 
+fields_query = Query(None, description="fields to include (id is always included)")
+
 
 @router.get(
     "/prods/{prod_id}",
@@ -18,8 +25,11 @@ router = APIRouter()
     responses=responses,
     name="prods:get-product",
 )
-async def get_product(prod_id: int = Path(..., gt=0)):
-    return Prod.get(prod_id)
+async def get_product(
+    prod_id: int = Path(..., gt=0), fields: Optional[List[ProdField]] = fields_query
+):
+    prod = Prod.get(prod_id, fields)
+    return TrustedJSONResponse(prod, projected=fields is not None)
 
 
 @router.get(
@@ -30,8 +40,9 @@ async def get_product(prod_id: int = Path(..., gt=0)):
     responses=responses,
     name="prods:get-prod-list",
 )
-async def get_prod_list():
-    return Prod.get_list()
+async def get_prod_list(fields: Optional[List[ProdField]] = fields_query):
+    prods = Prod.get_list(fields)
+    return TrustedJSONResponse(prods, projected=fields is not None)
 
 
 @router.post(
@@ -48,9 +59,13 @@ async def upload_products(
         ..., content_type="text/tab-separated-values", description="file of products"
     ),
 ):
-    async with aiofiles.open(prods_file.filename, "wb") as file:
-        while content := await prods_file.read(4 * 1024 * 1024):
-            await file.write(content)
+    path = storage.temp_path()
+    try:
+        async with aiofiles.open(path, "wb") as file:
+            while content := await prods_file.read(4 * 1024 * 1024):
+                await file.write(content)
+        Prod.add_file(path)
+    finally:
+        os.unlink(path)
 
-    Prod.add_file(prods_file.filename)
     return JSONResponse({}, HTTP_201_CREATED)
@@ -1,22 +1,54 @@
+import os
 import tempfile
-from typing import List
+from typing import Dict, List, Optional
 
 import aiofiles
 from fasta_reader import read_fasta
-from fastapi import APIRouter, File, Form, Path, Query, UploadFile
-from fastapi.responses import FileResponse, PlainTextResponse, Response
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Path,
+    Query,
+    UploadFile,
+)
+from fastapi.responses import (
+    FileResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from starlette.background import BackgroundTask
-from starlette.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_204_NO_CONTENT
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_204_NO_CONTENT,
+    HTTP_403_FORBIDDEN,
+    HTTP_406_NOT_ACCEPTABLE,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
 
+from deciphon_api.api.authentication import auth_request, request_tenant
 from deciphon_api.api.responses import responses
+from deciphon_api.core.responses import TrustedJSONResponse
+from deciphon_api.core.storage import storage
 from deciphon_api.models.count import Count
-from deciphon_api.models.job import Job
-from deciphon_api.models.prod import Prods
+from deciphon_api.models.job import Job, JobPriority
+from deciphon_api.models.prod import Prod, ProdField, Prods, ProdsAdded
 from deciphon_api.models.scan import DoneScan, Scan, ScanConfig, ScanIDType, ScanPost
-from deciphon_api.models.seq import Seq, SeqPost, Seqs
+from deciphon_api.models.scan_export import ExportFormat, ProdsExport, arrow_available
+from deciphon_api.models.seq import Seq, SeqField, SeqPost, Seqs, SeqsFormat
 
 router = APIRouter()
 
+fields_query = Query(None, description="fields to include (id is always included)")
+
+
+def completeness(scan: Scan) -> Dict[str, str]:
+    return {"X-Scan-Complete": "true" if scan.complete() else "false"}
+
 
 @router.get(
     "/scans/{id}",
@@ -30,7 +62,7 @@ router = APIRouter()
 async def get_scan(
     id: int = Path(...), id_type: ScanIDType = Query(ScanIDType.SCAN_ID.value)
 ):
-    return Scan.get(id, id_type)
+    return TrustedJSONResponse(Scan.get(id, id_type))
 
 
 @router.get(
@@ -42,7 +74,7 @@ async def get_scan(
     name="scans:get-scan-by-id",
 )
 async def get_scan_by_id(id: int = Path(..., gt=0)):
-    return Scan.get(id, ScanIDType.SCAN_ID)
+    return TrustedJSONResponse(Scan.get(id, ScanIDType.SCAN_ID))
 
 
 @router.get(
@@ -54,7 +86,7 @@ async def get_scan_by_id(id: int = Path(..., gt=0)):
     name="scans:get-scan-by-job-id",
 )
 async def get_scan_by_job_id(job_id: int = Path(..., gt=0)):
-    return Scan.get(job_id, ScanIDType.JOB_ID)
+    return TrustedJSONResponse(Scan.get(job_id, ScanIDType.JOB_ID))
 
 
 @router.post(
@@ -72,9 +104,13 @@ async def submit_scan(
     fasta_file: UploadFile = File(
         ..., content_type="text/plain", description="fasta file"
     ),
+    priority: JobPriority = Form(JobPriority.NORMAL),
+    tenant: Optional[str] = Depends(request_tenant),
 ):
+    if priority != JobPriority.NORMAL and tenant is None:
+        raise HTTPException(HTTP_403_FORBIDDEN, "priority requires an API key")
     cfg = ScanConfig(db_id=db_id, multi_hits=multi_hits, hmmer3_compat=hmmer3_compat)
-    scan = ScanPost(config=cfg)
+    scan = ScanPost(config=cfg, priority=priority, submitter=tenant or "")
 
     async with aiofiles.tempfile.NamedTemporaryFile("wb") as file:
         while content := await fasta_file.read(4 * 1024 * 1024):
@@ -95,8 +131,11 @@ async def submit_scan(
     responses=responses,
     name="scans:get-sequences-of-scan",
 )
-async def get_sequences_of_scan(id: int = Path(..., gt=0)):
-    return Scan.get(id, ScanIDType.SCAN_ID).seqs()
+async def get_sequences_of_scan(
+    id: int = Path(..., gt=0), fields: Optional[List[SeqField]] = fields_query
+):
+    seqs = Scan.get(id, ScanIDType.SCAN_ID).seqs(fields)
+    return TrustedJSONResponse(seqs, projected=fields is not None)
 
 
 @router.get(
@@ -130,7 +169,7 @@ async def download_sequences_of_scan(id: int = Path(..., gt=0)):
     name="scans:get-sequence-count-of-scan",
 )
 async def get_sequence_count_of_scan(id: int = Path(..., gt=0)):
-    return Count(count=len(Scan.get(id, ScanIDType.SCAN_ID).seqs()))
+    return Count(count=Scan.get(id, ScanIDType.SCAN_ID).seq_count())
 
 
 @router.get(
@@ -142,7 +181,7 @@ async def get_sequence_count_of_scan(id: int = Path(..., gt=0)):
     name="scans:get-scan-list",
 )
 async def get_scan_list():
-    return Scan.get_list()
+    return TrustedJSONResponse(Scan.get_list())
 
 
 @router.get(
@@ -154,12 +193,42 @@ async def get_scan_list():
     name="scans:get-next-sequence-of-scan",
 )
 async def get_next_sequence_of_scan(
-    id: int = Path(..., gt=0), seq_id: int = Path(..., ge=0)
+    id: int = Path(..., gt=0),
+    seq_id: int = Path(..., ge=0),
+    fields: Optional[List[SeqField]] = fields_query,
 ):
-    seq = Seq.next(seq_id, id)
+    seq = Seq.next(seq_id, id, fields)
     if seq is None:
         return Response(status_code=HTTP_204_NO_CONTENT)
-    return seq
+    return TrustedJSONResponse(seq, projected=fields is not None)
+
+
+@router.get(
+    "/scans/{id}/seqs/chunk",
+    summary="get a chunk of sequences",
+    response_model=Seqs,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="scans:get-sequence-chunk-of-scan",
+)
+async def get_sequence_chunk_of_scan(
+    id: int = Path(..., gt=0),
+    after: int = Query(0, ge=0, description="return sequences past this id"),
+    limit: int = Query(256, gt=0, le=65536),
+    max_bytes: Optional[int] = Query(None, gt=0, description="stop past this size"),
+    format: SeqsFormat = Query(SeqsFormat.JSON),
+    fields: Optional[List[SeqField]] = fields_query,
+):
+    if format == SeqsFormat.FASTA and fields is not None:
+        raise HTTPException(
+            HTTP_422_UNPROCESSABLE_ENTITY, "fields cannot be combined with fasta"
+        )
+    seqs = Seq.chunk(id, after, limit, max_bytes, fields)
+    if len(seqs) == 0:
+        return Response(status_code=HTTP_204_NO_CONTENT)
+    if format == SeqsFormat.FASTA:
+        return PlainTextResponse(seqs.fasta(), media_type=format.media_type)
+    return TrustedJSONResponse(seqs, projected=fields is not None)
 
 
 @router.get(
@@ -170,8 +239,54 @@ async def get_next_sequence_of_scan(
     responses=responses,
     name="scans:get-products-of-scan",
 )
-async def get_products_of_scan(id: int = Path(..., gt=0)):
-    return DoneScan.get(id, ScanIDType.SCAN_ID).prods()
+async def get_products_of_scan(
+    id: int = Path(..., gt=0), fields: Optional[List[ProdField]] = fields_query
+):
+    scan = DoneScan.get(id, ScanIDType.SCAN_ID)
+    return TrustedJSONResponse(
+        scan.prods(fields), headers=completeness(scan), projected=fields is not None
+    )
+
+
+@router.post(
+    "/scans/{id}/prods/",
+    summary="append products to scan",
+    response_model=ProdsAdded,
+    status_code=HTTP_201_CREATED,
+    responses=responses,
+    name="scans:append-products-to-scan",
+    dependencies=[Depends(auth_request)],
+)
+async def append_products_to_scan(
+    id: int = Path(..., gt=0),
+    prods_file: UploadFile = File(
+        ..., content_type="text/tab-separated-values", description="file of products"
+    ),
+):
+    Scan.get(id, ScanIDType.SCAN_ID)
+    path = storage.temp_path()
+    try:
+        async with aiofiles.open(path, "wb") as file:
+            while content := await prods_file.read(4 * 1024 * 1024):
+                await file.write(content)
+        added = Prod.add_file(path, id)
+    finally:
+        os.unlink(path)
+    return TrustedJSONResponse(added, HTTP_201_CREATED)
+
+
+@router.get(
+    "/scans/{id}/prods/count",
+    summary="get product count of scan",
+    response_model=Count,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="scans:get-product-count-of-scan",
+)
+async def get_product_count_of_scan(id: int = Path(..., gt=0)):
+    scan = Scan.get(id, ScanIDType.SCAN_ID)
+    count = Count(count=scan.prod_count())
+    return TrustedJSONResponse(count, headers=completeness(scan))
 
 
 @router.get(
@@ -196,6 +311,38 @@ async def download_products_of_scan(id: int = Path(..., gt=0)):
     )
 
 
+@router.get(
+    "/scans/{id}/prods/export",
+    summary="export products of scan in columnar format",
+    response_class=StreamingResponse,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="scans:export-products-of-scan",
+)
+async def export_products_of_scan(
+    id: int = Path(..., gt=0),
+    format: Optional[ExportFormat] = Query(
+        None, description="defaults to arrow if pyarrow is installed, tsv otherwise"
+    ),
+    fields: Optional[List[ProdField]] = fields_query,
+    batch_size: int = Query(65536, gt=0),
+):
+    if format is None:
+        format = ExportFormat.ARROW if arrow_available() else ExportFormat.TSV
+    if format != ExportFormat.TSV and not arrow_available():
+        raise HTTPException(HTTP_406_NOT_ACCEPTABLE, "pyarrow is not installed")
+
+    scan = DoneScan.get(id, ScanIDType.SCAN_ID)
+    export = ProdsExport(id, fields, batch_size)
+    filename = f"{id}_prods.{format.extension}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(
+        export.stream(format),
+        media_type=format.media_type,
+        headers={**headers, **completeness(scan)},
+    )
+
+
 @router.get(
     "/scans/{id}/prods/gff",
     summary="get products of scan as gff",
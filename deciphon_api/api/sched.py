@@ -1,10 +1,14 @@
-from deciphon_sched.sched import sched_wipe
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from starlette.status import HTTP_200_OK
 
 from deciphon_api.api.authentication import auth_request
 from deciphon_api.api.responses import responses
+from deciphon_api.core.cache import clear_caches
+from deciphon_api.core.counts import clear_counts
+from deciphon_api.core.leases import job_leases
+from deciphon_api.core.sched import sched_wipe
+from deciphon_api.models.job import pend_queue, progress_buffer
 from deciphon_api.models.sched_health import SchedHealth
 
 router = APIRouter()
@@ -21,6 +25,11 @@ router = APIRouter()
 )
 async def wipe():
     sched_wipe()
+    clear_counts()
+    clear_caches()
+    job_leases.clear()
+    pend_queue.clear()
+    progress_buffer.clear()
     return JSONResponse([])
 
 
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Path
+from typing import List, Optional
+
+from fastapi import APIRouter, Path, Query
 from starlette.status import HTTP_200_OK
 
 from deciphon_api.api.responses import responses
-from deciphon_api.models.seq import Seq, Seqs
+from deciphon_api.core.responses import TrustedJSONResponse
+from deciphon_api.models.seq import Seq, SeqField, Seqs
 
 router = APIRouter()
 
+fields_query = Query(None, description="fields to include (id is always included)")
+
 
 @router.get(
     "/seqs",
@@ -15,8 +20,9 @@ router = APIRouter()
     responses=responses,
     name="seqs:get-sequence-list",
 )
-async def get_sequence_list():
-    return Seq.get_list()
+async def get_sequence_list(fields: Optional[List[SeqField]] = fields_query):
+    seqs = Seq.get_list(fields)
+    return TrustedJSONResponse(seqs, projected=fields is not None)
 
 
 @router.get(
@@ -27,5 +33,8 @@ async def get_sequence_list():
     responses=responses,
     name="seqs:get-sequence",
 )
-async def get_sequence(seq_id: int = Path(..., gt=0)):
-    return Seq.get(seq_id)
+async def get_sequence(
+    seq_id: int = Path(..., gt=0), fields: Optional[List[SeqField]] = fields_query
+):
+    seq = Seq.get(seq_id, fields)
+    return TrustedJSONResponse(seq, projected=fields is not None)
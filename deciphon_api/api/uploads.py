@@ -0,0 +1,90 @@
+from typing import Union
+
+from fastapi import APIRouter, Body, Depends, Path, Query, Request
+from fastapi.responses import JSONResponse
+from starlette.status import HTTP_200_OK, HTTP_201_CREATED
+
+from deciphon_api.api.authentication import auth_request
+from deciphon_api.api.responses import responses
+from deciphon_api.core.responses import TrustedJSONResponse
+from deciphon_api.models.db import DB
+from deciphon_api.models.hmm import HMM
+from deciphon_api.models.upload import Upload, UploadPost
+
+router = APIRouter()
+
+
+@router.post(
+    "/uploads/",
+    summary="start a resumable upload",
+    response_model=Upload,
+    status_code=HTTP_201_CREATED,
+    responses=responses,
+    name="uploads:create-upload",
+    dependencies=[Depends(auth_request)],
+)
+async def create_upload(upload_post: UploadPost = Body(...)):
+    return TrustedJSONResponse(Upload.create(upload_post), HTTP_201_CREATED)
+
+
+@router.get(
+    "/uploads/{upload_id}",
+    summary="get upload progress",
+    response_model=Upload,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="uploads:get-upload",
+)
+async def get_upload(upload_id: str = Path(...)):
+    return TrustedJSONResponse(Upload.get(upload_id))
+
+
+@router.put(
+    "/uploads/{upload_id}",
+    summary="write a chunk of an upload",
+    response_model=Upload,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="uploads:write-upload-chunk",
+    dependencies=[Depends(auth_request)],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/octet-stream": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def write_upload_chunk(
+    request: Request,
+    upload_id: str = Path(...),
+    offset: int = Query(..., ge=0),
+):
+    upload = await Upload.write(upload_id, offset, request.stream())
+    return TrustedJSONResponse(upload)
+
+
+@router.post(
+    "/uploads/{upload_id}/finalize",
+    summary="verify an upload and submit its hmm or db",
+    response_model=Union[HMM, DB],
+    status_code=HTTP_201_CREATED,
+    responses=responses,
+    name="uploads:finalize-upload",
+    dependencies=[Depends(auth_request)],
+)
+async def finalize_upload(upload_id: str = Path(...)):
+    return TrustedJSONResponse(await Upload.finalize(upload_id), HTTP_201_CREATED)
+
+
+@router.delete(
+    "/uploads/{upload_id}",
+    summary="abort an upload",
+    response_class=JSONResponse,
+    status_code=HTTP_200_OK,
+    responses=responses,
+    name="uploads:remove-upload",
+    dependencies=[Depends(auth_request)],
+)
+async def remove_upload(upload_id: str = Path(...)):
+    Upload.remove(upload_id)
+    return JSONResponse({})
@@ -46,7 +46,7 @@ def start(
         exe.name,
         "deciphon_api.main:app",
         "--workers",
-        "1",
+        str(settings.workers),
         "--worker-class",
         "uvicorn.workers.UvicornWorker",
         "--bind",
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from itertools import count
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Iterable, List, TypeVar
+
+from deciphon_api.core.metrics import registry
+
+__all__ = ["RecordCache", "db_cache", "hmm_cache", "scan_cache", "clear_caches"]
+
+T = TypeVar("T")
+
+cache_hits = registry.counter(
+    "deciphon_cache_hits_total", "Metadata cache hits.", ["cache"]
+)
+cache_misses = registry.counter(
+    "deciphon_cache_misses_total", "Metadata cache misses.", ["cache"]
+)
+
+
+class RecordCache:
+    def __init__(
+        self, name: str, keys: Callable[[Any], Iterable[Hashable]], maxsize: int = 4096
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self._keys = keys
+        self._records: "OrderedDict[int, Any]" = OrderedDict()
+        self._index: Dict[Hashable, int] = {}
+        self._aliases: Dict[int, List[Hashable]] = {}
+        self._slots = count()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, key: Hashable, load: Callable[[], T]) -> T:
+        with self._lock:
+            slot = self._index.get(key)
+            if slot is not None:
+                self._records.move_to_end(slot)
+                cache_hits.inc(cache=self.name)
+                return self._records[slot]
+
+        cache_misses.inc(cache=self.name)
+        record = load()
+        self._put(record)
+        return record
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            slot = self._index.get(key)
+            if slot is not None:
+                self._evict(slot)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._index.clear()
+            self._aliases.clear()
+
+    def _put(self, record):
+        if self.maxsize <= 0:
+            return
+        aliases = list(self._keys(record))
+        with self._lock:
+            for key in aliases:
+                slot = self._index.get(key)
+                if slot is not None:
+                    self._evict(slot)
+            slot = next(self._slots)
+            self._records[slot] = record
+            self._aliases[slot] = aliases
+            for key in aliases:
+                self._index[key] = slot
+            while len(self._records) > self.maxsize:
+                self._evict(next(iter(self._records)))
+
+    def _evict(self, slot: int):
+        self._records.pop(slot, None)
+        for key in self._aliases.pop(slot, []):
+            if self._index.get(key) == slot:
+                del self._index[key]
+
+
+def _db_keys(db):
+    return [
+        ("db_id", db.id),
+        ("xxh3", db.xxh3),
+        ("filename", db.filename),
+        ("hmm_id", db.hmm_id),
+    ]
+
+
+def _hmm_keys(hmm):
+    return [
+        ("hmm_id", hmm.id),
+        ("xxh3", hmm.xxh3),
+        ("filename", hmm.filename),
+        ("job_id", hmm.job_id),
+    ]
+
+
+def _scan_keys(scan):
+    return [("scan_id", scan.id), ("job_id", scan.job_id)]
+
+
+db_cache = RecordCache("db", _db_keys)
+hmm_cache = RecordCache("hmm", _hmm_keys)
+scan_cache = RecordCache("scan", _scan_keys)
+
+registry.gauge(
+    "deciphon_cache_records",
+    "Records held by the metadata cache.",
+    ["cache"],
+    collect=lambda: {(x.name,): len(x) for x in (db_cache, hmm_cache, scan_cache)},
+)
+
+
+def clear_caches(maxsize: int = -1):
+    for cache in (db_cache, hmm_cache, scan_cache):
+        cache.clear()
+        if maxsize >= 0:
+            cache.maxsize = maxsize
@@ -0,0 +1,69 @@
+import gzip
+import shutil
+from enum import Enum
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, cast
+
+try:
+    import zstandard  # pyright: ignore[reportMissingImports]
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+__all__ = ["Encoding", "accepts", "compress_file", "decompressed_chunks"]
+
+chunk_size = 1024 * 1024
+
+
+class Encoding(str, Enum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+    @property
+    def suffix(self) -> str:
+        return {Encoding.GZIP: ".gz", Encoding.ZSTD: ".zst"}[self]
+
+    def available(self) -> bool:
+        return self != Encoding.ZSTD or zstandard is not None
+
+
+def accepts(accept_encoding: Optional[str], encoding: Encoding) -> bool:
+    qualities: Dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        name, *params = [x.strip() for x in item.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    return qualities.get(encoding.value, qualities.get("*", 0.0)) > 0
+
+
+def compress_file(src: Path, dst: Path, encoding: Encoding):
+    with open(src, "rb") as fin, _writer(dst, encoding) as fout:
+        shutil.copyfileobj(fin, fout, chunk_size)
+
+
+def decompressed_chunks(path: Path, encoding: Encoding) -> Iterator[bytes]:
+    with _reader(path, encoding) as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+def _writer(path: Path, encoding: Encoding) -> BinaryIO:
+    if encoding == Encoding.GZIP:
+        return cast(BinaryIO, gzip.GzipFile(path, "wb", compresslevel=6, mtime=0))
+    assert zstandard is not None
+    cctx = zstandard.ZstdCompressor(level=10)
+    return cctx.stream_writer(open(path, "wb"), closefd=True)
+
+
+def _reader(path: Path, encoding: Encoding) -> BinaryIO:
+    if encoding == Encoding.GZIP:
+        return cast(BinaryIO, gzip.GzipFile(path, "rb"))
+    assert zstandard is not None
+    dctx = zstandard.ZstdDecompressor()
+    return dctx.stream_reader(open(path, "rb"), closefd=True)
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, Hashable, Iterable, Set
+
+__all__ = [
+    "CountTable",
+    "KeyTable",
+    "seq_counts",
+    "prod_counts",
+    "job_counts",
+    "prod_keys",
+    "clear_counts",
+]
+
+
+# Seeds are scheduler calls, which take the scheduler lock, and that lock runs
+# clear_counts while held. Seeding therefore happens outside the table lock and
+# its result is kept only if nothing changed the table meanwhile.
+
+
+class CountTable:
+    def __init__(self):
+        self._counts: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self._lock = Lock()
+
+    def get(self, key: Hashable, seed: Callable[[], int]) -> int:
+        with self._lock:
+            if key in self._counts:
+                return self._counts[key]
+            epoch = self._epoch
+        value = seed()
+        with self._lock:
+            if self._epoch != epoch:
+                return value
+            return self._counts.setdefault(key, value)
+
+    def set(self, key: Hashable, value: int):
+        with self._lock:
+            self._counts[key] = value
+
+    def increment(self, key: Hashable, delta: int = 1):
+        with self._lock:
+            self._epoch += 1
+            if key in self._counts:
+                self._counts[key] += delta
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._epoch += 1
+            self._counts.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._counts.clear()
+
+
+class KeyTable:
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._keys: "OrderedDict[Hashable, Set[Hashable]]" = OrderedDict()
+        self._epoch = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(
+        self, key: Hashable, item: Hashable, seed: Callable[[], Iterable[Hashable]]
+    ) -> bool:
+        while True:
+            with self._lock:
+                if key in self._keys:
+                    self._keys.move_to_end(key)
+                    if item in self._keys[key]:
+                        return False
+                    self._keys[key].add(item)
+                    return True
+                epoch = self._epoch
+            keys = set(seed())
+            with self._lock:
+                if self._epoch == epoch and key not in self._keys:
+                    self._keys[key] = keys
+                    while len(self._keys) > self.maxsize:
+                        self._keys.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._epoch += 1
+            self._keys.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._keys.clear()
+
+
+seq_counts = CountTable()
+prod_counts = CountTable()
+job_counts = CountTable()
+prod_keys = KeyTable()
+
+
+def clear_counts():
+    seq_counts.clear()
+    prod_counts.clear()
+    job_counts.clear()
+    prod_keys.clear()
@@ -10,6 +10,7 @@ from pydantic import BaseModel, ValidationError
 from starlette.status import (
     HTTP_404_NOT_FOUND,
     HTTP_406_NOT_ACCEPTABLE,
+    HTTP_409_CONFLICT,
     HTTP_418_IM_A_TEAPOT,
     HTTP_422_UNPROCESSABLE_ENTITY,
 )
@@ -18,18 +19,53 @@ from deciphon_api.core.rc import RC
 
 __all__ = [
     "ErrorResponse",
+    "FileNameInUseError",
+    "InvalidFileNameError",
     "InvalidTypeError",
+    "JobNotRunningError",
+    "ProdsFileError",
+    "ScanMismatchError",
     "sched_error_handler",
     "http422_error_handler",
     "http_error_handler",
 ]
 
 
+class InvalidFileNameError(HTTPException):
+    def __init__(self, filename: str):
+        msg = f"Invalid file name {filename!r}"
+        super().__init__(HTTP_422_UNPROCESSABLE_ENTITY, msg)
+
+
 class InvalidTypeError(HTTPException):
     def __init__(self, expected_type: str):
         super().__init__(HTTP_406_NOT_ACCEPTABLE, f"Expected {expected_type} type")
 
 
+class FileNameInUseError(HTTPException):
+    def __init__(self, filename: str):
+        msg = f"File name {filename} is in use by other content"
+        super().__init__(HTTP_409_CONFLICT, msg)
+
+
+class JobNotRunningError(HTTPException):
+    def __init__(self, job_id: int, state: str):
+        msg = f"Job {job_id} is in {state} state, not run"
+        super().__init__(HTTP_409_CONFLICT, msg)
+
+
+class ProdsFileError(HTTPException):
+    def __init__(self, reason: str):
+        msg = f"Malformed products file: {reason}"
+        super().__init__(HTTP_422_UNPROCESSABLE_ENTITY, msg)
+
+
+class ScanMismatchError(HTTPException):
+    def __init__(self, expected: int, actual: int):
+        msg = f"Expected products of scan {expected}, got scan {actual}"
+        super().__init__(HTTP_422_UNPROCESSABLE_ENTITY, msg)
+
+
 def truncate(msg: str):
     limit = int(lib.SCHED_JOB_ERROR_SIZE)
     return (msg[: limit - 3] + "...") if len(msg) > limit else msg
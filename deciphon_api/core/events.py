@@ -1,19 +1,60 @@
+from pathlib import Path
 from typing import Callable
 
-from deciphon_sched.sched import sched_cleanup, sched_init
 from loguru import logger
 
+from deciphon_api.core.cache import clear_caches
+from deciphon_api.core.counts import clear_counts
+from deciphon_api.core.leases import Reaper, job_leases
+from deciphon_api.core.sched import call_log, sched_cleanup, sched_init, sched_lock
 from deciphon_api.core.settings import Settings
+from deciphon_api.core.storage import storage
+from deciphon_api.core.wakeup import pend_waiters
+from deciphon_api.models.job import Job, pend_queue, progress_buffer
+from deciphon_api.models.upload import upload_sessions
 
 __all__ = ["create_start_handler", "create_stop_handler"]
 
+reaper = Reaper(Job.reap)
+upload_reaper = Reaper(upload_sessions.sweep)
+
+sched_lock.on_change(clear_counts)
+sched_lock.on_change(clear_caches)
+
 
 def create_start_handler(
     settings: Settings,
 ) -> Callable:
     async def start_app() -> None:
         logger.info("Starting scheduler")
-        sched_init(str(settings.sched_filename))
+        if settings.storage_dir is not None:
+            settings.storage_dir = settings.storage_dir.resolve()
+            settings.storage_dir.mkdir(parents=True, exist_ok=True)
+        storage.root = settings.storage_dir or Path.cwd()
+        sched_file = Path(settings.sched_filename).resolve()
+        if settings.hmm_compression is not None:
+            if not settings.hmm_compression.available():
+                raise RuntimeError("zstandard is required for zstd compression")
+        storage.compression = settings.hmm_compression
+        upload_sessions.ttl = settings.upload_ttl
+        upload_sessions.max_size = settings.max_upload_size
+        upload_sessions.sweep()
+        sched_lock.open(f"{sched_file}.lock")
+        call_log.threshold = settings.slow_sched_call
+        if settings.workers > 1:
+            job_leases.share(Path(f"{sched_file}.leases"))
+            pend_queue.share(Path(f"{sched_file}.queue"))
+            pend_waiters.recheck = 1.0
+        sched_init(str(sched_file))
+        clear_counts()
+        clear_caches(settings.metadata_cache_size)
+        if settings.workers == 1:
+            progress_buffer.start(settings.progress_flush_interval)
+        job_leases.ttl = settings.job_lease_ttl
+        pend_queue.weights = settings.fair_share_weights
+        Job.restore()
+        reaper.start(settings.lease_reap_interval)
+        upload_reaper.start(settings.upload_sweep_interval)
 
     return start_app
 
@@ -21,6 +62,10 @@ def create_start_handler(
 def create_stop_handler() -> Callable:
     @logger.catch
     async def stop_app() -> None:
+        await reaper.stop()
+        await upload_reaper.stop()
+        await progress_buffer.stop()
         sched_cleanup()
+        sched_lock.close()
 
     return stop_app
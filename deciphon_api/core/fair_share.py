@@ -0,0 +1,243 @@
+import dataclasses
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+__all__ = ["FairQueue", "WaitStats"]
+
+
+@dataclasses.dataclass
+class WaitStats:
+    pending: int = 0
+    started: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.started if self.started > 0 else 0.0
+
+
+class _Tenant:
+    def __init__(self):
+        self.jobs: Dict[int, float] = {}
+        self.pass_: float = 0.0
+
+
+class FairQueue:
+    # Shared queues keep an append-only log of operations. Each process
+    # replays only what was appended since its last look, and the log is
+    # compacted into a snapshot once it holds many more entries than jobs.
+    def __init__(self, levels: Iterable[Hashable]):
+        self.levels = list(levels)
+        self.weights: Dict[str, float] = {}
+        self._path: Optional[Path] = None
+        self._token: Optional[bytes] = None
+        self._offset = 0
+        self._entries = 0
+        self._journal: Optional[List[List[Any]]] = None
+        self._lock = Lock()
+        self._reset()
+
+    @property
+    def shared(self) -> bool:
+        return self._path is not None
+
+    def share(self, path: Path):
+        with self._lock:
+            self._path = path
+            self._token = None
+            self._offset = 0
+            self._entries = 0
+
+    def __len__(self) -> int:
+        with self._locked(write=False):
+            return len(self._where)
+
+    def push(self, job_id: int, level: Hashable, tenant: str = ""):
+        with self._locked():
+            if job_id not in self._where:
+                level_idx = self.levels.index(level)
+                self._record(["push", job_id, level_idx, tenant, time.time()])
+
+    def peek(self) -> Optional[int]:
+        with self._locked(write=False):
+            for level in self.levels:
+                active = [x for x in self._tenants[level].values() if len(x.jobs) > 0]
+                if len(active) > 0:
+                    tenant = min(active, key=lambda x: (x.pass_, next(iter(x.jobs))))
+                    return next(iter(tenant.jobs))
+            return None
+
+    def started(self, job_id: int):
+        with self._locked():
+            if job_id in self._where:
+                self._record(["start", job_id, time.time()])
+
+    def discard(self, job_id: int):
+        with self._locked():
+            if job_id in self._where:
+                self._record(["drop", job_id])
+
+    def retain(self, job_ids: Iterable[int]):
+        keep = set(job_ids)
+        with self._locked():
+            for job_id in [x for x in self._where if x not in keep]:
+                self._record(["drop", job_id])
+
+    def stats(self) -> List[Tuple[Hashable, WaitStats]]:
+        with self._locked(write=False):
+            return [(x, dataclasses.replace(self._stats[x])) for x in self.levels]
+
+    def clear(self):
+        with self._locked():
+            self._record(["clear"])
+
+    def _reset(self):
+        self._tenants: Dict[Hashable, Dict[str, _Tenant]] = {x: {} for x in self.levels}
+        self._where: Dict[int, Tuple[Hashable, str]] = {}
+        self._vtime: Dict[Hashable, float] = {x: 0.0 for x in self.levels}
+        self._stats: Dict[Hashable, WaitStats] = {x: WaitStats() for x in self.levels}
+
+    def _record(self, op: List[Any]):
+        self._apply(op)
+        if self._journal is not None:
+            self._journal.append(op)
+
+    def _apply(self, op: List[Any]):
+        kind = op[0]
+        if kind == "push":
+            _, job_id, level_idx, tenant, enqueued = op
+            level = self.levels[level_idx]
+            tenants = self._tenants[level]
+            if tenant not in tenants:
+                tenants[tenant] = _Tenant()
+            entry = tenants[tenant]
+            if len(entry.jobs) == 0:
+                entry.pass_ = max(entry.pass_, self._vtime[level])
+            entry.jobs[job_id] = enqueued
+            self._where[job_id] = (level, tenant)
+            self._stats[level].pending += 1
+        elif kind == "start":
+            _, job_id, now = op
+            popped = self._pop(job_id)
+            if popped is None:
+                return
+            level, tenant, enqueued = popped
+            served = self._tenants[level][tenant]
+            self._vtime[level] = served.pass_
+            served.pass_ += 1 / self.weights.get(tenant, 1.0)
+            wait = max(now - enqueued, 0.0)
+            stats = self._stats[level]
+            stats.started += 1
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+        elif kind == "drop":
+            self._pop(op[1])
+        elif kind == "clear":
+            self._reset()
+        elif kind == "load":
+            self._reset()
+            self._restore(op[1])
+
+    def _pop(self, job_id: int) -> Optional[Tuple[Hashable, str, float]]:
+        if job_id not in self._where:
+            return None
+        level, tenant = self._where.pop(job_id)
+        enqueued = self._tenants[level][tenant].jobs.pop(job_id)
+        self._stats[level].pending -= 1
+        return level, tenant, enqueued
+
+    @contextmanager
+    def _locked(self, write: bool = True) -> Iterator[None]:
+        with self._lock:
+            if self._path is None:
+                yield
+                return
+            with open(f"{self._path}.lock", "a") as file:
+                fcntl.flock(file, fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+                self._replay(self._path)
+                if not write:
+                    yield
+                    return
+                self._journal = []
+                try:
+                    yield
+                finally:
+                    journal, self._journal = self._journal, None
+                    if len(journal) > 0:
+                        self._append(self._path, journal)
+
+    def _replay(self, path: Path):
+        try:
+            with open(path, "rb") as file:
+                token = file.readline()
+                if token != self._token:
+                    self._reset()
+                    self._token = token
+                    self._offset = len(token)
+                    self._entries = 0
+                file.seek(self._offset)
+                data = file.read()
+        except FileNotFoundError:
+            self._reset()
+            self._token = None
+            self._offset = 0
+            self._entries = 0
+            return
+
+        data = data[: data.rfind(b"\n") + 1]
+        for line in data.splitlines():
+            self._apply(json.loads(line))
+            self._entries += 1
+        self._offset += len(data)
+
+    def _append(self, path: Path, ops: List[List[Any]]):
+        if self._token is None or self._entries > max(1024, 2 * len(self._where)):
+            self._compact(path)
+            return
+        data = b"".join(json.dumps(x).encode() + b"\n" for x in ops)
+        with open(path, "r+b") as file:
+            file.seek(self._offset)
+            file.write(data)
+            file.truncate()
+        self._offset += len(data)
+        self._entries += len(ops)
+
+    def _compact(self, path: Path):
+        levels: List[Dict[str, Any]] = []
+        for level in self.levels:
+            tenants = {
+                name: {"pass": x.pass_, "jobs": list(x.jobs.items())}
+                for name, x in self._tenants[level].items()
+            }
+            stats = dataclasses.asdict(self._stats[level])
+            levels.append(
+                {"vtime": self._vtime[level], "stats": stats, "tenants": tenants}
+            )
+
+        token = os.urandom(8).hex().encode() + b"\n"
+        data = token + json.dumps(["load", levels]).encode() + b"\n"
+        staged = path.with_name(f".{path.name}")
+        with open(staged, "wb") as file:
+            file.write(data)
+        os.replace(staged, path)
+        self._token = token
+        self._offset = len(data)
+        self._entries = 1
+
+    def _restore(self, levels: List[Dict[str, Any]]):
+        for level, data in zip(self.levels, levels):
+            self._vtime[level] = data["vtime"]
+            self._stats[level] = WaitStats(**data["stats"])
+            for name, tenant in data["tenants"].items():
+                entry = self._tenants[level][name] = _Tenant()
+                entry.pass_ = tenant["pass"]
+                for job_id, enqueued in tenant["jobs"]:
+                    entry.jobs[job_id] = enqueued
+                    self._where[job_id] = (level, name)
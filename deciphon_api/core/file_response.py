@@ -0,0 +1,253 @@
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_206_PARTIAL_CONTENT,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+)
+from starlette.types import Receive, Scope, Send
+
+from deciphon_api.core.compression import Encoding, decompressed_chunks
+
+__all__ = [
+    "DecodedFileResponse",
+    "RangeFileResponse",
+    "RangeNotSatisfiable",
+    "encoded_file_response",
+    "etag_of",
+    "etag_matches",
+    "parse_range",
+]
+
+
+def etag_of(xxh3: int) -> str:
+    return f'"{xxh3 & 0xFFFFFFFFFFFFFFFF:016x}"'
+
+
+def etag_matches(value: str, etag: str) -> bool:
+    tags = [x.strip() for x in value.split(",")]
+    return "*" in tags or etag in [x.removeprefix("W/") for x in tags]
+
+
+def modified_since(value: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return True
+    return int(mtime) > since
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if sep != "-":
+        return None
+
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return (max(size - length, 0), size - 1)
+
+        start = int(first)
+        end = int(last) if last != "" else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start < 0 or end < start:
+        return None
+    return (start, min(end, size - 1))
+
+
+class RangeFileResponse(Response):
+    chunk_size = 4 * 1024 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        etag: str,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+    ):
+        self.path = path
+        self.etag = etag
+        self.status_code = HTTP_200_OK
+        self.media_type = media_type
+        self.background = background
+        self.init_headers()
+        self.headers.setdefault("accept-ranges", "bytes")
+        self.headers.setdefault("etag", etag)
+        if filename is not None:
+            self.headers.setdefault("content-disposition", _disposition(filename))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stat = os.stat(self.path)
+        size = stat.st_size
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.headers.setdefault("last-modified", last_modified)
+
+        request = Headers(scope=scope)
+        start, end = 0, size - 1
+
+        if not self._modified(request, stat.st_mtime):
+            self.status_code = HTTP_304_NOT_MODIFIED
+            await self._send_start(send)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        try:
+            byte_range = self._byte_range(request, size, last_modified)
+        except RangeNotSatisfiable:
+            self.status_code = HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+            self.headers["content-range"] = f"bytes */{size}"
+            self.headers["content-length"] = "0"
+            await self._send_start(send)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if byte_range is not None:
+            start, end = byte_range
+            self.status_code = HTTP_206_PARTIAL_CONTENT
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+        self.headers["content-length"] = str(end - start + 1)
+        await self._send_start(send)
+
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+        else:
+            await self._send_file(send, start, end - start + 1)
+
+        if self.background is not None:
+            await self.background()
+
+    def _modified(self, request: Headers, mtime: float) -> bool:
+        if_none_match = request.get("if-none-match")
+        if if_none_match is not None:
+            return not etag_matches(if_none_match, self.etag)
+
+        if_modified_since = request.get("if-modified-since")
+        if if_modified_since is not None:
+            return modified_since(if_modified_since, mtime)
+
+        return True
+
+    def _byte_range(
+        self, request: Headers, size: int, last_modified: str
+    ) -> Optional[Tuple[int, int]]:
+        value = request.get("range")
+        if value is None:
+            return None
+
+        if_range = request.get("if-range")
+        if if_range is not None and if_range not in (self.etag, last_modified):
+            return None
+
+        return parse_range(value, size)
+
+    async def _send_start(self, send: Send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+
+    async def _send_file(self, send: Send, offset: int, length: int):
+        async with aiofiles.open(self.path, mode="rb") as file:
+            await file.seek(offset)
+            remaining = length
+            more_body = True
+            while more_body:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining -= len(chunk)
+                more_body = remaining > 0 and len(chunk) > 0
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": more_body,
+                    }
+                )
+
+
+def encoded_file_response(
+    path: str,
+    encoding: Encoding,
+    etag: str,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+) -> RangeFileResponse:
+    encoded_etag = f'{etag[:-1]}-{encoding.value}"'
+    response = RangeFileResponse(path, encoded_etag, media_type, filename)
+    response.headers["content-encoding"] = encoding.value
+    response.headers["vary"] = "Accept-Encoding"
+    return response
+
+
+class DecodedFileResponse(RangeFileResponse):
+    def __init__(
+        self,
+        path: str,
+        encoding: Encoding,
+        etag: str,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+    ):
+        super().__init__(path, etag, media_type, filename)
+        self.encoding = encoding
+        self.headers["accept-ranges"] = "none"
+        self.headers["vary"] = "Accept-Encoding"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stat = os.stat(self.path)
+        self.headers.setdefault("last-modified", formatdate(stat.st_mtime, usegmt=True))
+
+        if not self._modified(Headers(scope=scope), stat.st_mtime):
+            self.status_code = HTTP_304_NOT_MODIFIED
+        await self._send_start(send)
+
+        if (
+            self.status_code == HTTP_304_NOT_MODIFIED
+            or scope["method"].upper() == "HEAD"
+        ):
+            await send({"type": "http.response.body", "body": b""})
+        else:
+            chunks = decompressed_chunks(Path(self.path), self.encoding)
+            async for chunk in iterate_in_threadpool(chunks):
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+            await send({"type": "http.response.body", "body": b""})
+
+        if self.background is not None:
+            await self.background()
+
+
+def _disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
@@ -0,0 +1,171 @@
+import secrets
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.routing import Match, Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from deciphon_api.core.metrics import Bound, registry
+
+__all__ = [
+    "LATENCY_BUCKETS",
+    "MetricsMiddleware",
+    "RequestTiming",
+    "request_id",
+    "request_timing",
+]
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+SIZE_BUCKETS = (100, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+
+requests_total = registry.counter(
+    "deciphon_http_requests_total",
+    "HTTP requests by route name, method and status.",
+    ["route", "method", "status"],
+)
+request_seconds = registry.histogram(
+    "deciphon_http_request_duration_seconds",
+    "HTTP request latency by route name.",
+    ["route"],
+    LATENCY_BUCKETS,
+)
+response_bytes = registry.histogram(
+    "deciphon_http_response_size_bytes",
+    "HTTP response body size by route name.",
+    ["route"],
+    SIZE_BUCKETS,
+)
+_in_flight: Dict[str, int] = {}
+
+
+class RequestTiming:
+    __slots__ = ("sched",)
+
+    def __init__(self):
+        self.sched = 0.0
+
+
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+request_timing: ContextVar[Optional[RequestTiming]] = ContextVar(
+    "request_timing", default=None
+)
+
+registry.gauge(
+    "deciphon_http_requests_in_flight",
+    "HTTP requests being served, by method.",
+    ["method"],
+    collect=lambda: {(k,): v for k, v in _in_flight.items()},
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Optional[Dict[Any, List[Route]]] = None
+        self._bound: Dict[Tuple[str, str, int], Tuple[Bound, Bound, Bound]] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+        length: Optional[int] = None
+        rid = ""
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                rid = value.decode("latin-1")
+        rid = rid or secrets.token_hex(8)
+        timing = RequestTiming()
+
+        async def send_wrapper(message: Message):
+            nonlocal status, size, length
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                for key, value in headers:
+                    if key.lower() == b"content-length":
+                        length = int(value)
+                elapsed = time.perf_counter() - start
+                headers.append((b"x-request-id", rid.encode("latin-1")))
+                headers.append((b"server-timing", _server_timing(elapsed, timing)))
+                message = dict(message, headers=headers)
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        _in_flight[method] = _in_flight.get(method, 0) + 1
+        rid_token = request_id.set(rid)
+        timing_token = request_timing.set(timing)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            request_timing.reset(timing_token)
+            request_id.reset(rid_token)
+            _in_flight[method] -= 1
+            if length is not None and method != "HEAD":
+                size = length
+            count, latency, response_size = self._metrics(scope, method, status)
+            count.inc()
+            latency.observe(elapsed)
+            response_size.observe(size)
+
+    def _metrics(self, scope: Scope, method: str, status: int):
+        route = self.route_name(scope)
+        key = (route, method, status)
+        if key not in self._bound:
+            self._bound[key] = (
+                requests_total.labels(route=route, method=method, status=str(status)),
+                request_seconds.labels(route=route),
+                response_bytes.labels(route=route),
+            )
+        return self._bound[key]
+
+    def route_name(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None or "app" not in scope:
+            return "unmatched"
+
+        if self._routes is None:
+            self._routes = {}
+            for route in scope["app"].routes:
+                if isinstance(route, Route):
+                    self._routes.setdefault(route.endpoint, []).append(route)
+
+        candidates = self._routes.get(endpoint, [])
+        if len(candidates) == 1:
+            return candidates[0].name
+        for route in candidates:
+            if route.matches(scope)[0] == Match.FULL:
+                return route.name
+        return "unmatched"
+
+
+# Server-Timing goes out with http.response.start, so it covers only the work
+# done before the first byte. Scheduler calls made while a body streams (scan
+# exports, GFF output, job event streams) are missing from the header; they
+# still reach the call histograms and the slow-call log.
+def _server_timing(elapsed: float, timing: RequestTiming) -> bytes:
+    sched = timing.sched * 1000
+    python = max(elapsed * 1000 - sched, 0)
+    return f"sched;dur={sched:.3f}, python;dur={python:.3f}".encode()
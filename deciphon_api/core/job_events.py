@@ -0,0 +1,86 @@
+import asyncio
+import dataclasses
+from typing import Any, AsyncIterator, Iterable, Optional, Set
+
+__all__ = ["JobEvent", "JobEventBus", "Subscription", "job_events"]
+
+
+@dataclasses.dataclass
+class JobEvent:
+    kind: str
+    job: Any
+
+    def sse(self) -> bytes:
+        return f"event: {self.kind}\ndata: {self.job.json()}\n\n".encode()
+
+
+class Subscription:
+    def __init__(
+        self,
+        ids: Optional[Iterable[int]] = None,
+        states: Optional[Iterable[str]] = None,
+        maxsize: int = 1024,
+    ):
+        self.ids: Optional[Set[int]] = None if ids is None else set(ids)
+        self.states: Optional[Set[str]] = None if states is None else set(states)
+        self.queue: asyncio.Queue[JobEvent] = asyncio.Queue(maxsize)
+
+    def accepts(self, event: JobEvent) -> bool:
+        if self.ids is not None and event.job.id not in self.ids:
+            return False
+        if self.states is not None and event.job.state not in self.states:
+            return False
+        return True
+
+    def put(self, event: JobEvent):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class JobEventBus:
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+
+    @property
+    def active(self) -> bool:
+        return len(self._subscriptions) > 0
+
+    def subscribe(
+        self,
+        ids: Optional[Iterable[int]] = None,
+        states: Optional[Iterable[str]] = None,
+    ) -> Subscription:
+        subscription = Subscription(ids, states)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, kind: str, job: Any):
+        event = JobEvent(kind, job)
+        for subscription in self._subscriptions:
+            if subscription.accepts(event):
+                subscription.put(event)
+
+    async def stream(
+        self,
+        ids: Optional[Iterable[int]],
+        states: Optional[Iterable[str]],
+        heartbeat: float,
+    ) -> AsyncIterator[bytes]:
+        subscription = self.subscribe(ids, states)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+                    continue
+                yield event.sse()
+        finally:
+            self.unsubscribe(subscription)
+
+
+job_events = JobEventBus()
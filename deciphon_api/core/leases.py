@@ -0,0 +1,176 @@
+import asyncio
+import dataclasses
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Union
+
+from loguru import logger
+
+__all__ = ["Lease", "LeaseTable", "Reaper", "job_leases"]
+
+
+@dataclasses.dataclass
+class Lease:
+    worker: str
+    expires: float
+
+    def expires_in(self) -> float:
+        return max(self.expires - time.time(), 0.0)
+
+
+class LeaseTable:
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._store: Union[_MemoryStore, _FileStore] = _MemoryStore()
+
+    def share(self, directory: Path):
+        self._store = _FileStore(directory)
+
+    def __len__(self) -> int:
+        return len(self._store.items())
+
+    def get(self, job_id: int) -> Optional[Lease]:
+        with self._store.locked():
+            return self._store.load(job_id)
+
+    def grant(self, job_id: int, worker: str = "") -> Lease:
+        with self._store.locked():
+            lease = Lease(worker, time.time() + self.ttl)
+            self._store.save(job_id, lease)
+            return lease
+
+    def renew(self, job_id: int, worker: str = "") -> Optional[Lease]:
+        with self._store.locked():
+            lease = self._store.load(job_id)
+            if lease is None:
+                return None
+            if worker and lease.worker and worker != lease.worker:
+                return None
+            if worker:
+                lease.worker = worker
+            lease.expires = time.time() + self.ttl
+            self._store.save(job_id, lease)
+            return lease
+
+    def release(self, job_id: int) -> bool:
+        with self._store.locked():
+            return self._store.delete(job_id)
+
+    def release_expired(self, job_id: int) -> Optional[Lease]:
+        with self._store.locked():
+            lease = self._store.load(job_id)
+            if lease is None or lease.expires > time.time():
+                return None
+            self._store.delete(job_id)
+            return lease
+
+    def retain(self, job_ids: Iterable[int]):
+        keep = set(job_ids)
+        with self._store.locked():
+            for job_id in self._store.items():
+                if job_id not in keep:
+                    self._store.delete(job_id)
+
+    def expired(self) -> Dict[int, Lease]:
+        now = time.time()
+        with self._store.locked():
+            items = self._store.items()
+            return {k: v for k, v in items.items() if v.expires <= now}
+
+    def clear(self):
+        with self._store.locked():
+            for job_id in self._store.items():
+                self._store.delete(job_id)
+
+
+class _MemoryStore:
+    def __init__(self):
+        self._leases: Dict[int, Lease] = {}
+        self._lock = Lock()
+
+    def locked(self):
+        return self._lock
+
+    def load(self, job_id: int) -> Optional[Lease]:
+        lease = self._leases.get(job_id)
+        return None if lease is None else dataclasses.replace(lease)
+
+    def save(self, job_id: int, lease: Lease):
+        self._leases[job_id] = lease
+
+    def delete(self, job_id: int) -> bool:
+        return self._leases.pop(job_id, None) is not None
+
+    def items(self) -> Dict[int, Lease]:
+        return dict(self._leases)
+
+
+class _FileStore:
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        with self._lock, open(self.directory / ".lock", "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            yield
+
+    def load(self, job_id: int) -> Optional[Lease]:
+        try:
+            with open(self.directory / str(job_id), "r") as file:
+                return Lease(**json.load(file))
+        except FileNotFoundError:
+            return None
+
+    def save(self, job_id: int, lease: Lease):
+        staged = self.directory / f".{job_id}"
+        with open(staged, "w") as file:
+            json.dump(dataclasses.asdict(lease), file)
+        os.replace(staged, self.directory / str(job_id))
+
+    def delete(self, job_id: int) -> bool:
+        try:
+            os.unlink(self.directory / str(job_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def items(self) -> Dict[int, Lease]:
+        leases: Dict[int, Lease] = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.isdigit() and (lease := self.load(int(entry.name))):
+                leases[int(entry.name)] = lease
+        return leases
+
+
+class Reaper:
+    def __init__(self, reap: Callable[[], Any]):
+        self._reap = reap
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, interval: float):
+        if interval > 0:
+            self._task = asyncio.create_task(self._reap_periodically(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _reap_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self._reap()
+            except Exception:
+                logger.exception("failed to reap expired leases")
+
+
+job_leases = LeaseTable()
@@ -0,0 +1,239 @@
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from itertools import accumulate
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "Bound",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "registry",
+    "CONTENT_TYPE",
+]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    15.0,
+    30.0,
+    60.0,
+    300.0,
+    900.0,
+    1800.0,
+    3600.0,
+    7200.0,
+    21600.0,
+    86400.0,
+)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels[x]) for x in self.labelnames)
+
+    def _labels(self, key: Labels, extra: Iterable[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if len(pairs) == 0:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def labels(self, **labels: str) -> "Bound":
+        return Bound(self, self._key(labels))
+
+    @abstractmethod
+    def _record(self, key: Labels, value: float):
+        ...
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+    def render(self) -> str:
+        head = f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.kind}\n"
+        return head + "".join(x + "\n" for x in self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, value: float = 1.0, **labels: str):
+        self._record(self._key(labels), value)
+
+    def _record(self, key: Labels, value: float):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{self._labels(k)} {_number(v)}" for k, v in values]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Labels, float]]] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, value: float = 1.0, **labels: str):
+        self._record(self._key(labels), value)
+
+    def _record(self, key: Labels, value: float):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def samples(self) -> List[str]:
+        if self._collect is not None:
+            values = list(self._collect().items())
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f"{self.name}{self._labels(k)} {_number(v)}" for k, v in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        self._record(self._key(labels), value)
+
+    def _record(self, key: Labels, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._counts:
+                self._counts[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+            self._counts[key][index] += 1
+            self._sums[key] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            counts = {k: list(accumulate(v)) for k, v in self._counts.items()}
+            sums = dict(self._sums)
+        lines: List[str] = []
+        for key, buckets in counts.items():
+            for bound, count in zip(self.buckets, buckets):
+                labels = self._labels(key, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_number(sums[key])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {buckets[-1]}")
+        return lines
+
+
+class Bound:
+    __slots__ = ("metric", "key")
+
+    def __init__(self, metric: _Metric, key: Labels):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, value: float = 1.0):
+        self.metric._record(self.key, value)
+
+    def observe(self, value: float):
+        self.metric._record(self.key, value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        self._metrics[metric.name] = metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self.register(metric)
+        return metric
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Labels, float]]] = None,
+    ) -> Gauge:
+        metric = Gauge(name, help, labelnames, collect)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self.register(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(x.render() for x in self._metrics.values())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Metrics live in process memory: with `workers > 1` each server process keeps
+# its own counters and a scrape of /metrics reports whichever worker served it.
+registry = Registry()
@@ -0,0 +1,159 @@
+import cProfile
+import marshal
+import secrets
+import sys
+import threading
+from collections import Counter
+from enum import Enum
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = ["ProfileFormat", "ProfileMiddleware", "Sampler"]
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY = "profile"
+
+
+class ProfileFormat(str, Enum):
+    pstats = "pstats"
+    collapsed = "collapsed"
+
+    @property
+    def suffix(self) -> str:
+        return ".pstats" if self == ProfileFormat.pstats else ".folded"
+
+    @property
+    def media_type(self) -> str:
+        if self == ProfileFormat.pstats:
+            return "application/octet-stream"
+        return "text/plain; charset=utf-8"
+
+
+class Sampler:
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            names: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(
+                    f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def collapsed(self) -> bytes:
+        lines = (f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        return "".join(lines).encode()
+
+
+class ProfileMiddleware:
+    def __init__(self, app: ASGIApp, api_key: str, directory: Optional[Path] = None):
+        self.app = app
+        self.api_key = api_key
+        self.directory = directory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        fmt = self._requested(scope) if scope["type"] == "http" else None
+        if fmt is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        messages: List[Message] = []
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            messages.append(message)
+
+        # Both profilers watch the event loop thread, so requests served
+        # concurrently show up in the profile too.
+        if fmt == ProfileFormat.pstats:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+            profiler.create_stats()
+            body = marshal.dumps(profiler.stats)  # type: ignore[attr-defined]
+        else:
+            sampler = Sampler()
+            sampler.start()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                sampler.stop()
+            body = sampler.collapsed()
+
+        if self.directory is not None:
+            await self._store(fmt, body, messages, send)
+        else:
+            await self._attach(fmt, body, status, send)
+
+    def _requested(self, scope: Scope) -> Optional[ProfileFormat]:
+        headers = Headers(scope=scope)
+        value = headers.get(PROFILE_HEADER)
+        if value is None:
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            value = query.get(PROFILE_QUERY, [None])[0]
+        if value is None or headers.get("x-api-key") != self.api_key:
+            return None
+        try:
+            return ProfileFormat(value or ProfileFormat.pstats)
+        except ValueError:
+            return None
+
+    async def _attach(self, fmt: ProfileFormat, body: bytes, status: int, send: Send):
+        filename = f"profile{fmt.suffix}"
+        headers = [
+            (b"content-type", fmt.media_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+            (
+                b"content-disposition",
+                f'attachment; filename="{filename}"'.encode(),
+            ),
+            (b"x-profiled-status", str(status).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _store(
+        self,
+        fmt: ProfileFormat,
+        body: bytes,
+        messages: List[Message],
+        send: Send,
+    ):
+        assert self.directory is not None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        filename = f"{secrets.token_hex(8)}{fmt.suffix}"
+        (self.directory / filename).write_bytes(body)
+
+        for message in messages:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", filename.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
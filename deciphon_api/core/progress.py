@@ -0,0 +1,59 @@
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+
+from deciphon_sched.error import SchedError
+from loguru import logger
+
+__all__ = ["ProgressBuffer"]
+
+
+class ProgressBuffer:
+    def __init__(self, write: Callable[[int, int], None]):
+        self._write = write
+        self._pending: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._task is not None
+
+    def add(self, job_id: int, increment: int):
+        if not self.enabled:
+            self._write(job_id, increment)
+            return
+        self._pending[job_id] = min(self._pending.get(job_id, 0) + increment, 100)
+
+    def discard(self, job_id: int):
+        self._pending.pop(job_id, None)
+
+    def clear(self):
+        self._pending.clear()
+
+    def flush(self, job_id: Optional[int] = None):
+        items: List[Tuple[int, int]] = []
+        if job_id is None:
+            items = list(self._pending.items())
+            self._pending.clear()
+        elif job_id in self._pending:
+            items = [(job_id, self._pending.pop(job_id))]
+
+        for job_id, increment in items:
+            try:
+                self._write(job_id, increment)
+            except SchedError as error:
+                logger.warning(f"failed to add progress to job {job_id}: {error}")
+
+    def start(self, interval: float):
+        if interval > 0:
+            self._task = asyncio.create_task(self._flush_periodically(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.flush()
+
+    async def _flush_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
@@ -1,9 +1,11 @@
 import json
 import typing
 
-from fastapi.responses import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
 
-__all__ = ["PrettyJSONResponse"]
+__all__ = ["PrettyJSONResponse", "TrustedJSONResponse"]
 
 
 class PrettyJSONResponse(Response):
@@ -17,3 +19,23 @@ class PrettyJSONResponse(Response):
             indent=2,
             separators=(", ", ": "),
         ).encode("utf-8")
+
+
+class TrustedJSONResponse(JSONResponse):
+    def __init__(self, content: typing.Any, *args, projected: bool = False, **kwargs):
+        # Projected models are built from the requested fields only, so the
+        # fields left unset are the ones the client did not ask for.
+        self.projected = projected
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: typing.Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return self._render_model(content)
+        if isinstance(content, list) and all(isinstance(x, BaseModel) for x in content):
+            return b"[" + b",".join(self._render_model(x) for x in content) + b"]"
+        return super().render(jsonable_encoder(content, exclude_unset=self.projected))
+
+    def _render_model(self, model: BaseModel) -> bytes:
+        return model.json(
+            exclude_unset=self.projected, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
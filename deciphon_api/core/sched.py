@@ -0,0 +1,411 @@
+import fcntl
+import os
+import sqlite3
+import struct
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from threading import Lock, RLock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import cffi
+import deciphon_sched.db as db
+import deciphon_sched.hmm as hmm
+import deciphon_sched.job as job
+import deciphon_sched.prod as prod
+import deciphon_sched.scan as scan
+import deciphon_sched.sched as sched
+import deciphon_sched.seq as seq
+from deciphon_sched.cffi import ffi, lib
+from deciphon_sched.error import SchedError
+from deciphon_sched.rc import RC
+from loguru import logger
+
+from deciphon_api.core.instrumentation import (
+    LATENCY_BUCKETS,
+    request_id,
+    request_timing,
+)
+from deciphon_api.core.metrics import registry
+
+__all__ = [
+    "CallLog",
+    "SchedLock",
+    "call_log",
+    "sched_lock",
+    "sched_write",
+    "sched_init",
+    "sched_cleanup",
+    "sched_wipe",
+    "sched_health_check",
+    "sched_db_add",
+    "sched_db_remove",
+    "sched_db_get_by_id",
+    "sched_db_get_by_xxh3",
+    "sched_db_get_by_filename",
+    "sched_db_get_by_hmm_id",
+    "sched_db_get_all",
+    "sched_hmm_new",
+    "sched_hmm_get_by_id",
+    "sched_hmm_get_by_job_id",
+    "sched_hmm_get_by_xxh3",
+    "sched_hmm_get_by_filename",
+    "sched_hmm_get_all",
+    "sched_hmm_remove",
+    "sched_job_get_by_id",
+    "sched_job_next_pend",
+    "sched_job_get_all",
+    "sched_job_set_run",
+    "sched_job_set_fail",
+    "sched_job_set_done",
+    "sched_job_submit",
+    "sched_job_increment_progress",
+    "sched_job_remove",
+    "sched_prod_get_by_id",
+    "sched_prod_get_all",
+    "sched_prod_add_file",
+    "sched_scan_new",
+    "sched_scan_add_seq",
+    "sched_scan_get_by_id",
+    "sched_scan_get_by_job_id",
+    "sched_scan_get_seqs",
+    "sched_scan_get_prods",
+    "sched_scan_get_prods_into",
+    "sched_scan_seq_heads",
+    "sched_scan_seq_count",
+    "sched_scan_prod_count",
+    "sched_scan_seq_ids",
+    "sched_scan_get_all",
+    "sched_seq_new",
+    "sched_seq_get_by_id",
+    "sched_seq_get_all",
+    "sched_seq_scan_next",
+]
+
+# SQLite reports a busy database through this when a process outside this
+# lock protocol holds it. Statement failures also cover constraint errors,
+# so they are never retried.
+transient_rcs = {RC.SCHED_FAIL_BEGIN_TRANSACTION}
+
+max_retries = 8
+max_backoff = 0.1
+
+call_seconds = registry.histogram(
+    "deciphon_sched_call_duration_seconds",
+    "Time spent in each deciphon_sched call, including lock waits.",
+    ["function"],
+    LATENCY_BUCKETS,
+)
+result_size = registry.histogram(
+    "deciphon_sched_call_result_size",
+    "Records or bytes returned by each deciphon_sched call.",
+    ["function"],
+    (0, 1, 10, 100, 1e3, 1e4, 1e5),
+)
+
+
+class CallLog:
+    def __init__(self, threshold: float = 0.1):
+        self.threshold = threshold
+
+    def slow(
+        self,
+        name: str,
+        elapsed: float,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        size: int,
+    ):
+        rid = request_id.get()
+        summary = ", ".join(
+            [_summary(x) for x in args]
+            + [f"{k}={_summary(v)}" for k, v in kwargs.items()]
+        )
+        logger.bind(request_id=rid).warning(
+            f"[{rid}] slow {name}({summary}) took {elapsed * 1000:.1f} ms"
+            f" and returned {size}"
+        )
+
+
+call_log = CallLog()
+
+
+def _summary(value: Any) -> str:
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    text = repr(value)
+    return text if len(text) <= 40 else f"{text[:37]}..."
+
+
+def _size(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple, str, bytes)):
+        return len(result)
+    return 1
+
+
+class SchedLock:
+    def __init__(self):
+        self.path: Optional[str] = None
+        self._fd: Optional[int] = None
+        self._lock = RLock()
+        self._depth = 0
+        self._generation = 0
+        self._listeners: List[Callable[[], None]] = []
+
+    def open(self, path: str):
+        self.close()
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._generation = self._read_generation(self._fd)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def on_change(self, listener: Callable[[], None]):
+        self._listeners.append(listener)
+
+    def read(self):
+        return self._hold(fcntl.LOCK_SH)
+
+    def write(self):
+        return self._hold(fcntl.LOCK_EX)
+
+    @contextmanager
+    def _hold(self, operation: int) -> Iterator[None]:
+        with self._lock:
+            fd = self._fd if self._depth == 0 else None
+            if fd is not None:
+                fcntl.flock(fd, operation)
+                self.sync()
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if fd is not None:
+                    if operation == fcntl.LOCK_EX:
+                        self._generation += 1
+                        data = struct.pack("<Q", self._generation)
+                        os.pwrite(fd, data, 0)
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def sync(self):
+        if self._fd is None:
+            return
+        generation = self._read_generation(self._fd)
+        if generation != self._generation:
+            self._generation = generation
+            for listener in self._listeners:
+                listener()
+
+    @staticmethod
+    def _read_generation(fd: int) -> int:
+        data = os.pread(fd, 8, 0)
+        return struct.unpack("<Q", data)[0] if len(data) == 8 else 0
+
+
+sched_lock = SchedLock()
+
+
+def sched_write():
+    return sched_lock.write()
+
+
+def _timed(func: Callable) -> Callable:
+    name = func.__name__.lstrip("_")
+    seconds = call_seconds.labels(function=name)
+    sizes = result_size.labels(function=name)
+
+    @wraps(func)
+    def call(*args, **kwargs):
+        result = None
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            size = _size(result)
+            seconds.observe(elapsed)
+            sizes.observe(size)
+            timing = request_timing.get()
+            if timing is not None:
+                timing.sched += elapsed
+            if elapsed >= call_log.threshold:
+                call_log.slow(name, elapsed, args, kwargs, size)
+
+    return call
+
+
+def _call(func: Callable, write: bool, retry: bool = True) -> Callable:
+    @wraps(func)
+    def call(*args, **kwargs):
+        backoff = 0.001
+        retries = max_retries if retry else 0
+        for attempt in range(retries + 1):
+            try:
+                with sched_lock.write() if write else sched_lock.read():
+                    return func(*args, **kwargs)
+            except SchedError as error:
+                if error.rc not in transient_rcs or attempt == retries:
+                    raise
+            time.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+    return _timed(call)
+
+
+def _reader(func: Callable) -> Callable:
+    return _call(func, False)
+
+
+def _writer(func: Callable, retry: bool = True) -> Callable:
+    return _call(func, True, retry)
+
+
+_libc = cffi.FFI()
+_libc.cdef("size_t strlen(const char *);")
+_strlen: Callable[[Any], int] = getattr(_libc.dlopen(None), "strlen")
+
+
+class _RowCounter:
+    # The library has no count or id queries, so these are read from the
+    # scheduler file over a read-only connection instead of loading every row.
+    def __init__(self):
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = Lock()
+
+    def open(self, filename: str):
+        uri = f"{Path(filename).resolve().as_uri()}?mode=ro"
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def count(self, table: str, scan_id: int) -> int:
+        with self._lock:
+            if self._conn is None:
+                raise SchedError(RC.SCHED_FAIL_OPEN_SCHED_FILE)
+            sql = f"SELECT COUNT(*) FROM {table} WHERE scan_id = ?"
+            return int(self._conn.execute(sql, (scan_id,)).fetchone()[0])
+
+    def ids(self, table: str, scan_id: int) -> List[int]:
+        with self._lock:
+            if self._conn is None:
+                raise SchedError(RC.SCHED_FAIL_OPEN_SCHED_FILE)
+            sql = f"SELECT id FROM {table} WHERE scan_id = ?"
+            return [int(x) for x, in self._conn.execute(sql, (scan_id,))]
+
+
+_rows = _RowCounter()
+
+
+def _sched_init(filename: str) -> None:
+    sched.sched_init(filename)
+    _rows.open(filename)
+
+
+def _sched_cleanup() -> None:
+    _rows.close()
+    sched.sched_cleanup()
+
+
+def _sched_scan_seq_count(scan_id: int) -> int:
+    return _rows.count("seq", scan_id)
+
+
+def _sched_scan_prod_count(scan_id: int) -> int:
+    return _rows.count("prod", scan_id)
+
+
+def _sched_scan_seq_ids(scan_id: int) -> List[int]:
+    return _rows.ids("seq", scan_id)
+
+
+def _sched_scan_get_prods_into(scan_id: int, sink: Any) -> None:
+    # The library hands each product to `sink.append` as it reads it, so the
+    # caller can keep only the columns it needs.
+    ptr = prod.sched_prod_new().ptr
+    handle = ffi.new_handle(sink)
+    rc = RC(lib.sched_scan_get_prods(scan_id, lib.append_prod, ptr, handle))
+    rc.raise_for_status()
+
+
+def _sched_scan_seq_heads(
+    scan_id: int, after: int, limit: int
+) -> List[Tuple[int, str, int]]:
+    heads: List[Tuple[int, str, int]] = []
+    ptr = seq.sched_seq_new(after, scan_id).ptr
+    while len(heads) < limit:
+        rc = RC(lib.sched_seq_scan_next(ptr))
+        if rc == RC.SCHED_SEQ_NOT_FOUND:
+            break
+        rc.raise_for_status()
+        c = ptr[0]
+        heads.append((int(c.id), ffi.string(c.name).decode(), _strlen(c.data)))
+    return heads
+
+
+sched_init = _writer(_sched_init)
+sched_cleanup = _timed(_sched_cleanup)
+sched_wipe = _writer(sched.sched_wipe)
+sched_health_check = _reader(sched.sched_health_check)
+
+sched_db_add = _writer(db.sched_db_add, retry=False)
+sched_db_remove = _writer(db.sched_db_remove)
+sched_db_get_by_id = _reader(db.sched_db_get_by_id)
+sched_db_get_by_xxh3 = _reader(db.sched_db_get_by_xxh3)
+sched_db_get_by_filename = _reader(db.sched_db_get_by_filename)
+sched_db_get_by_hmm_id = _reader(db.sched_db_get_by_hmm_id)
+sched_db_get_all = _reader(db.sched_db_get_all)
+
+sched_hmm_new = _timed(hmm.sched_hmm_new)
+sched_hmm_get_by_id = _reader(hmm.sched_hmm_get_by_id)
+sched_hmm_get_by_job_id = _reader(hmm.sched_hmm_get_by_job_id)
+sched_hmm_get_by_xxh3 = _reader(hmm.sched_hmm_get_by_xxh3)
+sched_hmm_get_by_filename = _reader(hmm.sched_hmm_get_by_filename)
+sched_hmm_get_all = _reader(hmm.sched_hmm_get_all)
+sched_hmm_remove = _writer(hmm.sched_hmm_remove)
+
+sched_job_get_by_id = _reader(job.sched_job_get_by_id)
+sched_job_next_pend = _reader(job.sched_job_next_pend)
+sched_job_get_all = _reader(job.sched_job_get_all)
+sched_job_set_run = _writer(job.sched_job_set_run)
+sched_job_set_fail = _writer(job.sched_job_set_fail)
+sched_job_set_done = _writer(job.sched_job_set_done)
+sched_job_submit = _writer(job.sched_job_submit, retry=False)
+sched_job_increment_progress = _writer(job.sched_job_increment_progress, retry=False)
+sched_job_remove = _writer(job.sched_job_remove)
+
+sched_prod_get_by_id = _reader(prod.sched_prod_get_by_id)
+sched_prod_get_all = _reader(prod.sched_prod_get_all)
+sched_prod_add_file = _writer(prod.sched_prod_add_file, retry=False)
+
+sched_scan_new = _timed(scan.sched_scan_new)
+sched_scan_add_seq = _timed(scan.sched_scan_add_seq)
+sched_scan_get_by_id = _reader(scan.sched_scan_get_by_id)
+sched_scan_get_by_job_id = _reader(scan.sched_scan_get_by_job_id)
+sched_scan_get_seqs = _reader(scan.sched_scan_get_seqs)
+sched_scan_get_prods = _reader(scan.sched_scan_get_prods)
+sched_scan_get_prods_into = _reader(_sched_scan_get_prods_into)
+sched_scan_seq_heads = _reader(_sched_scan_seq_heads)
+sched_scan_seq_count = _reader(_sched_scan_seq_count)
+sched_scan_prod_count = _reader(_sched_scan_prod_count)
+sched_scan_seq_ids = _reader(_sched_scan_seq_ids)
+sched_scan_get_all = _reader(scan.sched_scan_get_all)
+
+sched_seq_new = _timed(seq.sched_seq_new)
+sched_seq_get_by_id = _reader(seq.sched_seq_get_by_id)
+sched_seq_get_all = _reader(seq.sched_seq_get_all)
+sched_seq_scan_next = _reader(seq.sched_seq_scan_next)
@@ -1,11 +1,13 @@
 import logging
 from functools import lru_cache
-from typing import Any, Dict, List, Tuple
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 from loguru import logger
-from pydantic import BaseSettings
+from pydantic import BaseSettings, validator
 
 from deciphon_api import __version__
+from deciphon_api.core.compression import Encoding
 from deciphon_api.core.logging import (
     InterceptHandler,
     LoggingLevel,
@@ -42,6 +44,48 @@ class Settings(BaseSettings):
     )
 
     sched_filename: str = "deciphon.sched"
+    # Server processes started by `deciphon-api start`. With more than one, job
+    # leases and the priority queue live next to the scheduler file and upload
+    # sessions under the storage directory; event streams and /metrics counters
+    # stay per process.
+    workers: int = 1
+    # Directory for uploaded files (defaults to the working directory).
+    storage_dir: Optional[Path] = None
+    # Seconds a resumable upload may sit idle before its file is removed.
+    upload_ttl: float = 86400.0
+    # Seconds between sweeps for expired upload sessions (0 disables them).
+    upload_sweep_interval: float = 300.0
+    # Largest size, in bytes, a resumable upload may declare.
+    max_upload_size: int = 64 * 1024**3
+    # Keep uploaded HMM files compressed at rest (gzip, or zstd if installed).
+    hmm_compression: Optional[Encoding] = None
+    # Longest time, in seconds, a request may wait for a pending job.
+    max_pend_wait: float = 60.0
+    # Seconds between heartbeats on job event streams.
+    event_heartbeat: float = 15.0
+    # Seconds between progress writes to the scheduler (0 writes through).
+    # Progress always writes through with more than one worker.
+    progress_flush_interval: float = 1.0
+    # Seconds a claimed job may go without a heartbeat or progress update.
+    job_lease_ttl: float = 300.0
+    # Seconds between sweeps that fail running jobs whose lease expired. Off
+    # (0) by default; enable it only when workers send heartbeats.
+    lease_reap_interval: float = 0.0
+    # API keys by tenant name. Scans submitted with one are fair-shared under
+    # that tenant; only callers with an API key may raise or lower priority.
+    tenant_keys: Dict[str, str] = {}
+    # Fair-share weight per tenant when claiming pending jobs (default 1).
+    fair_share_weights: Dict[str, float] = {}
+    # Records kept per DB, HMM and scan metadata cache (0 disables caching).
+    metadata_cache_size: int = 4096
+    # Log scheduler calls that take at least this many seconds.
+    slow_sched_call: float = 0.1
+    # Profile requests that carry the API key and an X-Profile header or
+    # ?profile= query flag (pstats or collapsed). Off by default.
+    profiling: bool = False
+    # Store profiles here and name them in X-Profile-File instead of
+    # returning them in place of the response.
+    profile_dir: Optional[Path] = None
     reload: bool = False
 
     class Config:
@@ -49,6 +93,14 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
         validate_assignment = True
 
+    @validator("fair_share_weights")
+    @classmethod
+    def check_fair_share_weights(cls, value: Dict[str, float]):
+        for tenant, weight in value.items():
+            if weight <= 0:
+                raise ValueError(f"weight of {tenant} must be positive")
+        return value
+
     @property
     def fastapi_kwargs(self) -> Dict[str, Any]:
         return {
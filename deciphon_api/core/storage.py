@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Iterator, Optional, Tuple, Union
+from uuid import uuid4
+
+import xxhash
+
+from deciphon_api.core.compression import Encoding, compress_file
+
+__all__ = ["FileNameConflict", "Storage", "file_xxh3", "storage"]
+
+
+class FileNameConflict(Exception):
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        self.filename = filename
+
+
+class Storage:
+    chunk_size = 4 * 1024 * 1024
+
+    def __init__(self, root: Path, compression: Optional[Encoding] = None):
+        self.root = root
+        self.compression = compression
+        self._cwd_lock = Lock()
+
+    @property
+    def objects(self) -> Path:
+        return self.root / "objects"
+
+    @property
+    def tmp(self) -> Path:
+        return self.root / "tmp"
+
+    @property
+    def uploads(self) -> Path:
+        return self.root / "uploads"
+
+    def path(self, filename: str) -> Path:
+        return self.root / filename
+
+    def valid_name(self, filename: str) -> bool:
+        if os.path.basename(filename) != filename:
+            return False
+        reserved = ("", ".", "..", self.objects.name, self.tmp.name, self.uploads.name)
+        return filename not in reserved
+
+    @contextmanager
+    def entered(self) -> Iterator[None]:
+        # The scheduler library opens HMM and DB files by bare name from the
+        # working directory and refuses paths.
+        with self._cwd_lock:
+            cwd = os.getcwd()
+            if os.path.samefile(cwd, self.root):
+                yield
+                return
+            os.chdir(self.root)
+            try:
+                yield
+            finally:
+                os.chdir(cwd)
+
+    def temp_path(self) -> str:
+        self.tmp.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.tmp, prefix="upload-")
+        os.close(fd)
+        return path
+
+    def object_path(self, xxh3: int) -> Path:
+        digest = f"{xxh3 & 0xFFFFFFFFFFFFFFFF:016x}"
+        return self.objects / digest[:2] / digest
+
+    def encoded_path(self, xxh3: int, encoding: Encoding) -> Path:
+        obj = self.object_path(xxh3)
+        return obj.with_name(obj.name + encoding.suffix)
+
+    def find_encoded(self, xxh3: int) -> Optional[Tuple[Path, Encoding]]:
+        for encoding in Encoding:
+            path = self.encoded_path(xxh3, encoding)
+            if path.exists():
+                return (path, encoding)
+        return None
+
+    def store(self, path: str, xxh3: int) -> Path:
+        obj = self.object_path(xxh3)
+        if obj.exists():
+            os.unlink(path)
+        else:
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, obj)
+        return obj
+
+    def link(self, xxh3: int, filename: str):
+        obj = self.object_path(xxh3)
+        name = self.root / filename
+        if name.exists():
+            if os.path.samefile(name, obj):
+                return
+            if file_xxh3(name) != xxh3 & 0xFFFFFFFFFFFFFFFF:
+                raise FileNameConflict(filename)
+
+        self.tmp.mkdir(parents=True, exist_ok=True)
+        staged = self.tmp / f"link-{uuid4().hex}"
+        try:
+            os.link(obj, staged)
+        except OSError:
+            shutil.copyfile(obj, staged)
+        os.replace(staged, name)
+
+    def compress(self, xxh3: int, filename: str):
+        if self.compression is None:
+            return
+        encoded = self.encoded_path(xxh3, self.compression)
+        if not encoded.exists():
+            self.tmp.mkdir(parents=True, exist_ok=True)
+            staged = self.tmp / f"compress-{uuid4().hex}"
+            try:
+                compress_file(self.object_path(xxh3), staged, self.compression)
+            except BaseException:
+                staged.unlink(missing_ok=True)
+                raise
+            os.replace(staged, encoded)
+
+        name = self.root / filename
+        if name.exists() and os.path.samefile(name, self.object_path(xxh3)):
+            name.unlink()
+        self.unlink_orphan(xxh3)
+
+    def unlink_orphan(self, xxh3: int):
+        obj = self.object_path(xxh3)
+        if obj.exists() and obj.stat().st_nlink == 1:
+            obj.unlink()
+            if not any(obj.parent.iterdir()):
+                obj.parent.rmdir()
+
+
+def file_xxh3(path: Union[str, Path]) -> int:
+    hash = xxhash.xxh3_64()
+    with open(path, "rb") as file:
+        while chunk := file.read(Storage.chunk_size):
+            hash.update(chunk)
+    return hash.intdigest()
+
+
+storage = Storage(Path("."))
@@ -0,0 +1,150 @@
+import dataclasses
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import aiofiles
+import xxhash
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_422_UNPROCESSABLE_ENTITY
+
+from deciphon_api.core.errors import FileNameInUseError, InvalidFileNameError
+from deciphon_api.core.storage import FileNameConflict, storage
+
+if TYPE_CHECKING:
+    from multipart.multipart import MultipartCallbacks
+
+__all__ = ["StreamedFile", "multipart_body", "stream_file", "to_signed"]
+
+
+def to_signed(xxh3: int) -> int:
+    return xxh3 - (1 << 64) if xxh3 >= (1 << 63) else xxh3
+
+
+def multipart_body(field: str, description: str) -> Dict[str, Any]:
+    schema = {
+        "type": "object",
+        "required": [field],
+        "properties": {
+            field: {"type": "string", "format": "binary", "description": description}
+        },
+    }
+    content = {"multipart/form-data": {"schema": schema}}
+    return {"requestBody": {"required": True, "content": content}}
+
+
+@dataclasses.dataclass
+class StreamedFile:
+    filename: str
+    path: str
+    xxh3: int
+    size: int
+
+    def place(self) -> str:
+        storage.store(self.path, self.xxh3)
+        try:
+            storage.link(self.xxh3, self.filename)
+        except FileNameConflict:
+            storage.unlink_orphan(self.xxh3)
+            raise FileNameInUseError(self.filename)
+        return self.filename
+
+    def discard(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class _FilePart:
+    def __init__(self, field: str):
+        self.field = field
+        self.filename: Optional[str] = None
+        self.hash = xxhash.xxh3_64()
+        self.size = 0
+        self.pending: List[bytes] = []
+        self._active = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._name = b""
+        self._value = b""
+
+    def callbacks(self) -> "MultipartCallbacks":
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+        }
+
+    def drain(self) -> List[bytes]:
+        pending = self.pending
+        self.pending = []
+        return pending
+
+    def _on_part_begin(self):
+        self._active = False
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._name.lower()] = self._value
+        self._name = b""
+        self._value = b""
+
+    def _on_headers_finished(self):
+        disposition = self._headers.get(b"content-disposition", b"")
+        _, options = parse_options_header(disposition)
+        if options.get(b"name", b"").decode() != self.field:
+            return
+        if b"filename" not in options or self.filename is not None:
+            return
+        self.filename = options[b"filename"].decode()
+        self._active = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._active:
+            chunk = data[start:end]
+            self.hash.update(chunk)
+            self.size += len(chunk)
+            self.pending.append(chunk)
+
+
+async def stream_file(
+    request: Request, field: str, expected_xxh3: Optional[int] = None
+) -> StreamedFile:
+    content_type, options = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(HTTP_400_BAD_REQUEST, "Expected multipart/form-data")
+
+    part = _FilePart(field)
+    parser = MultipartParser(options[b"boundary"], part.callbacks())
+    path = storage.temp_path()
+    try:
+        async with aiofiles.open(path, "wb") as file:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                for data in part.drain():
+                    await file.write(data)
+            parser.finalize()
+
+        if part.filename is None:
+            raise HTTPException(HTTP_422_UNPROCESSABLE_ENTITY, f"Missing {field}")
+
+        filename = os.path.basename(part.filename)
+        if not storage.valid_name(filename):
+            raise InvalidFileNameError(filename)
+
+        xxh3 = to_signed(part.hash.intdigest())
+        if expected_xxh3 is not None and xxh3 != expected_xxh3:
+            msg = f"Expected xxh3 {expected_xxh3}, got {xxh3}"
+            raise HTTPException(HTTP_422_UNPROCESSABLE_ENTITY, msg)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+    return StreamedFile(filename, path, xxh3, part.size)
@@ -0,0 +1,59 @@
+import asyncio
+import math
+from collections import deque
+from typing import Callable, Deque, Optional, TypeVar
+
+__all__ = ["Waiters", "pend_waiters"]
+
+T = TypeVar("T")
+
+
+class Waiters:
+    def __init__(self, recheck: float = math.inf):
+        self.recheck = recheck
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+    async def wait(self, timeout: float, front: bool = False) -> bool:
+        future = asyncio.get_running_loop().create_future()
+        if front:
+            self._waiters.appendleft(future)
+        else:
+            self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+
+    def notify(self, n: int = 1):
+        while n > 0 and len(self._waiters) > 0:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                n -= 1
+
+    async def poll(
+        self, fetch: Callable[[], Optional[T]], timeout: float
+    ) -> Optional[T]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        front = False
+        while (item := fetch()) is None:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            if not await self.wait(min(remaining, self.recheck), front):
+                if remaining <= self.recheck:
+                    return None
+                continue
+            front = True
+        return item
+
+
+pend_waiters = Waiters()
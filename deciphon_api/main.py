@@ -13,6 +13,8 @@ from deciphon_api.core.errors import (
     sched_error_handler,
 )
 from deciphon_api.core.events import create_start_handler, create_stop_handler
+from deciphon_api.core.instrumentation import MetricsMiddleware
+from deciphon_api.core.profiling import ProfileMiddleware
 from deciphon_api.core.settings import settings
 
 __all__ = ["app", "settings"]
@@ -24,6 +26,12 @@ def get_app() -> FastAPI:
 
     app = FastAPI(**settings.fastapi_kwargs)
 
+    if settings.profiling:
+        app.add_middleware(
+            ProfileMiddleware,
+            api_key=settings.api_key,
+            directory=settings.profile_dir,
+        )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.allowed_hosts,
@@ -31,6 +39,7 @@ def get_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(MetricsMiddleware)
 
     app.add_event_handler(
         "startup",
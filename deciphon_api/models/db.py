@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import List, Union
+from typing import List, Optional, Union
 
-from deciphon_sched.db import (
-    sched_db,
+from deciphon_sched.db import sched_db
+from deciphon_sched.error import SchedError
+from deciphon_sched.rc import RC
+from pydantic import BaseModel, Field
+
+from deciphon_api.core.cache import db_cache
+from deciphon_api.core.sched import (
     sched_db_add,
     sched_db_get_all,
     sched_db_get_by_filename,
@@ -13,7 +18,8 @@ from deciphon_sched.db import (
     sched_db_get_by_xxh3,
     sched_db_remove,
 )
-from pydantic import BaseModel, Field
+from deciphon_api.core.storage import storage
+from deciphon_api.core.uploads import StreamedFile
 
 __all__ = ["DB", "DBIDType"]
 
@@ -33,7 +39,7 @@ class DB(BaseModel):
 
     @classmethod
     def from_sched_db(cls, db: sched_db):
-        return cls(
+        return cls.construct(
             id=db.id,
             xxh3=db.xxh3,
             filename=db.filename,
@@ -42,10 +48,22 @@ class DB(BaseModel):
 
     @staticmethod
     def add(filename: str):
-        return DB.from_sched_db(sched_db_add(filename))
+        with storage.entered():
+            return DB.from_sched_db(sched_db_add(filename))
+
+    @staticmethod
+    def add_upload(upload: StreamedFile) -> DB:
+        if DB.find_by_xxh3(upload.xxh3) is not None:
+            upload.discard()
+            raise SchedError(RC.SCHED_DB_ALREADY_EXISTS)
+        return DB.add(upload.place())
 
     @staticmethod
     def get(id: Union[int, str], id_type: DBIDType) -> DB:
+        return db_cache.get((id_type, id), lambda: DB._load(id, id_type))
+
+    @staticmethod
+    def _load(id: Union[int, str], id_type: DBIDType) -> DB:
         if id_type == DBIDType.DB_ID:
             assert isinstance(id, int)
             return DB.from_sched_db(sched_db_get_by_id(id))
@@ -62,6 +80,15 @@ class DB(BaseModel):
             assert isinstance(id, int)
             return DB.from_sched_db(sched_db_get_by_hmm_id(id))
 
+    @staticmethod
+    def find_by_xxh3(xxh3: int) -> Optional[DB]:
+        try:
+            return DB.get(xxh3, DBIDType.XXH3)
+        except SchedError as error:
+            if error.rc == RC.SCHED_DB_NOT_FOUND:
+                return None
+            raise
+
     @staticmethod
     def get_list() -> List[DB]:
         return [DB.from_sched_db(db) for db in sched_db_get_all()]
@@ -69,3 +96,4 @@ class DB(BaseModel):
     @staticmethod
     def remove(db_id: int):
         sched_db_remove(db_id)
+        db_cache.discard((DBIDType.DB_ID.value, db_id))
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import List, Union
+from typing import List, Optional, Union
 
 from deciphon_sched.error import SchedError
-from deciphon_sched.hmm import (
-    sched_hmm,
+from deciphon_sched.hmm import sched_hmm
+from deciphon_sched.rc import RC
+from pydantic import BaseModel, Field
+
+from deciphon_api.core.cache import hmm_cache
+from deciphon_api.core.errors import FileNameInUseError, InvalidTypeError
+from deciphon_api.core.sched import (
     sched_hmm_get_all,
     sched_hmm_get_by_filename,
     sched_hmm_get_by_id,
@@ -13,12 +18,11 @@ from deciphon_sched.hmm import (
     sched_hmm_get_by_xxh3,
     sched_hmm_new,
     sched_hmm_remove,
+    sched_job_submit,
 )
-from deciphon_sched.job import sched_job_submit
-from deciphon_sched.rc import RC
-from pydantic import BaseModel, Field
-
-from deciphon_api.core.errors import InvalidTypeError
+from deciphon_api.core.storage import storage
+from deciphon_api.core.uploads import StreamedFile
+from deciphon_api.models.job import Job
 
 __all__ = ["HMM", "HMMIDType"]
 
@@ -38,7 +42,7 @@ class HMM(BaseModel):
 
     @classmethod
     def from_sched_hmm(cls, hmm: sched_hmm):
-        return cls(
+        return cls.construct(
             id=hmm.id,
             xxh3=hmm.xxh3,
             filename=hmm.filename,
@@ -47,12 +51,29 @@ class HMM(BaseModel):
 
     @staticmethod
     def submit(filename: str) -> HMM:
-        hmm = sched_hmm_new(filename)
-        sched_job_submit(hmm)
+        with storage.entered():
+            hmm = sched_hmm_new(filename)
+        Job.submitted(sched_job_submit(hmm))
         return HMM.from_sched_hmm(hmm)
 
+    @staticmethod
+    def submit_upload(upload: StreamedFile) -> HMM:
+        if HMM.find_by_xxh3(upload.xxh3) is not None:
+            upload.discard()
+            raise SchedError(RC.SCHED_HMM_ALREADY_EXISTS)
+        if HMM.exists_by_filename(upload.filename):
+            upload.discard()
+            raise FileNameInUseError(upload.filename)
+        hmm = HMM.submit(upload.place())
+        storage.compress(upload.xxh3, upload.filename)
+        return hmm
+
     @staticmethod
     def get(id: Union[int, str], id_type: HMMIDType) -> HMM:
+        return hmm_cache.get((id_type, id), lambda: HMM._load(id, id_type))
+
+    @staticmethod
+    def _load(id: Union[int, str], id_type: HMMIDType) -> HMM:
         if id_type == HMMIDType.HMM_ID:
             if not isinstance(id, int):
                 raise InvalidTypeError("integer")
@@ -93,6 +114,15 @@ class HMM(BaseModel):
             raise
         return True
 
+    @staticmethod
+    def find_by_xxh3(xxh3: int) -> Optional[HMM]:
+        try:
+            return HMM.get(xxh3, HMMIDType.XXH3)
+        except SchedError as error:
+            if error.rc == RC.SCHED_HMM_NOT_FOUND:
+                return None
+            raise
+
     @staticmethod
     def get_list() -> List[HMM]:
         return [HMM.from_sched_hmm(hmm) for hmm in sched_hmm_get_all()]
@@ -100,3 +130,4 @@ class HMM(BaseModel):
     @staticmethod
     def remove(hmm_id: int):
         sched_hmm_remove(hmm_id)
+        hmm_cache.discard((HMMIDType.HMM_ID.value, hmm_id))
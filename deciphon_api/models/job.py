@@ -1,10 +1,23 @@
 from __future__ import annotations
 
 from enum import Enum
+from threading import Lock
 from typing import List, Optional
 
-from deciphon_sched.job import (
-    sched_job,
+from deciphon_sched.error import SchedError
+from deciphon_sched.job import sched_job, sched_job_state, sched_job_type
+from loguru import logger
+from pydantic import BaseModel, Field, validator
+
+from deciphon_api.core.cache import clear_caches
+from deciphon_api.core.counts import clear_counts, job_counts
+from deciphon_api.core.errors import JobNotRunningError
+from deciphon_api.core.fair_share import FairQueue
+from deciphon_api.core.job_events import job_events
+from deciphon_api.core.leases import Lease, job_leases
+from deciphon_api.core.metrics import registry
+from deciphon_api.core.progress import ProgressBuffer
+from deciphon_api.core.sched import (
     sched_job_get_all,
     sched_job_get_by_id,
     sched_job_increment_progress,
@@ -13,11 +26,26 @@ from deciphon_sched.job import (
     sched_job_set_done,
     sched_job_set_fail,
     sched_job_set_run,
-    sched_job_state,
+    sched_write,
 )
-from pydantic import BaseModel, Field, validator
+from deciphon_api.core.wakeup import pend_waiters
+
+__all__ = [
+    "Job",
+    "JobState",
+    "JobPriority",
+    "JobQueueStats",
+    "JobStatePatch",
+    "JobFilter",
+    "JobProgressPatch",
+    "JobProgressItem",
+    "JobLease",
+    "DoneJob",
+    "PendJob",
+]
+
 
-__all__ = ["Job", "JobStatePatch", "JobProgressPatch", "DoneJob", "PendJob"]
+_claim_lock = Lock()
 
 
 class JobState(str, Enum):
@@ -31,6 +59,31 @@ class JobState(str, Enum):
         return cls[job_state.name]
 
 
+class JobPriority(str, Enum):
+    HIGH = "high"
+    NORMAL = "normal"
+    LOW = "low"
+
+
+pend_queue = FairQueue(JobPriority)
+
+jobs_submitted = registry.counter(
+    "deciphon_jobs_submitted_total", "Jobs submitted.", ["type"]
+)
+jobs_started = registry.counter(
+    "deciphon_jobs_started_total", "Jobs moved to run.", ["type"]
+)
+jobs_finished = registry.counter(
+    "deciphon_jobs_finished_total", "Jobs moved to done or fail.", ["type", "state"]
+)
+job_wait_seconds = registry.histogram(
+    "deciphon_job_wait_seconds", "Seconds from submission to exec start.", ["type"]
+)
+job_run_seconds = registry.histogram(
+    "deciphon_job_run_seconds", "Seconds from exec start to exec end.", ["type"]
+)
+
+
 class Job(BaseModel):
     id: int = Field(..., gt=0)
     type: int = Field(..., ge=0, le=1)
@@ -45,7 +98,7 @@ class Job(BaseModel):
 
     @classmethod
     def from_sched_job(cls, job: sched_job):
-        return cls(
+        return cls.construct(
             id=job.id,
             type=job.type,
             state=JobState.from_sched_job_state(job.state),
@@ -58,39 +111,256 @@ class Job(BaseModel):
 
     @staticmethod
     def get(job_id: int) -> Job:
+        progress_buffer.flush(job_id)
         return Job.from_sched_job(sched_job_get_by_id(job_id))
 
     @staticmethod
     def set_state(job_id: int, state_patch: JobStatePatch) -> Job:
+        progress_buffer.flush(job_id)
+        previous = JobState.from_sched_job_state(sched_job_get_by_id(job_id).state)
+
         if state_patch.state == JobState.SCHED_RUN:
             sched_job_set_run(job_id)
+            pend_queue.started(job_id)
+            job_leases.grant(job_id)
 
         elif state_patch.state == JobState.SCHED_FAIL:
             sched_job_set_fail(job_id, state_patch.error)
+            pend_queue.discard(job_id)
+            job_leases.release(job_id)
 
         elif state_patch.state == JobState.SCHED_DONE:
             sched_job_set_done(job_id)
+            pend_queue.discard(job_id)
+            job_leases.release(job_id)
 
-        return Job.get(job_id)
+        job = Job.get(job_id)
+        _transitioned(previous, job)
+        job_events.publish("state", job)
+        return job
 
     @staticmethod
     def next_pend() -> Optional[Job]:
-        sched_job = sched_job_next_pend()
+        sched_job = _next_pend_sched_job()
         if sched_job is None:
             return None
         return PendJob.from_sched_job(sched_job)
 
+    @staticmethod
+    def claim(limit: int, worker: str) -> List[Job]:
+        claimed: List[int] = []
+        try:
+            with _claim_lock, sched_write():
+                while len(claimed) < limit:
+                    sched_job = _next_pend_sched_job()
+                    if sched_job is None:
+                        break
+                    sched_job_set_run(sched_job.id)
+                    pend_queue.started(sched_job.id)
+                    claimed.append(sched_job.id)
+        except SchedError as error:
+            if len(claimed) == 0:
+                raise
+            logger.warning(f"claim by {worker} stopped early: {error}")
+
+        # Lease every claimed job before anything else can fail, so a job
+        # that never reaches the worker is reaped instead of left running.
+        for job_id in claimed:
+            job_leases.grant(job_id, worker)
+
+        jobs: List[Job] = []
+        for job_id in claimed:
+            jobs.append(Job.get(job_id))
+            _transitioned(JobState.SCHED_PEND, jobs[-1])
+            job_events.publish("state", jobs[-1])
+
+        if len(jobs) > 0:
+            logger.info(f"{worker} claimed jobs {[job.id for job in jobs]}")
+        return jobs
+
     @staticmethod
     def increment_progress(job_id: int, progress: int):
-        sched_job_increment_progress(job_id, progress)
+        Job.increment_progress_of([JobProgressItem(job_id=job_id, increment=progress)])
+
+    @staticmethod
+    def increment_progress_of(items: List[JobProgressItem]):
+        # Buffered increments reach the scheduler later, so check every job
+        # now and reject the whole batch while the client can still see it.
+        for job_id in dict.fromkeys(x.job_id for x in items):
+            state = JobState.from_sched_job_state(sched_job_get_by_id(job_id).state)
+            if state != JobState.SCHED_RUN:
+                raise JobNotRunningError(job_id, state.value)
+
+        for item in items:
+            progress_buffer.add(item.job_id, item.increment)
+            job_leases.renew(item.job_id)
+
+    @staticmethod
+    def heartbeat(job_id: int, worker: str) -> Optional[JobLease]:
+        lease = job_leases.renew(job_id, worker)
+        if lease is None:
+            return None
+        return JobLease.from_lease(job_id, lease)
+
+    @staticmethod
+    def restore():
+        # A shared queue holds the priorities given by every worker, so keep
+        # what it has for jobs still pending; a private one starts over.
+        if not pend_queue.shared:
+            pend_queue.clear()
+        pending: List[int] = []
+        running: List[int] = []
+        for job in sched_job_get_all():
+            if job.state.name == JobState.SCHED_PEND.name:
+                pending.append(job.id)
+            elif job.state.name == JobState.SCHED_RUN.name:
+                running.append(job.id)
+                if job_leases.get(job.id) is None:
+                    job_leases.grant(job.id)
+        pend_queue.retain(pending)
+        for job_id in pending:
+            pend_queue.push(job_id, JobPriority.NORMAL)
+        job_leases.retain(running)
+
+    @staticmethod
+    def queue_stats() -> List[JobQueueStats]:
+        return [
+            JobQueueStats(
+                priority=JobPriority(priority),
+                pending=stats.pending,
+                started=stats.started,
+                mean_wait=stats.mean_wait,
+                max_wait=stats.max_wait,
+            )
+            for priority, stats in pend_queue.stats()
+        ]
+
+    @staticmethod
+    def reap() -> List[Job]:
+        reaped: List[Job] = []
+        for job_id in job_leases.expired():
+            lease = job_leases.release_expired(job_id)
+            if lease is None:
+                continue
+            if Job.get(job_id).state != JobState.SCHED_RUN:
+                continue
+            worker = lease.worker or "unknown worker"
+            error = f"lease held by {worker} expired"
+            reaped.append(Job.set_state(job_id, JobStatePatch.fail(error)))
+
+        if len(reaped) > 0:
+            logger.warning(f"failed jobs {[job.id for job in reaped]} on lease expiry")
+        return reaped
 
     @staticmethod
     def remove(job_id: int):
+        job = Job.get(job_id) if job_events.active else None
+        progress_buffer.discard(job_id)
+        pend_queue.discard(job_id)
+        job_leases.release(job_id)
         sched_job_remove(job_id)
+        clear_counts()
+        clear_caches()
+        if job is not None:
+            job_events.publish("remove", job)
+
+    @staticmethod
+    def get_list(
+        job_filter: Optional[JobFilter] = None,
+        after: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Job]:
+        progress_buffer.flush()
+        jobs: List[Job] = []
+        for job in sched_job_get_all():
+            if limit is not None and len(jobs) >= limit:
+                break
+            if job.id <= after:
+                continue
+            if job_filter is None or job_filter.accepts(job):
+                jobs.append(Job.from_sched_job(job))
+        return jobs
+
+    @staticmethod
+    def count(state: Optional[JobState] = None) -> int:
+        if state is None:
+            return sum(Job.count(x) for x in JobState)
+
+        def seed():
+            return sum(1 for job in sched_job_get_all() if job.state.name == state.name)
+
+        return job_counts.get(state, seed)
 
     @staticmethod
-    def get_list() -> List[Job]:
-        return [Job.from_sched_job(job) for job in sched_job_get_all()]
+    def submitted(
+        job: sched_job,
+        priority: JobPriority = JobPriority.NORMAL,
+        submitter: str = "",
+    ) -> Job:
+        job_counts.increment(JobState.from_sched_job_state(job.state), 1)
+        jobs_submitted.inc(type=_type_name(job.type))
+        pend_queue.push(job.id, priority, submitter)
+        pend_waiters.notify()
+        submitted = Job.from_sched_job(job)
+        job_events.publish("submit", submitted)
+        return submitted
+
+
+def _type_name(job_type: int) -> str:
+    return sched_job_type(job_type).name.removeprefix("SCHED_").lower()
+
+
+def _transitioned(previous: JobState, job: Job):
+    if job.state == previous:
+        return
+    job_counts.increment(previous, -1)
+    job_counts.increment(job.state, 1)
+
+    job_type = _type_name(job.type)
+    if job.state == JobState.SCHED_RUN:
+        jobs_started.inc(type=job_type)
+        if job.exec_started > 0:
+            waited = job.exec_started - job.submission
+            job_wait_seconds.observe(waited, type=job_type)
+    elif job.state in (JobState.SCHED_DONE, JobState.SCHED_FAIL):
+        jobs_finished.inc(type=job_type, state=job.state.value)
+        if job.exec_started > 0:
+            elapsed = job.exec_ended - job.exec_started
+            job_run_seconds.observe(elapsed, type=job_type)
+
+
+def _next_pend_sched_job() -> Optional[sched_job]:
+    while (job_id := pend_queue.peek()) is not None:
+        try:
+            sched_job = sched_job_get_by_id(job_id)
+        except SchedError:
+            sched_job = None
+        if sched_job is not None and sched_job.state.name == JobState.SCHED_PEND.name:
+            return sched_job
+        pend_queue.discard(job_id)
+    return sched_job_next_pend()
+
+
+registry.gauge(
+    "deciphon_jobs",
+    "Jobs by state.",
+    ["state"],
+    collect=lambda: {(x.value,): Job.count(x) for x in JobState},
+)
+registry.gauge(
+    "deciphon_jobs_leased",
+    "Running jobs held under a lease.",
+    collect=lambda: {(): len(job_leases)},
+)
+
+
+def _write_progress(job_id: int, progress: int):
+    sched_job_increment_progress(job_id, progress)
+    if job_events.active:
+        job_events.publish("progress", Job.get(job_id))
+
+
+progress_buffer = ProgressBuffer(_write_progress)
 
 
 class DoneJob(Job):
@@ -111,10 +381,61 @@ class PendJob(Job):
         return value
 
 
+class JobFilter(BaseModel):
+    states: Optional[List[JobState]] = None
+    type: Optional[int] = None
+    submission_min: Optional[int] = None
+    submission_max: Optional[int] = None
+    exec_ended_min: Optional[int] = None
+    exec_ended_max: Optional[int] = None
+
+    def accepts(self, job: sched_job) -> bool:
+        if self.states is not None:
+            if JobState.from_sched_job_state(job.state) not in self.states:
+                return False
+        if self.type is not None and job.type != self.type:
+            return False
+        if not _within(job.submission, self.submission_min, self.submission_max):
+            return False
+        return _within(job.exec_ended, self.exec_ended_min, self.exec_ended_max)
+
+
+def _within(value: int, lower: Optional[int], upper: Optional[int]) -> bool:
+    if lower is not None and value < lower:
+        return False
+    return upper is None or value <= upper
+
+
 class JobStatePatch(BaseModel):
     state: JobState = JobState.SCHED_PEND
     error: str = ""
 
+    @classmethod
+    def fail(cls, error: str):
+        return cls(state=JobState.SCHED_FAIL, error=error)
+
 
 class JobProgressPatch(BaseModel):
     increment: int = Field(..., ge=0, le=100)
+
+
+class JobProgressItem(JobProgressPatch):
+    job_id: int = Field(..., gt=0)
+
+
+class JobLease(BaseModel):
+    job_id: int = Field(..., gt=0)
+    worker: str = ""
+    expires_in: float = Field(..., ge=0)
+
+    @classmethod
+    def from_lease(cls, job_id: int, lease: Lease):
+        return cls(job_id=job_id, worker=lease.worker, expires_in=lease.expires_in())
+
+
+class JobQueueStats(BaseModel):
+    priority: JobPriority
+    pending: int = Field(..., ge=0)
+    started: int = Field(..., ge=0)
+    mean_wait: float = Field(..., ge=0)
+    max_wait: float = Field(..., ge=0)
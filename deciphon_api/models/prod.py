@@ -1,14 +1,39 @@
 from __future__ import annotations
 
-from deciphon_sched.prod import (
-    sched_prod,
+import os
+from collections import Counter
+from enum import Enum
+from typing import Iterable, List, Optional, Tuple
+
+from deciphon_sched.prod import sched_prod
+from pydantic import BaseModel, Field
+
+from deciphon_api.core.counts import prod_counts, prod_keys
+from deciphon_api.core.errors import ProdsFileError, ScanMismatchError
+from deciphon_api.core.sched import (
     sched_prod_add_file,
     sched_prod_get_all,
     sched_prod_get_by_id,
+    sched_scan_get_prods,
+    sched_scan_seq_ids,
+    sched_write,
 )
-from pydantic import BaseModel, Field
+from deciphon_api.core.storage import storage
+
+__all__ = ["Prod", "Prods", "ProdField", "ProdsAdded"]
+
 
-__all__ = ["Prod", "Prods"]
+class ProdField(str, Enum):
+    ID = "id"
+    SCAN_ID = "scan_id"
+    SEQ_ID = "seq_id"
+    PROFILE_NAME = "profile_name"
+    ABC_NAME = "abc_name"
+    ALT_LOGLIK = "alt_loglik"
+    NULL_LOGLIK = "null_loglik"
+    PROFILE_TYPEID = "profile_typeid"
+    VERSION = "version"
+    MATCH = "match"
 
 
 class Prod(BaseModel):
@@ -29,8 +54,13 @@ class Prod(BaseModel):
     match: str = ""
 
     @classmethod
-    def from_sched_prod(cls, prod: sched_prod):
-        return cls(
+    def from_sched_prod(
+        cls, prod: sched_prod, fields: Optional[Iterable[ProdField]] = None
+    ):
+        if fields is not None:
+            names = {ProdField.ID.value} | {field.value for field in fields}
+            return cls.construct(**{name: getattr(prod, name) for name in names})
+        return cls.construct(
             id=prod.id,
             scan_id=prod.scan_id,
             seq_id=prod.seq_id,
@@ -44,16 +74,99 @@ class Prod(BaseModel):
         )
 
     @classmethod
-    def get(cls, prod_id: int) -> Prod:
-        return Prod.from_sched_prod(sched_prod_get_by_id(prod_id))
+    def get(cls, prod_id: int, fields: Optional[Iterable[ProdField]] = None) -> Prod:
+        return Prod.from_sched_prod(sched_prod_get_by_id(prod_id), fields)
 
     @staticmethod
-    def get_list() -> Prods:
-        return Prods.create(sched_prod_get_all())
+    def get_list(fields: Optional[Iterable[ProdField]] = None) -> Prods:
+        return Prods.create(sched_prod_get_all(), fields)
 
     @staticmethod
-    def add_file(file):
-        sched_prod_add_file(file)
+    def add_file(file, scan_id: Optional[int] = None) -> ProdsAdded:
+        try:
+            with open(file, "r", newline="") as fp:
+                lines = [line.rstrip("\r\n") for line in fp]
+        except UnicodeDecodeError:
+            raise ProdsFileError("not UTF-8 text")
+        header = lines[0].split("\t") if len(lines) > 0 else []
+        rows = [line.split("\t") for line in lines[1:] if len(line) > 0]
+
+        keys = _parse_keys(header, rows)
+        for row_scan_id, _ in keys:
+            if scan_id is not None and row_scan_id != scan_id:
+                raise ScanMismatchError(scan_id, row_scan_id)
+
+        seqs = {x: set(sched_scan_seq_ids(x)) for x, _ in keys}
+        for i, (row_scan_id, (seq_id, _)) in enumerate(keys):
+            if seq_id not in seqs[row_scan_id]:
+                msg = f"row {i + 1} has seq_id {seq_id} not in scan {row_scan_id}"
+                raise ProdsFileError(msg)
+
+        fresh: List[List[str]] = []
+        scans: Counter[int] = Counter()
+        with sched_write():
+            for row, (row_scan_id, key) in zip(rows, keys):
+                if prod_keys.add(row_scan_id, key, _seed_prod_keys(row_scan_id)):
+                    fresh.append(row)
+                    scans[row_scan_id] += 1
+            try:
+                if len(fresh) == len(rows) and len(rows) > 0:
+                    sched_prod_add_file(file)
+                elif len(fresh) > 0:
+                    _add_rows(header, fresh)
+            except Exception:
+                for x in scans.keys():
+                    prod_keys.discard(x)
+                raise
+
+        for x, count in scans.items():
+            prod_counts.increment(x, count)
+        return ProdsAdded(added=len(fresh), skipped=len(rows) - len(fresh))
+
+
+def _parse_keys(
+    header: List[str], rows: List[List[str]]
+) -> List[Tuple[int, Tuple[int, str]]]:
+    if len(rows) == 0:
+        return []
+    col = {name: i for i, name in enumerate(header)}
+    for name in ("scan_id", "seq_id", "profile_name"):
+        if name not in col:
+            raise ProdsFileError(f"missing {name} column")
+
+    keys: List[Tuple[int, Tuple[int, str]]] = []
+    for i, row in enumerate(rows):
+        if len(row) != len(header):
+            raise ProdsFileError(f"row {i + 1} has {len(row)} fields")
+        try:
+            scan_id = int(row[col["scan_id"]])
+            seq_id = int(row[col["seq_id"]])
+        except ValueError:
+            raise ProdsFileError(f"row {i + 1} has a non-integer id")
+        keys.append((scan_id, (seq_id, row[col["profile_name"]])))
+    return keys
+
+
+def _seed_prod_keys(scan_id: int):
+    def seed():
+        return ((x.seq_id, x.profile_name) for x in sched_scan_get_prods(scan_id))
+
+    return seed
+
+
+def _add_rows(header: List[str], rows: List[List[str]]):
+    path = storage.temp_path()
+    try:
+        with open(path, "w", newline="") as fp:
+            fp.writelines("\t".join(row) + "\n" for row in [header] + rows)
+        sched_prod_add_file(path)
+    finally:
+        os.unlink(path)
+
+
+class ProdsAdded(BaseModel):
+    added: int = Field(..., ge=0)
+    skipped: int = Field(..., ge=0)
 
 
 class Prods(BaseModel):
@@ -69,10 +182,12 @@ class Prods(BaseModel):
         return len(list(self.__root__))
 
     @classmethod
-    def create(cls, prods: list[sched_prod]):
-        return Prods(
+    def create(
+        cls, prods: list[sched_prod], fields: Optional[Iterable[ProdField]] = None
+    ):
+        return Prods.construct(
             __root__=[
-                Prod.from_sched_prod(prod)
+                Prod.from_sched_prod(prod, fields)
                 for prod in sorted(prods, key=lambda prod: prod.seq_id)
             ]
         )
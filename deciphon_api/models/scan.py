@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import List
+from typing import Iterable, List, Optional
 
-from deciphon_sched.job import sched_job_submit
-from deciphon_sched.scan import (
-    sched_scan,
+from deciphon_sched.scan import sched_scan
+from pydantic import BaseModel, Field, validator
+
+from deciphon_api.core.cache import scan_cache
+from deciphon_api.core.counts import prod_counts, seq_counts
+from deciphon_api.core.sched import (
+    sched_job_submit,
     sched_scan_add_seq,
     sched_scan_get_all,
     sched_scan_get_by_id,
@@ -13,13 +17,14 @@ from deciphon_sched.scan import (
     sched_scan_get_prods,
     sched_scan_get_seqs,
     sched_scan_new,
+    sched_scan_prod_count,
+    sched_scan_seq_count,
+    sched_write,
 )
-from pydantic import BaseModel, Field, validator
-
-from deciphon_api.models.job import DoneJob, Job
-from deciphon_api.models.prod import Prods
+from deciphon_api.models.job import DoneJob, Job, JobPriority, JobState
+from deciphon_api.models.prod import ProdField, Prods
 from deciphon_api.models.scan_result import ScanResult
-from deciphon_api.models.seq import Seq, SeqPost, Seqs
+from deciphon_api.models.seq import Seq, SeqField, SeqPost, Seqs
 
 __all__ = ["Scan", "ScanConfig", "ScanPost", "DoneScan"]
 
@@ -40,7 +45,7 @@ class Scan(BaseModel):
 
     @classmethod
     def from_sched_scan(cls, scan: sched_scan):
-        return cls(
+        return cls.construct(
             id=scan.id,
             db_id=scan.db_id,
             multi_hits=scan.multi_hits,
@@ -50,20 +55,32 @@ class Scan(BaseModel):
 
     @classmethod
     def get(cls, id: int, id_type: ScanIDType) -> Scan:
+        return scan_cache.get((id_type, id), lambda: Scan._load(id, id_type))
+
+    @staticmethod
+    def _load(id: int, id_type: ScanIDType) -> Scan:
         if id_type == ScanIDType.SCAN_ID:
             return Scan.from_sched_scan(sched_scan_get_by_id(id))
 
         if id_type == ScanIDType.JOB_ID:
             return Scan.from_sched_scan(sched_scan_get_by_job_id(id))
 
-    def prods(self) -> Prods:
-        return Prods.create(sched_scan_get_prods(self.id))
+    def prods(self, fields: Optional[Iterable[ProdField]] = None) -> Prods:
+        return Prods.create(sched_scan_get_prods(self.id), fields)
 
-    def seqs(self) -> Seqs:
-        return Seqs(
-            __root__=[Seq.from_sched_seq(seq) for seq in sched_scan_get_seqs(self.id)]
+    def seqs(self, fields: Optional[Iterable[SeqField]] = None) -> Seqs:
+        return Seqs.construct(
+            __root__=[
+                Seq.from_sched_seq(seq, fields) for seq in sched_scan_get_seqs(self.id)
+            ]
         )
 
+    def seq_count(self) -> int:
+        return seq_counts.get(self.id, lambda: sched_scan_seq_count(self.id))
+
+    def prod_count(self) -> int:
+        return prod_counts.get(self.id, lambda: sched_scan_prod_count(self.id))
+
     def result(self) -> ScanResult:
         prods: Prods = self.prods()
         seqs: Seqs = self.seqs()
@@ -72,6 +89,9 @@ class Scan(BaseModel):
     def job(self) -> Job:
         return Job.get(self.job_id)
 
+    def complete(self) -> bool:
+        return self.job().state == JobState.SCHED_DONE
+
     @staticmethod
     def get_list() -> List[Scan]:
         return [Scan.from_sched_scan(scan) for scan in sched_scan_get_all()]
@@ -96,9 +116,17 @@ class ScanPost(BaseModel):
 
     seqs: List[SeqPost] = []
 
+    priority: JobPriority = JobPriority.NORMAL
+    submitter: str = ""
+
     def submit(self) -> Job:
         cfg = self.config
-        scan = sched_scan_new(cfg.db_id, cfg.multi_hits, cfg.hmmer3_compat)
-        for seq in self.seqs:
-            sched_scan_add_seq(seq.name, seq.data)
-        return Job.from_sched_job(sched_job_submit(scan))
+        with sched_write():
+            scan = sched_scan_new(cfg.db_id, cfg.multi_hits, cfg.hmmer3_compat)
+            for seq in self.seqs:
+                sched_scan_add_seq(seq.name, seq.data)
+            submitted = sched_job_submit(scan)
+        job = Job.submitted(submitted, self.priority, self.submitter)
+        seq_counts.set(scan.id, len(self.seqs))
+        prod_counts.set(scan.id, 0)
+        return job
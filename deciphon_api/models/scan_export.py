@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from deciphon_sched.prod import sched_prod
+
+from deciphon_api.core.sched import sched_scan_get_prods_into, sched_scan_seq_heads
+from deciphon_api.models.prod import ProdField
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pa_ipc = pq = None
+
+__all__ = ["ExportFormat", "ProdsExport", "arrow_available"]
+
+
+class ExportFormat(str, Enum):
+    ARROW = "arrow"
+    PARQUET = "parquet"
+    TSV = "tsv"
+
+    @property
+    def media_type(self) -> str:
+        return {
+            ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+            ExportFormat.PARQUET: "application/vnd.apache.parquet",
+            ExportFormat.TSV: "text/tab-separated-values",
+        }[self]
+
+    @property
+    def extension(self) -> str:
+        return {
+            ExportFormat.ARROW: "arrows",
+            ExportFormat.PARQUET: "parquet",
+            ExportFormat.TSV: "tsv",
+        }[self]
+
+
+COLUMN_TYPES: Dict[str, str] = {
+    ProdField.ID.value: "int64",
+    ProdField.SCAN_ID.value: "int64",
+    ProdField.SEQ_ID.value: "int64",
+    "seq_name": "string",
+    "seq_length": "int64",
+    ProdField.PROFILE_NAME.value: "string",
+    ProdField.ABC_NAME.value: "string",
+    ProdField.ALT_LOGLIK.value: "float64",
+    ProdField.NULL_LOGLIK.value: "float64",
+    ProdField.PROFILE_TYPEID.value: "string",
+    ProdField.VERSION.value: "string",
+    ProdField.MATCH.value: "string",
+}
+
+SEQ_COLUMNS = ("seq_name", "seq_length")
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+class _Sink:
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _ProdColumns:
+    def __init__(self, names: Iterable[str]):
+        self.seq_ids: List[int] = []
+        self.values: Dict[str, List[Any]] = {x: [] for x in names}
+
+    def append(self, prod: sched_prod):
+        self.seq_ids.append(prod.seq_id)
+        for name, values in self.values.items():
+            values.append(getattr(prod, name))
+
+
+class _SeqHeads:
+    def __init__(self, scan_id: int, page_size: int):
+        self.scan_id = scan_id
+        self.page_size = page_size
+        self.heads: Dict[int, Tuple[str, int]] = {}
+        self.after = 0
+
+    def get(self, seq_id: int) -> Tuple[str, int]:
+        # Lookups come in ascending seq id order, so one page is kept at a time.
+        while seq_id not in self.heads and self.after < seq_id:
+            page = sched_scan_seq_heads(self.scan_id, self.after, self.page_size)
+            if len(page) == 0:
+                break
+            self.heads = {x[0]: (x[1], x[2]) for x in page}
+            self.after = page[-1][0]
+        return self.heads[seq_id]
+
+
+class ProdsExport:
+    def __init__(
+        self,
+        scan_id: int,
+        fields: Optional[Iterable[ProdField]] = None,
+        batch_size: int = 65536,
+    ):
+        self.scan_id = scan_id
+        self.batch_size = batch_size
+        self.columns = self._columns(fields)
+
+    @staticmethod
+    def _columns(fields: Optional[Iterable[ProdField]]) -> List[str]:
+        if fields is None:
+            return list(COLUMN_TYPES.keys())
+        names = {ProdField.ID.value} | {field.value for field in fields}
+        return [x for x in COLUMN_TYPES.keys() if x in names or x in SEQ_COLUMNS]
+
+    def batches(self) -> Iterator[Dict[str, List[Any]]]:
+        prods = _ProdColumns(x for x in self.columns if x not in SEQ_COLUMNS)
+        sched_scan_get_prods_into(self.scan_id, prods)
+        order = sorted(range(len(prods.seq_ids)), key=prods.seq_ids.__getitem__)
+        seqs = _SeqHeads(self.scan_id, self.batch_size)
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start : start + self.batch_size]
+            heads = [seqs.get(prods.seq_ids[i]) for i in rows]
+            batch: Dict[str, List[Any]] = {}
+            for name in self.columns:
+                if name == "seq_name":
+                    batch[name] = [x[0] for x in heads]
+                elif name == "seq_length":
+                    batch[name] = [x[1] for x in heads]
+                else:
+                    values = prods.values[name]
+                    batch[name] = [values[i] for i in rows]
+            yield batch
+
+    def stream(self, fmt: ExportFormat) -> Iterator[bytes]:
+        if fmt == ExportFormat.ARROW:
+            return self.arrow()
+        if fmt == ExportFormat.PARQUET:
+            return self.parquet()
+        return self.tsv()
+
+    def tsv(self) -> Iterator[bytes]:
+        yield ("#" + "\t".join(COLUMN_TYPES[x] for x in self.columns) + "\n").encode()
+        yield ("\t".join(self.columns) + "\n").encode()
+        for batch in self.batches():
+            cols = [batch[x] for x in self.columns]
+            rows = ("\t".join(_tsv_value(v) for v in row) for row in zip(*cols))
+            yield ("\n".join(rows) + "\n").encode()
+
+    def arrow(self) -> Iterator[bytes]:
+        assert pa is not None and pa_ipc is not None
+        schema = self._schema()
+        sink = _Sink()
+        with pa_ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+            yield sink.drain()
+            for batch in self.batches():
+                writer.write_batch(pa.record_batch(batch, schema=schema))
+                yield sink.drain()
+        yield sink.drain()
+
+    def parquet(self) -> Iterator[bytes]:
+        assert pa is not None and pq is not None
+        schema = self._schema()
+        sink = _Sink()
+        with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema) as writer:
+            for batch in self.batches():
+                writer.write_batch(pa.record_batch(batch, schema=schema))
+                yield sink.drain()
+        yield sink.drain()
+
+    def _schema(self):
+        assert pa is not None
+        types = {"int64": pa.int64(), "float64": pa.float64(), "string": pa.string()}
+        return pa.schema([(x, types[COLUMN_TYPES[x]]) for x in self.columns])
+
+
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _tsv_value(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.17g}"
+    if isinstance(value, str):
+        return value.translate(_TSV_ESCAPES)
+    return str(value)
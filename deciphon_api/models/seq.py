@@ -1,17 +1,37 @@
 from __future__ import annotations
 
-from typing import Optional
+from enum import Enum
+from typing import Iterable, List, Optional
 
-from deciphon_sched.seq import (
-    sched_seq,
+from deciphon_sched.seq import sched_seq
+from pydantic import BaseModel, Field
+
+from deciphon_api.core.sched import (
     sched_seq_get_all,
     sched_seq_get_by_id,
     sched_seq_new,
     sched_seq_scan_next,
 )
-from pydantic import BaseModel, Field
 
-__all__ = ["Seq", "Seqs", "SeqPost"]
+__all__ = ["Seq", "Seqs", "SeqPost", "SeqField", "SeqsFormat"]
+
+
+class SeqField(str, Enum):
+    ID = "id"
+    SCAN_ID = "scan_id"
+    NAME = "name"
+    DATA = "data"
+
+
+class SeqsFormat(str, Enum):
+    JSON = "json"
+    FASTA = "fasta"
+
+    @property
+    def media_type(self) -> str:
+        if self == SeqsFormat.FASTA:
+            return "text/x-fasta"
+        return "application/json"
 
 
 class Seq(BaseModel):
@@ -21,8 +41,13 @@ class Seq(BaseModel):
     data: str = ""
 
     @classmethod
-    def from_sched_seq(cls, seq: sched_seq):
-        return cls(
+    def from_sched_seq(
+        cls, seq: sched_seq, fields: Optional[Iterable[SeqField]] = None
+    ):
+        if fields is not None:
+            names = {SeqField.ID.value} | {field.value for field in fields}
+            return cls.construct(**{name: getattr(seq, name) for name in names})
+        return cls.construct(
             id=seq.id,
             scan_id=seq.scan_id,
             name=seq.name,
@@ -30,20 +55,44 @@ class Seq(BaseModel):
         )
 
     @classmethod
-    def get(cls, seq_id: int):
-        return Seq.from_sched_seq(sched_seq_get_by_id(seq_id))
+    def get(cls, seq_id: int, fields: Optional[Iterable[SeqField]] = None):
+        return Seq.from_sched_seq(sched_seq_get_by_id(seq_id), fields)
 
     @classmethod
-    def next(cls, seq_id: int, scan_id: int) -> Optional[Seq]:
+    def next(
+        cls, seq_id: int, scan_id: int, fields: Optional[Iterable[SeqField]] = None
+    ) -> Optional[Seq]:
         sched_seq = sched_seq_new(seq_id, scan_id)
         sched_seq = sched_seq_scan_next(sched_seq)
         if sched_seq is None:
             return None
-        return Seq.from_sched_seq(sched_seq)
+        return Seq.from_sched_seq(sched_seq, fields)
+
+    @classmethod
+    def chunk(
+        cls,
+        scan_id: int,
+        after: int,
+        limit: int,
+        max_bytes: Optional[int] = None,
+        fields: Optional[Iterable[SeqField]] = None,
+    ) -> Seqs:
+        seqs: List[Seq] = []
+        size = 0
+        cursor = sched_seq_new(after, scan_id)
+        while len(seqs) < limit:
+            sched_seq = sched_seq_scan_next(cursor)
+            if sched_seq is None:
+                break
+            size += len(sched_seq.name) + len(sched_seq.data)
+            if max_bytes is not None and len(seqs) > 0 and size > max_bytes:
+                break
+            seqs.append(Seq.from_sched_seq(sched_seq, fields))
+        return Seqs.construct(__root__=seqs)
 
     @staticmethod
-    def get_list() -> Seqs:
-        return Seqs.create(sched_seq_get_all())
+    def get_list(fields: Optional[Iterable[SeqField]] = None) -> Seqs:
+        return Seqs.create(sched_seq_get_all(), fields)
 
 
 class Seqs(BaseModel):
@@ -58,11 +107,15 @@ class Seqs(BaseModel):
     def __len__(self) -> int:
         return len(list(self.__root__))
 
+    def fasta(self) -> str:
+        return "".join(f">{x.id} {x.name}\n{x.data}\n" for x in self.__root__)
+
     @classmethod
-    def create(cls, seqs: list[sched_seq]):
-        return Seqs(
+    def create(cls, seqs: list[sched_seq], fields: Optional[Iterable[SeqField]] = None):
+        return Seqs.construct(
             __root__=[
-                Seq.from_sched_seq(seq) for seq in sorted(seqs, key=lambda seq: seq.id)
+                Seq.from_sched_seq(seq, fields)
+                for seq in sorted(seqs, key=lambda seq: seq.id)
             ]
         )
 
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+import aiofiles
+from fastapi import HTTPException
+from loguru import logger
+from pydantic import BaseModel, Field
+from starlette.status import (
+    HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+
+from deciphon_api.core.errors import InvalidFileNameError
+from deciphon_api.core.storage import file_xxh3, storage
+from deciphon_api.core.uploads import StreamedFile, to_signed
+from deciphon_api.models.db import DB
+from deciphon_api.models.hmm import HMM
+
+__all__ = ["Upload", "UploadKind", "UploadPost", "upload_sessions"]
+
+
+class UploadKind(str, Enum):
+    HMM = "hmm"
+    DB = "db"
+
+
+class UploadPost(BaseModel):
+    kind: UploadKind
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., ge=0)
+    xxh3: Optional[int] = None
+
+
+class Upload(BaseModel):
+    id: str
+    kind: UploadKind
+    filename: str
+    size: int = Field(..., ge=0)
+    xxh3: Optional[int] = None
+    received: int = Field(..., ge=0)
+    missing: List[Tuple[int, int]] = []
+
+    @staticmethod
+    def create(post: UploadPost) -> Upload:
+        if not storage.valid_name(post.filename):
+            raise InvalidFileNameError(post.filename)
+        if post.size > upload_sessions.max_size:
+            msg = f"Upload size exceeds {upload_sessions.max_size} bytes"
+            raise HTTPException(HTTP_413_REQUEST_ENTITY_TOO_LARGE, msg)
+        return upload_sessions.create(post).upload()
+
+    @staticmethod
+    def get(upload_id: str) -> Upload:
+        return _get_session(upload_id).upload()
+
+    @staticmethod
+    async def write(upload_id: str, offset: int, chunks: AsyncIterator[bytes]):
+        session = _get_session(upload_id)
+        position = offset
+        try:
+            async with aiofiles.open(upload_sessions.path(upload_id), "r+b") as file:
+                await file.seek(offset)
+                async for chunk in chunks:
+                    if position + len(chunk) > session.size:
+                        msg = f"Chunk ends past the upload size {session.size}"
+                        code = HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+                        raise HTTPException(code, msg)
+                    await file.write(chunk)
+                    position += len(chunk)
+        except FileNotFoundError:
+            raise _not_found(upload_id)
+        finally:
+            updated = upload_sessions.received(upload_id, offset, position)
+        if updated is None:
+            raise _not_found(upload_id)
+        return updated.upload()
+
+    @staticmethod
+    async def finalize(upload_id: str):
+        session, path = upload_sessions.take(upload_id)
+        xxh3 = to_signed(await asyncio.to_thread(file_xxh3, path))
+        expected = session.post.xxh3
+        if expected is not None and xxh3 != expected:
+            os.unlink(path)
+            msg = f"Expected xxh3 {expected}, got {xxh3}"
+            raise HTTPException(HTTP_422_UNPROCESSABLE_ENTITY, msg)
+
+        upload = StreamedFile(session.post.filename, path, xxh3, session.size)
+        if session.post.kind == UploadKind.HMM:
+            return HMM.submit_upload(upload)
+        return DB.add_upload(upload)
+
+    @staticmethod
+    def remove(upload_id: str):
+        if not upload_sessions.remove(upload_id):
+            raise _not_found(upload_id)
+
+
+class _Session:
+    def __init__(
+        self,
+        id: str,
+        post: UploadPost,
+        ranges: Optional[List[Tuple[int, int]]] = None,
+        touched: float = 0.0,
+    ):
+        self.id = id
+        self.post = post
+        self.size = post.size
+        self.ranges = ranges or []
+        self.touched = touched
+
+    def received(self, start: int, end: int):
+        if end <= start:
+            return
+        ranges = sorted(self.ranges + [(start, end)])
+        merged = [ranges[0]]
+        for lo, hi in ranges[1:]:
+            if lo <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+            else:
+                merged.append((lo, hi))
+        self.ranges = merged
+
+    def missing(self) -> List[Tuple[int, int]]:
+        gaps: List[Tuple[int, int]] = []
+        position = 0
+        for lo, hi in self.ranges:
+            if lo > position:
+                gaps.append((position, lo))
+            position = hi
+        if position < self.size:
+            gaps.append((position, self.size))
+        return gaps
+
+    def upload(self) -> Upload:
+        missing = self.missing()
+        return Upload(
+            id=self.id,
+            kind=self.post.kind,
+            filename=self.post.filename,
+            size=self.size,
+            xxh3=self.post.xxh3,
+            received=self.size - sum(hi - lo for lo, hi in missing),
+            missing=missing,
+        )
+
+
+class UploadSessions:
+    def __init__(self, ttl: float = 86400.0, max_size: int = 64 * 1024**3):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = Lock()
+
+    @property
+    def directory(self) -> Path:
+        return storage.uploads
+
+    def path(self, upload_id: str) -> Path:
+        return self.directory / upload_id
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.directory / ".lock", "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            yield
+
+    def create(self, post: UploadPost) -> _Session:
+        session = _Session(uuid4().hex, post, touched=time.time())
+        with self.locked():
+            with open(self.path(session.id), "wb") as file:
+                file.truncate(post.size)
+            self._save(session)
+        return session
+
+    def get(self, upload_id: str) -> Optional[_Session]:
+        with self.locked():
+            return self._load(upload_id)
+
+    def received(self, upload_id: str, start: int, end: int) -> Optional[_Session]:
+        with self.locked():
+            session = self._load(upload_id)
+            if session is not None:
+                session.received(start, end)
+                session.touched = time.time()
+                self._save(session)
+            return session
+
+    def take(self, upload_id: str) -> Tuple[_Session, str]:
+        with self.locked():
+            session = self._load(upload_id)
+            if session is None:
+                raise _not_found(upload_id)
+            if len(session.missing()) > 0:
+                raise HTTPException(HTTP_409_CONFLICT, "Upload is not complete")
+            path = storage.temp_path()
+            os.replace(self.path(upload_id), path)
+            os.utime(path)
+            self._meta(upload_id).unlink()
+            return (session, path)
+
+    def remove(self, upload_id: str) -> bool:
+        with self.locked():
+            if self._load(upload_id) is None:
+                return False
+            self._delete(upload_id)
+            return True
+
+    def sweep(self):
+        now = time.time()
+        with self.locked():
+            for entry in os.scandir(self.directory):
+                name = entry.name
+                if name.startswith("."):
+                    if name != ".lock":
+                        os.unlink(entry.path)
+                elif name.endswith(".json"):
+                    self._load(name.removesuffix(".json"), now)
+                elif not self._meta(name).exists():
+                    logger.info(f"removing orphaned upload {name}")
+                    os.unlink(entry.path)
+
+        if storage.tmp.exists():
+            for entry in os.scandir(storage.tmp):
+                if entry.stat().st_mtime + self.ttl <= now:
+                    os.unlink(entry.path)
+
+    def _meta(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.json"
+
+    def _load(self, upload_id: str, now: Optional[float] = None) -> Optional[_Session]:
+        if len(upload_id) != 32 or not upload_id.isalnum():
+            return None
+        try:
+            with open(self._meta(upload_id), "r") as file:
+                data = json.load(file)
+            session = _Session(
+                upload_id,
+                UploadPost(**data["post"]),
+                [(lo, hi) for lo, hi in data["ranges"]],
+                data["touched"],
+            )
+        except FileNotFoundError:
+            return None
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"removing unreadable upload {upload_id}")
+            self._delete(upload_id)
+            return None
+
+        if session.touched + self.ttl <= (now or time.time()):
+            logger.info(f"removing expired upload {upload_id}")
+            self._delete(upload_id)
+            return None
+        return session
+
+    def _save(self, session: _Session):
+        data = {
+            "post": session.post.dict(),
+            "ranges": session.ranges,
+            "touched": session.touched,
+        }
+        staged = self.directory / f".{session.id}.json"
+        with open(staged, "w") as file:
+            json.dump(data, file)
+        os.replace(staged, self._meta(session.id))
+
+    def _delete(self, upload_id: str):
+        self._meta(upload_id).unlink(missing_ok=True)
+        self.path(upload_id).unlink(missing_ok=True)
+
+
+def _get_session(upload_id: str) -> _Session:
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        raise _not_found(upload_id)
+    return session
+
+
+def _not_found(upload_id: str) -> HTTPException:
+    return HTTPException(HTTP_404_NOT_FOUND, f"Upload {upload_id} not found")
+
+
+upload_sessions = UploadSessions()
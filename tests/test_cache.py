@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from deciphon_api.core.cache import RecordCache
+
+
+def _keys(record):
+    return [("id", record.id), ("name", record.name)]
+
+
+def _loader(records, loads):
+    def load(key):
+        def _load():
+            loads.append(key)
+            kind, value = key
+            return next(x for x in records if getattr(x, kind) == value)
+
+        return _load
+
+    return load
+
+
+def test_record_cache_aliases():
+    records = [SimpleNamespace(id=1, name="a"), SimpleNamespace(id=2, name="b")]
+    loads = []
+    load = _loader(records, loads)
+    cache = RecordCache("test", _keys)
+
+    assert cache.get(("id", 1), load(("id", 1))) is records[0]
+    assert cache.get(("name", "a"), load(("name", "a"))) is records[0]
+    assert cache.get(("id", 1), load(("id", 1))) is records[0]
+    assert loads == [("id", 1)]
+    assert len(cache) == 1
+
+    cache.discard(("name", "a"))
+    assert len(cache) == 0
+    cache.get(("id", 1), load(("id", 1)))
+    assert loads == [("id", 1), ("id", 1)]
+
+
+def test_record_cache_lru():
+    records = [SimpleNamespace(id=i, name=str(i)) for i in range(3)]
+    loads = []
+    load = _loader(records, loads)
+    cache = RecordCache("test", _keys, maxsize=2)
+
+    cache.get(("id", 0), load(("id", 0)))
+    cache.get(("id", 1), load(("id", 1)))
+    cache.get(("id", 0), load(("id", 0)))
+    cache.get(("id", 2), load(("id", 2)))
+    assert len(cache) == 2
+    assert loads == [("id", 0), ("id", 1), ("id", 2)]
+
+    cache.get(("name", "0"), load(("name", "0")))
+    cache.get(("name", "1"), load(("name", "1")))
+    assert loads[-1] == ("name", "1")
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_record_cache_disabled():
+    records = [SimpleNamespace(id=1, name="a")]
+    loads = []
+    load = _loader(records, loads)
+    cache = RecordCache("test", _keys, maxsize=0)
+
+    cache.get(("id", 1), load(("id", 1)))
+    cache.get(("id", 1), load(("id", 1)))
+    assert len(cache) == 0
+    assert loads == [("id", 1), ("id", 1)]
@@ -1,11 +1,15 @@
+import asyncio
 import cgi
 import ctypes
+import os
 
 import pytest
 import xxhash
 from fastapi.testclient import TestClient
 from upload import upload_minifam, upload_minifam_db, upload_minifam_hmm, upload_pfam1
 
+import deciphon_api.data as data
+from deciphon_api.core.file_response import RangeFileResponse
 from deciphon_api.main import app, settings
 
 api_prefix = settings.api_prefix
@@ -106,6 +110,95 @@ def test_download_database():
         assert v == -3907098992699871052
 
 
+@pytest.mark.usefixtures("cleandir")
+def test_download_database_range():
+    with TestClient(app) as client:
+        upload_minifam(client)
+        with open(data.filepath(data.FileName.minifam_db), "rb") as f:
+            content = f.read()
+
+        response = client.head(api_prefix + "/dbs/1/download")
+        assert response.status_code == 200
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-length"] == str(len(content))
+        etag = response.headers["etag"]
+        xxh3 = client.get(api_prefix + "/dbs/1").json()["xxh3"]
+        assert etag == f'"{ctypes.c_uint64(xxh3).value:016x}"'
+
+        headers = {"Range": "bytes=10-19"}
+        response = client.get(api_prefix + "/dbs/1/download", headers=headers)
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+        assert response.content == content[10:20]
+
+        headers = {"Range": "bytes=-5", "If-Range": etag}
+        response = client.get(api_prefix + "/dbs/1/download", headers=headers)
+        assert response.status_code == 206
+        assert response.content == content[-5:]
+
+        headers = {"Range": "bytes=10-19", "If-Range": '"0000000000000000"'}
+        response = client.get(api_prefix + "/dbs/1/download", headers=headers)
+        assert response.status_code == 200
+        assert response.content == content
+
+        headers = {"Range": f"bytes={len(content)}-"}
+        response = client.get(api_prefix + "/dbs/1/download", headers=headers)
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(content)}"
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_download_database_conditional():
+    with TestClient(app) as client:
+        upload_minifam(client)
+        url = api_prefix + "/dbs/1/download"
+
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        last_modified = response.headers["last-modified"]
+
+        for value in [etag, f"W/{etag}", f'"0", {etag}', "*"]:
+            response = client.get(url, headers={"If-None-Match": value})
+            assert response.status_code == 304
+            assert response.content == b""
+            assert response.headers["etag"] == etag
+
+        response = client.get(url, headers={"If-None-Match": '"0000000000000000"'})
+        assert response.status_code == 200
+
+        response = client.get(url, headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+        old = "Thu, 01 Jan 1970 00:00:00 GMT"
+        response = client.get(url, headers={"If-Modified-Since": old})
+        assert response.status_code == 200
+
+        headers = {"If-None-Match": '"0"', "If-Modified-Since": last_modified}
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+
+
+def test_range_file_response_partial_body(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(b"0123456789")
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"range", b"bytes=2-5")],
+    }
+    response = RangeFileResponse(str(path), '"etag"')
+    asyncio.run(response(scope, None, send))
+    assert messages[0]["status"] == 206
+    assert [x["type"] for x in messages[1:]] == ["http.response.body"]
+    assert messages[1]["body"] == b"2345"
+
+
 @pytest.mark.usefixtures("cleandir")
 def test_download_database_notfound():
     with TestClient(app) as client:
@@ -152,3 +245,55 @@ def test_remove_database():
         response = client.delete(f"{prefix}/dbs/1", headers=hdrs)
         assert response.status_code == 200
         assert response.json() == {}
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_get_database_cached():
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        for _ in range(3):
+            response = client.get(api_prefix + "/dbs/1")
+            assert response.status_code == 200
+        response = client.get(api_prefix + "/dbs/minifam.dcp?id_type=filename")
+        assert response.status_code == 200
+
+        text = client.get(api_prefix + "/metrics").text
+        assert 'deciphon_cache_records{cache="db"} 1' in text
+        assert 'deciphon_cache_hits_total{cache="db"}' in text
+
+        hdrs = {"X-API-Key": f"{api_key}"}
+        response = client.delete(f"{api_prefix}/dbs/1", headers=hdrs)
+        assert response.status_code == 200
+
+        response = client.get(api_prefix + "/dbs/1")
+        assert response.status_code == 404
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_upload_db_storage_layout():
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        db_path = data.filepath(data.FileName.minifam_db)
+        xxh3 = xxhash.xxh3_64_hexdigest(db_path.read_bytes())
+        obj = os.path.join("objects", xxh3[:2], xxh3)
+        assert os.path.samefile(db_path.name, obj)
+        assert os.listdir("tmp") == []
+
+        minifam_hmm = data.filepath(data.FileName.minifam_hmm)
+        pfam1_hmm = data.filepath(data.FileName.pfam1_hmm)
+        response = client.post(
+            f"{api_prefix}/hmms/",
+            files={
+                "hmm_file": (
+                    minifam_hmm.name,
+                    open(pfam1_hmm, "rb"),
+                    "application/octet-stream",
+                ),
+            },
+            headers={"X-API-Key": f"{api_key}"},
+        )
+        assert response.status_code == 409
+        assert open(minifam_hmm.name, "rb").read() == minifam_hmm.read_bytes()
+        assert len(os.listdir("objects")) == 2
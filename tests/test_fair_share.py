@@ -0,0 +1,100 @@
+from deciphon_api.core.fair_share import FairQueue
+
+
+def drain(queue: FairQueue):
+    order = []
+    while (job_id := queue.peek()) is not None:
+        queue.started(job_id)
+        order.append(job_id)
+    return order
+
+
+def test_fair_queue_round_robin():
+    queue = FairQueue(["high", "normal"])
+    for job_id in [1, 2, 3, 4]:
+        queue.push(job_id, "normal", "a")
+    for job_id in [5, 6]:
+        queue.push(job_id, "normal", "b")
+    queue.push(7, "high", "c")
+    assert len(queue) == 7
+    assert drain(queue) == [7, 1, 5, 2, 6, 3, 4]
+    assert len(queue) == 0
+
+
+def test_fair_queue_weights():
+    queue = FairQueue(["normal"])
+    queue.weights = {"a": 2}
+    for job_id in range(1, 7):
+        queue.push(job_id, "normal", "a")
+    for job_id in range(7, 10):
+        queue.push(job_id, "normal", "b")
+    assert drain(queue) == [1, 7, 2, 3, 8, 4, 5, 9, 6]
+
+
+def test_fair_queue_late_tenant():
+    queue = FairQueue(["normal"])
+    for job_id in range(1, 5):
+        queue.push(job_id, "normal", "a")
+    queue.started(1)
+    queue.started(2)
+    queue.push(9, "normal", "b")
+    queue.push(10, "normal", "b")
+    assert drain(queue) == [9, 3, 10, 4]
+
+
+def test_fair_queue_discard_and_stats():
+    queue = FairQueue(["high", "normal"])
+    queue.push(1, "normal")
+    queue.push(2, "high")
+    queue.discard(1)
+    queue.started(3)
+    assert queue.peek() == 2
+    queue.started(2)
+    stats = dict(queue.stats())
+    assert (stats["high"].pending, stats["high"].started) == (0, 1)
+    assert (stats["normal"].pending, stats["normal"].started) == (0, 0)
+    assert stats["high"].max_wait >= stats["high"].mean_wait >= 0
+
+
+def test_fair_queue_shared(tmp_path):
+    first = FairQueue(["high", "normal"])
+    second = FairQueue(["high", "normal"])
+    first.share(tmp_path / "queue")
+    second.share(tmp_path / "queue")
+
+    first.push(1, "normal", "a")
+    first.push(2, "normal", "a")
+    second.push(3, "normal", "b")
+    second.push(4, "high", "c")
+    assert len(first) == 4
+    assert first.peek() == 4
+
+    first.started(4)
+    assert second.peek() == 1
+    second.started(1)
+    assert first.peek() == 3
+
+    second.retain([2])
+    assert drain(first) == [2]
+    stats = dict(second.stats())
+    assert (stats["high"].pending, stats["high"].started) == (0, 1)
+    assert (stats["normal"].pending, stats["normal"].started) == (0, 2)
+
+
+def test_fair_queue_shared_log_compacts(tmp_path):
+    first = FairQueue(["normal"])
+    second = FairQueue(["normal"])
+    first.share(tmp_path / "queue")
+    second.share(tmp_path / "queue")
+
+    for job_id in range(1, 1501):
+        first.push(job_id, "normal")
+        first.started(job_id)
+    first.push(1501, "normal")
+    assert len((tmp_path / "queue").read_text().splitlines()) < 1500
+
+    assert second.peek() == 1501
+    assert dict(second.stats())["normal"].started == 1500
+    third = FairQueue(["normal"])
+    third.share(tmp_path / "queue")
+    assert len(third) == 1
@@ -1,7 +1,12 @@
+import os
+
 import pytest
+import xxhash
 from fastapi.testclient import TestClient
-from upload import upload_minifam_hmm
+from upload import upload_minifam, upload_minifam_hmm
 
+import deciphon_api.data as data
+from deciphon_api.core.compression import Encoding
 from deciphon_api.main import app, settings
 
 api_prefix = settings.api_prefix
@@ -156,3 +161,98 @@ def test_download_hmm():
 
         response = client.get(f"{prefix}/hmms/1/download")
         assert response.status_code == 200
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_download_hmm_compressed(monkeypatch):
+    monkeypatch.setattr(settings, "hmm_compression", Encoding.GZIP)
+    minifam_hmm = data.filepath(data.FileName.minifam_hmm)
+    content = minifam_hmm.read_bytes()
+    url = f"{api_prefix}/hmms/1/download"
+
+    with TestClient(app) as client:
+        upload_minifam(client)
+        assert not os.path.exists(minifam_hmm.name)
+        assert os.listdir("objects/" + os.listdir("objects")[0])
+
+        response = client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(content)
+        assert response.content == content
+
+        etag = response.headers["etag"]
+        headers = {"Accept-Encoding": "gzip", "If-None-Match": etag}
+        assert client.get(url, headers=headers).status_code == 304
+
+        response = client.get(url, headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"] != etag
+        assert response.content == content
+
+        identity = {"Accept-Encoding": "identity"}
+        headers = {**identity, "If-None-Match": response.headers["etag"]}
+        response = client.get(url, headers=headers)
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = client.head(url, headers=identity)
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.content == b""
+
+        response = client.get(url, headers={"Accept-Encoding": "*, gzip;q=0"})
+        assert "content-encoding" not in response.headers
+
+        pfam1_hmm = data.filepath(data.FileName.pfam1_hmm)
+        response = client.post(
+            f"{api_prefix}/hmms/",
+            files={"hmm_file": (minifam_hmm.name, open(pfam1_hmm, "rb"))},
+            headers={"X-API-Key": f"{api_key}"},
+        )
+        assert response.status_code == 409
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_upload_hmm_by_xxh3():
+    minifam_hmm = data.filepath(data.FileName.minifam_hmm)
+    xxh3 = xxhash.xxh3_64_intdigest(minifam_hmm.read_bytes())
+    xxh3 = xxh3 - (1 << 64) if xxh3 >= (1 << 63) else xxh3
+    hdrs = {"X-API-Key": f"{api_key}"}
+
+    def upload(params, content=None):
+        return client.post(
+            f"{api_prefix}/hmms/",
+            params=params,
+            files={
+                "hmm_file": (
+                    minifam_hmm.name,
+                    content if content is not None else open(minifam_hmm, "rb"),
+                    "application/octet-stream",
+                )
+            },
+            headers=hdrs,
+        )
+
+    with TestClient(app) as client:
+        response = upload({"xxh3": xxh3 + 1})
+        assert response.status_code == 422
+        assert not os.path.exists(minifam_hmm.name)
+
+        response = upload({"xxh3": xxh3})
+        assert response.status_code == 201
+        assert response.json()["xxh3"] == xxh3
+        assert response.json()["filename"] == minifam_hmm.name
+
+        response = upload({"xxh3": xxh3}, b"")
+        assert response.status_code == 200
+        assert response.json()["id"] == 1
+
+        response = upload({})
+        assert response.status_code == 418
+        assert response.json()["rc"] == 21
+
+        response = client.post(f"{api_prefix}/hmms/", headers=hdrs)
+        assert response.status_code == 400
@@ -0,0 +1,50 @@
+import asyncio
+
+from deciphon_api.core.job_events import JobEventBus
+from deciphon_api.models.job import Job, JobState
+
+
+def job(id: int, state: JobState, progress: int = 0):
+    return Job.construct(
+        id=id,
+        type=0,
+        state=state,
+        progress=progress,
+        error="",
+        submission=1,
+        exec_started=0,
+        exec_ended=0,
+    )
+
+
+def test_job_events_filters():
+    async def main():
+        bus = JobEventBus()
+        stream = bus.stream([1, 2], [JobState.SCHED_RUN], heartbeat=10)
+        first = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0)
+        assert bus.active
+
+        bus.publish("state", job(3, JobState.SCHED_RUN))
+        bus.publish("state", job(1, JobState.SCHED_DONE))
+        bus.publish("progress", job(2, JobState.SCHED_RUN, 10))
+
+        event = (await first).decode()
+        assert event.startswith("event: progress\ndata: {")
+        assert '"id": 2' in event
+        assert '"progress": 10' in event
+
+        await stream.aclose()
+        assert not bus.active
+
+    asyncio.run(main())
+
+
+def test_job_events_heartbeat():
+    async def main():
+        bus = JobEventBus()
+        stream = bus.stream(None, None, heartbeat=0.01)
+        assert await stream.__anext__() == b": heartbeat\n\n"
+        await stream.aclose()
+
+    asyncio.run(main())
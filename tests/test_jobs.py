@@ -1,9 +1,19 @@
+import threading
+import time
+
 import pytest
+from deciphon_sched.error import SchedError
+from deciphon_sched.rc import RC
 from fastapi.testclient import TestClient
+from pydantic import ValidationError
 from upload import upload_minifam, upload_pfam1
 
 import deciphon_api.data as data
+import deciphon_api.models.job as job_module
+from deciphon_api.core.leases import job_leases
+from deciphon_api.core.settings import Settings
 from deciphon_api.main import app, settings
+from deciphon_api.models.job import Job
 
 api_prefix = settings.api_prefix
 api_key = settings.api_key
@@ -24,6 +34,37 @@ def test_get_next_pend_job_empty():
         assert response.status_code == 204
 
 
+@pytest.mark.usefixtures("cleandir")
+def test_get_next_pend_job_wait_timeout():
+    with TestClient(app) as client:
+        start = time.monotonic()
+        params = {"wait": 0.2}
+        response = client.get(f"{api_prefix}/jobs/next-pend", params=params)
+        assert response.status_code == 204
+        assert time.monotonic() - start >= 0.2
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_get_next_pend_job_wait():
+    with TestClient(app) as client:
+        responses = []
+
+        def wait_for_job():
+            params = {"wait": 10}
+            responses.append(client.get(f"{api_prefix}/jobs/next-pend", params=params))
+
+        start = time.monotonic()
+        thread = threading.Thread(target=wait_for_job)
+        thread.start()
+        time.sleep(0.2)
+        upload_minifam(client)
+        thread.join()
+
+        assert time.monotonic() - start < 10
+        assert responses[0].status_code == 200
+        assert responses[0].json()["id"] == 1
+
+
 @pytest.mark.usefixtures("cleandir")
 def test_get_next_pend_job():
     with TestClient(app) as client:
@@ -271,6 +312,259 @@ def test_get_job_list():
         ]
 
 
+@pytest.mark.usefixtures("cleandir")
+def test_get_job_list_filtered():
+    hdrs = {"X-API-Key": f"{api_key}"}
+    with TestClient(app) as client:
+        upload_minifam(client)
+        upload_pfam1(client)
+
+        response = client.patch(
+            f"{api_prefix}/jobs/2/state", json={"state": "run"}, headers=hdrs
+        )
+        assert response.status_code == 200
+
+        response = client.get(f"{api_prefix}/jobs", params={"state": "pend"})
+        assert [x["id"] for x in response.json()] == [1]
+
+        params = {"state": ["pend", "run"], "type": 1}
+        response = client.get(f"{api_prefix}/jobs", params=params)
+        assert [x["id"] for x in response.json()] == [1, 2]
+
+        response = client.get(f"{api_prefix}/jobs", params={"submission_min": 1})
+        assert [x["id"] for x in response.json()] == [1, 2]
+
+        response = client.get(f"{api_prefix}/jobs", params={"submission_max": 1})
+        assert response.json() == []
+
+        response = client.get(f"{api_prefix}/jobs", params={"exec_ended_min": 1})
+        assert response.json() == []
+
+        response = client.get(f"{api_prefix}/jobs", params={"limit": 1})
+        assert [x["id"] for x in response.json()] == [1]
+        assert response.headers["x-next-after"] == "1"
+
+        params = {"limit": 1, "after": 1}
+        response = client.get(f"{api_prefix}/jobs", params=params)
+        assert [x["id"] for x in response.json()] == [2]
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_get_job_count():
+    with TestClient(app) as client:
+        response = client.get(f"{api_prefix}/jobs/count")
+        assert response.status_code == 200
+        assert response.json() == {"count": 0}
+
+        upload_minifam(client)
+        upload_pfam1(client)
+
+        response = client.get(f"{api_prefix}/jobs/count", params={"state": "pend"})
+        assert response.status_code == 200
+        assert response.json() == {"count": 2}
+
+        response = client.patch(
+            f"{api_prefix}/jobs/1/state",
+            json={"state": "run", "error": ""},
+            headers={"X-API-Key": f"{api_key}"},
+        )
+        assert response.status_code == 200
+
+        response = client.get(f"{api_prefix}/jobs/count", params={"state": "pend"})
+        assert response.json() == {"count": 1}
+
+        response = client.get(f"{api_prefix}/jobs/count", params={"state": "run"})
+        assert response.json() == {"count": 1}
+
+        response = client.get(f"{api_prefix}/jobs/count")
+        assert response.json() == {"count": 2}
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_claim_jobs():
+    hdrs = {"X-API-Key": f"{api_key}"}
+    with TestClient(app) as client:
+        params = {"limit": 5, "worker": "node1"}
+        response = client.post(f"{api_prefix}/jobs/claim", params=params)
+        assert response.status_code == 403
+
+        response = client.post(f"{api_prefix}/jobs/claim", params=params, headers=hdrs)
+        assert response.status_code == 200
+        assert response.json() == []
+
+        upload_minifam(client)
+        upload_pfam1(client)
+
+        params = {"limit": 1, "worker": "node1"}
+        response = client.post(f"{api_prefix}/jobs/claim", params=params, headers=hdrs)
+        assert response.status_code == 200
+        assert [(x["id"], x["state"]) for x in response.json()] == [(1, "run")]
+
+        params = {"limit": 5, "worker": "node2"}
+        response = client.post(f"{api_prefix}/jobs/claim", params=params, headers=hdrs)
+        assert response.status_code == 200
+        assert [(x["id"], x["state"]) for x in response.json()] == [(2, "run")]
+
+        response = client.get(f"{api_prefix}/jobs/next-pend")
+        assert response.status_code == 204
+
+        response = client.get(f"{api_prefix}/jobs/count", params={"state": "run"})
+        assert response.json() == {"count": 2}
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_claim_jobs_partial_failure(monkeypatch):
+    hdrs = {"X-API-Key": f"{api_key}"}
+    with TestClient(app) as client:
+        upload_minifam(client)
+        upload_pfam1(client)
+
+        set_run = job_module.sched_job_set_run
+
+        def fail_second(job_id: int):
+            if job_id == 2:
+                raise SchedError(RC.SCHED_FAIL_EXEC_STMT)
+            set_run(job_id)
+
+        monkeypatch.setattr(job_module, "sched_job_set_run", fail_second)
+        params = {"limit": 5, "worker": "node1"}
+        response = client.post(f"{api_prefix}/jobs/claim", params=params, headers=hdrs)
+        assert response.status_code == 200
+        assert [(x["id"], x["state"]) for x in response.json()] == [(1, "run")]
+        assert job_leases.get(1).worker == "node1"
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_claim_jobs_by_priority(monkeypatch):
+    monkeypatch.setattr(settings, "tenant_keys", {"alice": "alice-key"})
+    hdrs = {"X-API-Key": f"{api_key}"}
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        def submit(priority: str, key: str = ""):
+            consensus_faa = data.filepath(data.FileName.consensus_faa)
+            return client.post(
+                f"{api_prefix}/scans/",
+                data={"db_id": 1, "priority": priority},
+                files={
+                    "fasta_file": (
+                        consensus_faa.name,
+                        open(consensus_faa, "rb"),
+                        "text/plain",
+                    )
+                },
+                headers={"X-API-Key": key} if key else {},
+            )
+
+        assert submit("high").status_code == 403
+        assert submit("high", "wrong-key").status_code == 403
+        assert submit("normal").json()["id"] == 2
+        assert submit("normal").json()["id"] == 3
+        assert submit("high", "alice-key").json()["id"] == 4
+
+        response = client.get(f"{api_prefix}/jobs/next-pend")
+        assert response.json()["id"] == 4
+
+        params = {"limit": 4, "worker": "node1"}
+        response = client.post(f"{api_prefix}/jobs/claim", params=params, headers=hdrs)
+        assert response.status_code == 200
+        assert [x["id"] for x in response.json()] == [4, 1, 2, 3]
+
+        response = client.get(f"{api_prefix}/jobs/queue")
+        assert response.status_code == 200
+        stats = {x["priority"]: x for x in response.json()}
+        assert (stats["high"]["pending"], stats["high"]["started"]) == (0, 1)
+        assert (stats["normal"]["pending"], stats["normal"]["started"]) == (0, 3)
+
+
+def test_fair_share_weights_must_be_positive():
+    with pytest.raises(ValidationError):
+        Settings(fair_share_weights={"alice": 0})
+    with pytest.raises(ValidationError):
+        Settings(fair_share_weights={"alice": -1})
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_job_lease_expiry():
+    hdrs = {"X-API-Key": f"{api_key}"}
+    with TestClient(app) as client:
+        upload_minifam(client)
+        upload_pfam1(client)
+
+        params = {"limit": 2, "worker": "node1"}
+        response = client.post(f"{api_prefix}/jobs/claim", params=params, headers=hdrs)
+        assert response.status_code == 200
+
+        params = {"worker": "node2"}
+        response = client.post(
+            f"{api_prefix}/jobs/1/heartbeat", params=params, headers=hdrs
+        )
+        assert response.status_code == 409
+
+        params = {"worker": "node1"}
+        response = client.post(
+            f"{api_prefix}/jobs/1/heartbeat", params=params, headers=hdrs
+        )
+        assert response.status_code == 200
+        assert response.json()["worker"] == "node1"
+        assert response.json()["expires_in"] > 0
+
+        job_leases.ttl = 0
+        response = client.post(
+            f"{api_prefix}/jobs/1/heartbeat", params=params, headers=hdrs
+        )
+        assert response.status_code == 200
+
+        response = client.patch(
+            f"{api_prefix}/jobs/2/state", json={"state": "done"}, headers=hdrs
+        )
+        assert response.status_code == 200
+
+        assert [job.id for job in Job.reap()] == [1]
+
+        response = client.get(f"{api_prefix}/jobs/1")
+        assert response.json()["state"] == "fail"
+        assert response.json()["error"] == "lease held by node1 expired"
+
+        response = client.get(f"{api_prefix}/jobs/2")
+        assert response.json()["state"] == "done"
+
+        response = client.post(
+            f"{api_prefix}/jobs/1/heartbeat", params=params, headers=hdrs
+        )
+        assert response.status_code == 409
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_job_lease_on_state_run():
+    hdrs = {"X-API-Key": f"{api_key}"}
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        response = client.patch(
+            f"{api_prefix}/jobs/1/state", json={"state": "run"}, headers=hdrs
+        )
+        assert response.status_code == 200
+        assert job_leases.get(1) is not None
+
+        params = {"worker": "node1"}
+        response = client.post(
+            f"{api_prefix}/jobs/1/heartbeat", params=params, headers=hdrs
+        )
+        assert response.status_code == 200
+        assert response.json()["worker"] == "node1"
+
+        job_leases.ttl = 0
+        job_leases.renew(1, "node1")
+        expired = job_leases.expired()
+        job_leases.ttl = 60
+        job_leases.renew(1, "node1")
+        assert list(expired) == [1]
+        assert job_leases.release_expired(1) is None
+        assert Job.reap() == []
+        assert job_leases.get(1) is not None
+
+
 @pytest.mark.usefixtures("cleandir")
 def test_get_hmm_from_job():
     with TestClient(app) as client:
@@ -365,19 +659,34 @@ def test_add_job_progress():
         assert response.status_code == 403
 
         hdrs = {"X-API-Key": f"{api_key}"}
+        response = client.patch(
+            f"{prefix}/jobs/1/progress", json={"increment": 10}, headers=hdrs
+        )
+        assert response.status_code == 409
+
+        response = client.patch(
+            f"{prefix}/jobs/9/progress", json={"increment": 10}, headers=hdrs
+        )
+        assert response.status_code == 404
+
+        response = client.patch(
+            f"{prefix}/jobs/1/state", json={"state": "run"}, headers=hdrs
+        )
+        assert response.status_code == 200
+
         response = client.patch(
             f"{prefix}/jobs/1/progress", json={"increment": 10}, headers=hdrs
         )
         assert response.status_code == 200
         data = response.json()
         del data["submission"]
+        del data["exec_started"]
         assert data == {
             "id": 1,
             "type": 1,
-            "state": "pend",
+            "state": "run",
             "progress": 10,
             "error": "",
-            "exec_started": 0,
             "exec_ended": 0,
         }
 
@@ -387,12 +696,75 @@ def test_add_job_progress():
         assert response.status_code == 200
         data = response.json()
         del data["submission"]
+        del data["exec_started"]
         assert data == {
             "id": 1,
             "type": 1,
-            "state": "pend",
+            "state": "run",
             "progress": 100,
             "error": "",
-            "exec_started": 0,
             "exec_ended": 0,
         }
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_add_jobs_progress():
+    hdrs = {"X-API-Key": f"{api_key}"}
+    with TestClient(app) as client:
+        upload_minifam(client)
+        upload_pfam1(client)
+
+        patches = [
+            {"job_id": 1, "increment": 10},
+            {"job_id": 2, "increment": 60},
+            {"job_id": 1, "increment": 5},
+            {"job_id": 2, "increment": 60},
+        ]
+        response = client.patch(f"{api_prefix}/jobs/progress", json=patches)
+        assert response.status_code == 403
+
+        response = client.patch(
+            f"{api_prefix}/jobs/progress", json=patches, headers=hdrs
+        )
+        assert response.status_code == 409
+
+        params = {"limit": 2, "worker": "node1"}
+        response = client.post(f"{api_prefix}/jobs/claim", params=params, headers=hdrs)
+        assert response.status_code == 200
+
+        response = client.patch(
+            f"{api_prefix}/jobs/progress",
+            json=patches + [{"job_id": 9, "increment": 1}],
+            headers=hdrs,
+        )
+        assert response.status_code == 404
+        response = client.get(f"{api_prefix}/jobs/1")
+        assert response.json()["progress"] == 0
+
+        response = client.patch(
+            f"{api_prefix}/jobs/progress", json=patches, headers=hdrs
+        )
+        assert response.status_code == 204
+
+        response = client.get(f"{api_prefix}/jobs/1")
+        assert response.json()["progress"] == 15
+
+        response = client.patch(
+            f"{api_prefix}/jobs/progress",
+            json=patches[:1],
+            params={"echo": True},
+            headers=hdrs,
+        )
+        assert response.status_code == 200
+        assert [(x["id"], x["progress"]) for x in response.json()] == [(1, 25)]
+
+        response = client.get(f"{api_prefix}/jobs")
+        assert [x["progress"] for x in response.json()] == [25, 100]
+
+        response = client.patch(
+            f"{api_prefix}/jobs/2/progress",
+            json={"increment": 1},
+            params={"echo": False},
+            headers=hdrs,
+        )
+        assert response.status_code == 204
@@ -0,0 +1,129 @@
+import pytest
+from fastapi.testclient import TestClient
+from loguru import logger
+from upload import upload_minifam
+
+from deciphon_api.core.instrumentation import requests_total
+from deciphon_api.core.metrics import Registry
+from deciphon_api.core.sched import call_log
+from deciphon_api.main import app, settings
+
+api_prefix = settings.api_prefix
+api_key = settings.api_key
+
+
+def test_registry_render():
+    registry = Registry()
+    counter = registry.counter("requests_total", "Requests.", ["path"])
+    counter.inc(path="/a")
+    counter.inc(2, path='/"b"')
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=[1, 5])
+    histogram.observe(0.5)
+    histogram.observe(3)
+    registry.gauge("up", "Up.", collect=lambda: {(): 1})
+
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{path="/a"} 1\n'
+        'requests_total{path="/\\"b\\""} 2\n'
+        "# HELP latency_seconds Latency.\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="1"} 1\n'
+        'latency_seconds_bucket{le="5"} 2\n'
+        'latency_seconds_bucket{le="+Inf"} 2\n'
+        "latency_seconds_sum 3.5\n"
+        "latency_seconds_count 2\n"
+        "# HELP up Up.\n"
+        "# TYPE up gauge\n"
+        "up 1\n"
+    )
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_get_metrics():
+    hdrs = {"X-API-Key": f"{api_key}"}
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        params = {"limit": 1, "worker": "node1"}
+        response = client.post(f"{api_prefix}/jobs/claim", params=params, headers=hdrs)
+        assert response.status_code == 200
+
+        response = client.patch(
+            f"{api_prefix}/jobs/1/state", json={"state": "done"}, headers=hdrs
+        )
+        assert response.status_code == 200
+
+        response = client.get(f"{api_prefix}/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        lines = response.text.splitlines()
+        assert 'deciphon_jobs{state="done"} 1' in lines
+        assert 'deciphon_jobs{state="pend"} 0' in lines
+        assert any(
+            x.startswith('deciphon_jobs_finished_total{type="hmm",state="done"}')
+            for x in lines
+        )
+        assert any(
+            x.startswith('deciphon_job_run_seconds_count{type="hmm"}') for x in lines
+        )
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_get_request_metrics():
+    def count(route: str, status: str) -> float:
+        return requests_total.value(route=route, method="GET", status=status)
+
+    routes = [
+        ("dbs:get-db", "200"),
+        ("hmms:get-db-by-hmm-id", "200"),
+        ("unmatched", "404"),
+    ]
+    with TestClient(app) as client:
+        upload_minifam(client)
+        before = [count(*x) for x in routes]
+        assert client.get(f"{api_prefix}/dbs/1").status_code == 200
+        assert client.get(f"{api_prefix}/hmms/1/db").status_code == 200
+        assert client.get(f"{api_prefix}/no-such-path").status_code == 404
+        assert [count(*x) - y for x, y in zip(routes, before)] == [1, 1, 1]
+
+        lines = client.get(f"{api_prefix}/metrics").text.splitlines()
+        assert 'deciphon_http_requests_in_flight{method="GET"} 1' in lines
+        prefixes = [
+            'deciphon_http_request_duration_seconds_count{route="dbs:get-db"}',
+            'deciphon_http_response_size_bytes_count{route="dbs:get-db"}',
+            'deciphon_sched_call_duration_seconds_count{function="sched_db_add"}',
+        ]
+        for prefix in prefixes:
+            assert any(x.startswith(prefix) for x in lines)
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_server_timing_and_slow_calls():
+    messages = []
+    sink = logger.add(messages.append, level="WARNING", format="{message}")
+    try:
+        with TestClient(app) as client:
+            upload_minifam(client)
+            call_log.threshold = 0
+
+            headers = {"X-Request-ID": "req-42"}
+            response = client.get(f"{api_prefix}/hmms", headers=headers)
+            assert response.status_code == 200
+            assert response.headers["x-request-id"] == "req-42"
+
+            timing = dict(
+                x.strip().split(";dur=")
+                for x in response.headers["server-timing"].split(",")
+            )
+            assert set(timing) == {"sched", "python"}
+            assert float(timing["sched"]) > 0
+
+            response = client.get(f"{api_prefix}/dbs/1")
+            assert len(response.headers["x-request-id"]) == 16
+    finally:
+        call_log.threshold = settings.slow_sched_call
+        logger.remove(sink)
+
+    assert any(x.startswith("[req-42] slow sched_hmm_get_all()") for x in messages)
@@ -1,8 +1,12 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
+from pydantic import BaseModel
 from upload import upload_minifam
 
 import deciphon_api.data as data
+from deciphon_api.core.responses import TrustedJSONResponse
 from deciphon_api.main import app, settings
 
 api_prefix = settings.api_prefix
@@ -47,3 +51,62 @@ def test_upload_products():
         )
         assert response.status_code == 201
         assert response.json() == {}
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_get_products_with_fields():
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        consensus_faa = data.filepath(data.FileName.consensus_faa)
+        response = client.post(
+            f"{api_prefix}/scans/",
+            data={"db_id": 1, "multi_hits": True, "hmmer3_compat": False},
+            files={
+                "fasta_file": (
+                    consensus_faa.name,
+                    open(consensus_faa, "rb"),
+                    "text/plain",
+                )
+            },
+        )
+        assert response.status_code == 201
+
+        with open("prods_file.tsv", "wb") as f:
+            f.write(data.prods_file_content().encode())
+
+        response = client.post(
+            f"{api_prefix}/prods/",
+            files={
+                "prods_file": (
+                    "prods_file.tsv",
+                    open("prods_file.tsv", "rb"),
+                    "text/tab-separated-values",
+                )
+            },
+            headers={"X-API-Key": f"{api_key}"},
+        )
+        assert response.status_code == 201
+
+        params = {"fields": ["seq_id", "profile_name"]}
+        response = client.get(f"{api_prefix}/prods", params=params)
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": 1, "seq_id": 1, "profile_name": "PF00742.20"},
+            {"id": 2, "seq_id": 2, "profile_name": "PF00696.29"},
+        ]
+
+        response = client.get(f"{api_prefix}/prods/1", params={"fields": "alt_loglik"})
+        assert response.status_code == 200
+        assert response.json() == {"id": 1, "alt_loglik": -547.8771362304688}
+
+
+def test_trusted_json_response_keeps_defaults():
+    class Model(BaseModel):
+        id: int
+        name: str = ""
+
+    model = Model.construct(id=1)
+    assert json.loads(TrustedJSONResponse(model).body) == {"id": 1, "name": ""}
+    response = TrustedJSONResponse([model], projected=True)
+    assert json.loads(response.body) == [{"id": 1}]
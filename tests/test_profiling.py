@@ -0,0 +1,53 @@
+import pstats
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from upload import upload_minifam
+
+from deciphon_api.core.profiling import ProfileMiddleware
+from deciphon_api.main import app, settings
+
+api_prefix = settings.api_prefix
+api_key = settings.api_key
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_profile_attachment():
+    with TestClient(ProfileMiddleware(app, api_key)) as client:
+        upload_minifam(client)
+
+        response = client.get(f"{api_prefix}/dbs/1", headers={"X-Profile": "pstats"})
+        assert response.status_code == 200
+        assert "id" in response.json()
+
+        headers = {"X-API-Key": api_key}
+        response = client.get(f"{api_prefix}/dbs/1?profile=pstats", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["x-profiled-status"] == "200"
+        assert "profile.pstats" in response.headers["content-disposition"]
+        Path("profile.pstats").write_bytes(response.content)
+        stats = pstats.Stats("profile.pstats")
+        assert any(x[2] == "get_db" for x in stats.stats)  # type: ignore
+
+        headers["X-Profile"] = "collapsed"
+        response = client.get(f"{api_prefix}/dbs/999", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["x-profiled-status"] == "404"
+        assert response.headers["content-type"].startswith("text/plain")
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_profile_stored():
+    directory = Path("profiles")
+    with TestClient(ProfileMiddleware(app, api_key, directory)) as client:
+        upload_minifam(client)
+
+        headers = {"X-API-Key": api_key, "X-Profile": ""}
+        response = client.get(f"{api_prefix}/dbs/1", headers=headers)
+        assert response.status_code == 200
+        assert "id" in response.json()
+
+        filename = response.headers["x-profile-file"]
+        assert filename.endswith(".pstats")
+        pstats.Stats(str(directory / filename))
@@ -1,10 +1,12 @@
 import pytest
 from fasta_reader import read_fasta
 from fastapi.testclient import TestClient
-from upload import upload_minifam
+from upload import upload_minifam, upload_pfam1
 
 import deciphon_api.data as data
+from deciphon_api.core.counts import CountTable, KeyTable
 from deciphon_api.main import app, settings
+from deciphon_api.models.scan_export import _tsv_value
 
 api_prefix = settings.api_prefix
 api_key = settings.api_key
@@ -187,6 +189,56 @@ def test_get_next_scan_seq():
         assert response.status_code == 204
 
 
+@pytest.mark.usefixtures("cleandir")
+def test_get_scan_seq_chunk():
+    prefix = api_prefix
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        consensus_faa = data.filepath(data.FileName.consensus_faa)
+        response = client.post(
+            f"{api_prefix}/scans/",
+            data={"db_id": 1, "multi_hits": True, "hmmer3_compat": False},
+            files={
+                "fasta_file": (
+                    consensus_faa.name,
+                    open(consensus_faa, "rb"),
+                    "text/plain",
+                )
+            },
+        )
+        assert response.status_code == 201
+        items = read_fasta(consensus_faa).read_items()
+
+        response = client.get(f"{prefix}/scans/1/seqs/chunk", params={"limit": 2})
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": 1, "scan_id": 1, "name": items[0].id, "data": items[0].sequence},
+            {"id": 2, "scan_id": 1, "name": items[1].id, "data": items[1].sequence},
+        ]
+
+        params = {"after": 1, "max_bytes": 1}
+        response = client.get(f"{prefix}/scans/1/seqs/chunk", params=params)
+        assert response.status_code == 200
+        assert [x["id"] for x in response.json()] == [2]
+
+        params = {"after": 1, "format": "fasta"}
+        response = client.get(f"{prefix}/scans/1/seqs/chunk", params=params)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/x-fasta")
+        assert response.text == "".join(
+            f">{i + 1} {x.id}\n{x.sequence}\n" for i, x in enumerate(items) if i > 0
+        )
+
+        params = {"format": "fasta", "fields": "name"}
+        response = client.get(f"{prefix}/scans/1/seqs/chunk", params=params)
+        assert response.status_code == 422
+
+        params = {"after": 3}
+        response = client.get(f"{prefix}/scans/1/seqs/chunk", params=params)
+        assert response.status_code == 204
+
+
 @pytest.mark.usefixtures("cleandir")
 def test_get_scan_seqs():
     prefix = api_prefix
@@ -509,3 +561,297 @@ def test_get_scan_prods_as_codon():
         response = client.get(f"{prefix}/scans/1/prods/codon")
         assert response.status_code == 200
         assert response.text == data.prods_as_codon_content()
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_get_scan_seqs_with_fields():
+    prefix = api_prefix
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        consensus_faa = data.filepath(data.FileName.consensus_faa)
+        response = client.post(
+            f"{api_prefix}/scans/",
+            data={"db_id": 1, "multi_hits": True, "hmmer3_compat": False},
+            files={
+                "fasta_file": (
+                    consensus_faa.name,
+                    open(consensus_faa, "rb"),
+                    "text/plain",
+                )
+            },
+        )
+        assert response.status_code == 201
+        items = read_fasta(consensus_faa).read_items()
+
+        response = client.get(f"{prefix}/scans/1/seqs", params={"fields": "name"})
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": 1, "name": items[0].id},
+            {"id": 2, "name": items[1].id},
+            {"id": 3, "name": items[2].id},
+        ]
+
+        response = client.get(f"{prefix}/seqs/2", params={"fields": ["scan_id"]})
+        assert response.status_code == 200
+        assert response.json() == {"id": 2, "scan_id": 1}
+
+        response = client.get(f"{prefix}/scans/1/seqs", params={"fields": "invalid"})
+        assert response.status_code == 422
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_get_scan_counts():
+    prefix = api_prefix
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        consensus_faa = data.filepath(data.FileName.consensus_faa)
+        response = client.post(
+            f"{api_prefix}/scans/",
+            data={"db_id": 1, "multi_hits": True, "hmmer3_compat": False},
+            files={
+                "fasta_file": (
+                    consensus_faa.name,
+                    open(consensus_faa, "rb"),
+                    "text/plain",
+                )
+            },
+        )
+        assert response.status_code == 201
+
+        response = client.get(f"{prefix}/scans/1/seqs/count")
+        assert response.status_code == 200
+        assert response.json() == {"count": 3}
+
+        response = client.get(f"{prefix}/scans/1/prods/count")
+        assert response.status_code == 200
+        assert response.json() == {"count": 0}
+
+        with open("prods_file.tsv", "wb") as f:
+            f.write(data.prods_file_content().encode())
+
+        response = client.post(
+            f"{api_prefix}/prods/",
+            files={
+                "prods_file": (
+                    "prods_file.tsv",
+                    open("prods_file.tsv", "rb"),
+                    "text/tab-separated-values",
+                )
+            },
+            headers={"X-API-Key": f"{api_key}"},
+        )
+        assert response.status_code == 201
+
+        response = client.get(f"{prefix}/scans/1/prods/count")
+        assert response.status_code == 200
+        assert response.json() == {"count": 2}
+
+        response = client.get(f"{prefix}/scans/2/prods/count")
+        assert response.status_code == 404
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_export_scan_prods():
+    prefix = api_prefix
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        consensus_faa = data.filepath(data.FileName.consensus_faa)
+        response = client.post(
+            f"{api_prefix}/scans/",
+            data={"db_id": 1, "multi_hits": True, "hmmer3_compat": False},
+            files={
+                "fasta_file": (
+                    consensus_faa.name,
+                    open(consensus_faa, "rb"),
+                    "text/plain",
+                )
+            },
+        )
+        assert response.status_code == 201
+        items = read_fasta(consensus_faa).read_items()
+
+        with open("prods_file.tsv", "wb") as f:
+            f.write(data.prods_file_content().encode())
+
+        response = client.post(
+            f"{api_prefix}/prods/",
+            files={
+                "prods_file": (
+                    "prods_file.tsv",
+                    open("prods_file.tsv", "rb"),
+                    "text/tab-separated-values",
+                )
+            },
+            headers={"X-API-Key": f"{api_key}"},
+        )
+        assert response.status_code == 201
+
+        params = {"format": "tsv", "fields": ["seq_id", "alt_loglik"]}
+        response = client.get(f"{prefix}/scans/1/prods/export", params=params)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/tab-separated-values")
+        assert response.text.splitlines() == [
+            "#int64\tint64\tstring\tint64\tfloat64",
+            "id\tseq_id\tseq_name\tseq_length\talt_loglik",
+            f"1\t1\t{items[0].id}\t{len(items[0].sequence)}\t-547.87713623046875",
+            f"2\t2\t{items[1].id}\t{len(items[1].sequence)}\t-802.65130615234375",
+        ]
+        expected = response.text
+
+        params["batch_size"] = 1
+        response = client.get(f"{prefix}/scans/1/prods/export", params=params)
+        assert response.text == expected
+
+        pa = pytest.importorskip("pyarrow")
+        params = {"format": "arrow", "batch_size": 1}
+        response = client.get(f"{prefix}/scans/1/prods/export", params=params)
+        assert response.status_code == 200
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.num_rows == 2
+        assert table.column("profile_name").to_pylist() == ["PF00742.20", "PF00696.29"]
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_append_scan_prods():
+    prefix = api_prefix
+    hdrs = {"X-API-Key": f"{api_key}"}
+    with TestClient(app) as client:
+        upload_minifam(client)
+
+        consensus_faa = data.filepath(data.FileName.consensus_faa)
+        response = client.post(
+            f"{api_prefix}/scans/",
+            data={"db_id": 1, "multi_hits": True, "hmmer3_compat": False},
+            files={
+                "fasta_file": (
+                    consensus_faa.name,
+                    open(consensus_faa, "rb"),
+                    "text/plain",
+                )
+            },
+        )
+        assert response.status_code == 201
+
+        lines = data.prods_file_content().splitlines(keepends=True)
+        with open("first.tsv", "wb") as f:
+            f.write("".join(lines[:2]).encode())
+        with open("all.tsv", "wb") as f:
+            f.write("".join(lines).encode())
+
+        def append(filename: str, scan_id: int = 1):
+            return client.post(
+                f"{prefix}/scans/{scan_id}/prods/",
+                files={
+                    "prods_file": (
+                        filename,
+                        open(filename, "rb"),
+                        "text/tab-separated-values",
+                    )
+                },
+                headers=hdrs,
+            )
+
+        response = append("first.tsv")
+        assert response.status_code == 201
+        assert response.json() == {"added": 1, "skipped": 0}
+
+        response = client.get(f"{prefix}/scans/1/prods")
+        assert response.status_code == 200
+        assert response.headers["x-scan-complete"] == "false"
+        assert [x["seq_id"] for x in response.json()] == [1]
+
+        response = append("all.tsv")
+        assert response.status_code == 201
+        assert response.json() == {"added": 1, "skipped": 1}
+
+        response = append("all.tsv")
+        assert response.status_code == 201
+        assert response.json() == {"added": 0, "skipped": 2}
+
+        response = client.get(f"{prefix}/scans/1/prods/count")
+        assert response.json() == {"count": 2}
+        assert response.headers["x-scan-complete"] == "false"
+
+        response = client.get(f"{prefix}/prods")
+        assert len(response.json()) == 2
+
+        response = append("all.tsv", scan_id=2)
+        assert response.status_code == 404
+
+        upload_pfam1(client)
+        response = client.post(
+            f"{api_prefix}/scans/",
+            data={"db_id": 2, "multi_hits": True, "hmmer3_compat": False},
+            files={
+                "fasta_file": (
+                    consensus_faa.name,
+                    open(consensus_faa, "rb"),
+                    "text/plain",
+                )
+            },
+        )
+        assert response.status_code == 201
+
+        response = append("all.tsv", scan_id=2)
+        assert response.status_code == 422
+
+        with open("foreign.tsv", "wb") as f:
+            f.write((lines[0] + "2" + lines[1][1:]).encode())
+        response = append("foreign.tsv", scan_id=2)
+        assert response.status_code == 422
+        assert "seq_id 1 not in scan 2" in response.json()["msg"]
+
+        header = lines[0].rstrip("\n").split("\t")
+        malformed = {
+            "nocol.tsv": "\t".join(x for x in header if x != "seq_id")
+            + "\n"
+            + lines[1],
+            "short.tsv": lines[0] + "1\t1\n",
+            "noint.tsv": lines[0] + lines[1].replace("\t1\t", "\tx\t", 1),
+        }
+        for filename, content in malformed.items():
+            with open(filename, "wb") as f:
+                f.write(content.encode())
+            response = append(filename)
+            assert response.status_code == 422
+            assert response.json()["msg"].startswith("Malformed products file")
+
+        response = client.get(f"{prefix}/scans/1/prods/count")
+        assert response.json() == {"count": 2}
+
+
+def test_prod_keys_are_bounded():
+    keys = KeyTable(maxsize=2)
+    for scan_id in (1, 2, 3):
+        assert keys.add(scan_id, (1, "PF1"), lambda: [])
+    assert len(keys) == 2
+    assert keys.add(1, (1, "PF1"), lambda: [])
+    assert not keys.add(3, (1, "PF1"), lambda: [])
+
+
+def test_count_seeds_run_outside_the_table_lock():
+    counts = CountTable()
+    assert counts.get(1, lambda: counts.clear() or 3) == 3
+    assert counts.get(1, lambda: 4) == 4
+
+    keys = KeyTable()
+    seeds = []
+
+    def seed():
+        if len(seeds) == 0:
+            keys.clear()
+        seeds.append(1)
+        return []
+
+    assert keys.add(1, (1, "PF1"), seed)
+    assert not keys.add(1, (1, "PF1"), lambda: [])
+    assert len(seeds) == 2
+
+
+def test_export_tsv_value_escapes():
+    assert _tsv_value("a\tb\nc\\d\r") == "a\\tb\\nc\\\\d\\r"
+    assert _tsv_value(0.5) == "0.5"
+    assert _tsv_value(3) == "3"
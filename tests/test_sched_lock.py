@@ -0,0 +1,110 @@
+import json
+import time
+
+import pytest
+from deciphon_sched.error import SchedError
+from deciphon_sched.rc import RC
+
+import deciphon_api.core.sched as sched
+from deciphon_api.core.leases import LeaseTable
+from deciphon_api.core.sched import SchedLock
+
+
+def test_sched_lock_generation(tmp_path):
+    path = str(tmp_path / "deciphon.sched.lock")
+    first = SchedLock()
+    second = SchedLock()
+    first.open(path)
+    second.open(path)
+    changes = []
+    first.on_change(lambda: changes.append("first"))
+    second.on_change(lambda: changes.append("second"))
+
+    with first.write():
+        with first.write():
+            pass
+    first.sync()
+    second.sync()
+    assert changes == ["second"]
+
+    with second.write():
+        pass
+    second.sync()
+    assert changes == ["second"]
+    with first.write():
+        pass
+    assert changes == ["second", "first"]
+
+    first.close()
+    second.close()
+
+
+def test_sched_retries_transient_errors(monkeypatch):
+    monkeypatch.setattr(sched, "max_backoff", 0)
+    calls = []
+
+    def busy(value):
+        calls.append(value)
+        if len(calls) < 3:
+            raise SchedError(RC.SCHED_FAIL_BEGIN_TRANSACTION)
+        return value
+
+    assert sched._writer(busy)(7) == 7
+    assert len(calls) == 3
+
+    def missing():
+        calls.append(None)
+        raise SchedError(RC.SCHED_JOB_NOT_FOUND)
+
+    calls.clear()
+    with pytest.raises(SchedError):
+        sched._reader(missing)()
+    assert len(calls) == 1
+
+    def constraint():
+        calls.append(None)
+        raise SchedError(RC.SCHED_FAIL_EXEC_STMT)
+
+    calls.clear()
+    with pytest.raises(SchedError):
+        sched._writer(constraint)()
+    assert len(calls) == 1
+
+    calls.clear()
+    with pytest.raises(SchedError):
+        sched._writer(busy, retry=False)(7)
+    assert len(calls) == 1
+
+
+def test_shared_leases(tmp_path):
+    first = LeaseTable(ttl=60)
+    second = LeaseTable(ttl=60)
+    first.share(tmp_path / "leases")
+    second.share(tmp_path / "leases")
+
+    first.grant(1, "node1")
+    assert second.renew(1, "node1") is not None
+    assert second.renew(1, "node2") is None
+    assert len(second) == 1
+
+    second.retain([2])
+    assert first.get(1) is None
+
+    first.grant(1, "node1")
+    assert second.release(1)
+    assert not first.release(1)
+
+
+def test_shared_leases_use_wall_clock(tmp_path):
+    leases = LeaseTable(ttl=60)
+    leases.share(tmp_path / "leases")
+
+    leases.grant(1, "node1")
+    with open(tmp_path / "leases" / "1") as file:
+        expires = json.load(file)["expires"]
+    assert abs(expires - (time.time() + 60)) < 5
+
+    with open(tmp_path / "leases" / "1", "w") as file:
+        json.dump({"worker": "node1", "expires": time.time() - 1}, file)
+    assert list(leases.expired()) == [1]
+    assert leases.release_expired(1) is not None
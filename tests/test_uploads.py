@@ -0,0 +1,181 @@
+import os
+from pathlib import Path
+
+import pytest
+import xxhash
+from fastapi.testclient import TestClient
+
+import deciphon_api.data as data
+from deciphon_api.main import app, settings
+from deciphon_api.models.upload import upload_sessions
+
+api_prefix = settings.api_prefix
+api_key = settings.api_key
+hdrs = {"X-API-Key": f"{api_key}"}
+
+
+def signed_xxh3(content: bytes) -> int:
+    xxh3 = xxhash.xxh3_64_intdigest(content)
+    return xxh3 - (1 << 64) if xxh3 >= (1 << 63) else xxh3
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_resumable_upload():
+    minifam_hmm = data.filepath(data.FileName.minifam_hmm)
+    content = minifam_hmm.read_bytes()
+    half = len(content) // 2
+
+    with TestClient(app) as client:
+        post = {"kind": "hmm", "filename": minifam_hmm.name, "size": len(content)}
+        response = client.post(f"{api_prefix}/uploads/", json=post)
+        assert response.status_code == 403
+
+        response = client.post(f"{api_prefix}/uploads/", json=post, headers=hdrs)
+        assert response.status_code == 201
+        upload_id = response.json()["id"]
+        assert response.json()["received"] == 0
+        assert response.json()["missing"] == [[0, len(content)]]
+
+        url = f"{api_prefix}/uploads/{upload_id}"
+        response = client.put(
+            url, params={"offset": half}, content=content[half:], headers=hdrs
+        )
+        assert response.status_code == 200
+        assert response.json()["missing"] == [[0, half]]
+
+        response = client.post(f"{url}/finalize", headers=hdrs)
+        assert response.status_code == 409
+
+        response = client.put(
+            url, params={"offset": half}, content=content + b"x", headers=hdrs
+        )
+        assert response.status_code == 416
+
+        response = client.put(
+            url, params={"offset": 0}, content=content[:half], headers=hdrs
+        )
+        assert response.status_code == 200
+        assert response.json()["received"] == len(content)
+        assert response.json()["missing"] == []
+
+        response = client.post(f"{url}/finalize", headers=hdrs)
+        assert response.status_code == 201
+        assert response.json()["xxh3"] == signed_xxh3(content)
+        assert response.json()["filename"] == minifam_hmm.name
+
+        response = client.get(url)
+        assert response.status_code == 404
+
+        response = client.get(f"{api_prefix}/hmms/1")
+        assert response.json()["xxh3"] == signed_xxh3(content)
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_resumable_upload_hash_mismatch():
+    content = b"not a real hmm"
+    with TestClient(app) as client:
+        post = {"kind": "hmm", "filename": "x.hmm", "size": len(content), "xxh3": 1}
+        response = client.post(f"{api_prefix}/uploads/", json=post, headers=hdrs)
+        url = f"{api_prefix}/uploads/{response.json()['id']}"
+
+        response = client.put(url, params={"offset": 0}, content=content, headers=hdrs)
+        assert response.status_code == 200
+
+        response = client.post(f"{url}/finalize", headers=hdrs)
+        assert response.status_code == 422
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_abort_upload():
+    with TestClient(app) as client:
+        post = {"kind": "db", "filename": "x.dcp", "size": 10}
+        response = client.post(f"{api_prefix}/uploads/", json=post, headers=hdrs)
+        url = f"{api_prefix}/uploads/{response.json()['id']}"
+
+        response = client.delete(url, headers=hdrs)
+        assert response.status_code == 200
+
+        response = client.delete(url, headers=hdrs)
+        assert response.status_code == 404
+
+        post = {"kind": "db", "filename": "../x.dcp", "size": 10}
+        response = client.post(f"{api_prefix}/uploads/", json=post, headers=hdrs)
+        assert response.status_code == 422
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_upload_reserved_filename():
+    with TestClient(app) as client:
+        for filename in ["..", "objects", "tmp"]:
+            post = {"kind": "db", "filename": filename, "size": 10}
+            response = client.post(f"{api_prefix}/uploads/", json=post, headers=hdrs)
+            assert response.status_code == 422
+
+            files = {"hmm_file": (filename, b"data", "application/octet-stream")}
+            response = client.post(f"{api_prefix}/hmms/", files=files, headers=hdrs)
+            assert response.status_code == 422
+        assert os.listdir("tmp") == []
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_upload_into_storage_dir(monkeypatch):
+    monkeypatch.setattr(settings, "storage_dir", Path("store"))
+    minifam_hmm = data.filepath(data.FileName.minifam_hmm)
+    cwd = os.getcwd()
+
+    with TestClient(app) as client:
+        assert os.getcwd() == cwd
+        files = {"hmm_file": (minifam_hmm.name, open(minifam_hmm, "rb"))}
+        response = client.post(f"{api_prefix}/hmms/", files=files, headers=hdrs)
+        assert response.status_code == 201
+        assert os.getcwd() == cwd
+        assert os.path.exists(os.path.join("store", minifam_hmm.name))
+        assert not os.path.exists(minifam_hmm.name)
+
+        response = client.get(f"{api_prefix}/hmms/1/download")
+        assert response.status_code == 200
+        assert response.content == minifam_hmm.read_bytes()
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_upload_survives_restart():
+    content = b"0123456789"
+    post = {"kind": "db", "filename": "x.dcp", "size": len(content)}
+    with TestClient(app) as client:
+        response = client.post(f"{api_prefix}/uploads/", json=post, headers=hdrs)
+        url = f"{api_prefix}/uploads/{response.json()['id']}"
+        response = client.put(
+            url, params={"offset": 0}, content=content[:4], headers=hdrs
+        )
+        assert response.status_code == 200
+
+    with TestClient(app) as client:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json()["missing"] == [[4, len(content)]]
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_upload_expiry_and_limits(monkeypatch):
+    monkeypatch.setattr(settings, "max_upload_size", 10)
+    with TestClient(app) as client:
+        post = {"kind": "db", "filename": "x.dcp", "size": 11}
+        response = client.post(f"{api_prefix}/uploads/", json=post, headers=hdrs)
+        assert response.status_code == 413
+
+        post = {"kind": "db", "filename": "x.dcp", "size": 10}
+        response = client.post(f"{api_prefix}/uploads/", json=post, headers=hdrs)
+        upload_id = response.json()["id"]
+        assert upload_id in os.listdir("uploads")
+
+        with open(os.path.join("uploads", "0" * 32), "wb"):
+            pass
+        upload_sessions.sweep()
+        assert sorted(os.listdir("uploads")) == sorted(
+            [".lock", upload_id, f"{upload_id}.json"]
+        )
+
+        monkeypatch.setattr(upload_sessions, "ttl", 0.0)
+        response = client.get(f"{api_prefix}/uploads/{upload_id}")
+        assert response.status_code == 404
+        assert os.listdir("uploads") == [".lock"]
@@ -0,0 +1,46 @@
+import asyncio
+
+from deciphon_api.core.wakeup import Waiters
+
+
+def test_waiters_wake_in_order():
+    async def main():
+        waiters = Waiters()
+        woken = []
+
+        async def wait(name: str):
+            if await waiters.wait(1.0):
+                woken.append(name)
+
+        tasks = [asyncio.create_task(wait(x)) for x in ["a", "b", "c"]]
+        await asyncio.sleep(0)
+        waiters.notify()
+        waiters.notify()
+        await asyncio.sleep(0.01)
+        assert woken == ["a", "b"]
+        waiters.notify()
+        await asyncio.gather(*tasks)
+        assert woken == ["a", "b", "c"]
+        assert len(waiters) == 0
+
+    asyncio.run(main())
+
+
+def test_waiters_timeout():
+    async def main():
+        waiters = Waiters()
+        assert not await waiters.wait(0.01)
+        assert len(waiters) == 0
+        assert await waiters.poll(lambda: None, 0.01) is None
+
+    asyncio.run(main())
+
+
+def test_waiters_recheck():
+    async def main():
+        waiters = Waiters(recheck=0.01)
+        items = iter([None, None, "job"])
+        assert await waiters.poll(lambda: next(items), 1.0) == "job"
+        assert await waiters.poll(lambda: None, 0.03) is None
+
+    asyncio.run(main())